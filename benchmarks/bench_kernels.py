@@ -0,0 +1,385 @@
+"""
+    Microbenchmarks of the hot kernels of the voting, each one timed in isolation on fixtures
+    which are sampled deterministically (fixed seed) from the BUS3B test corpus:
+
+        - ocr sets from the ingested voter database (run main_prepare_dataset.py first), the texts
+          and lines of the sets are the inputs of the alignment, n-distance and distance kernels
+        - the inputs of the character voting and the search space processing are recorded
+          from one (untimed) wordwise msa run over these sets
+        - tesseract hocr lines of the corpus for 'HocrSQLComparator.line2dict'
+
+    The time per call of every kernel is appended to a history file. A kernel regresses if it's
+    slower than the median of its recent history by more than its threshold, so a regression of a
+    single kernel shows up even if it's hidden in the noise of the end-to-end benchmark.
+
+    run from the repository root:
+        python -m benchmarks.bench_kernels
+        python -m benchmarks.bench_kernels --kernels pairwise_unicode levenshtein --repeats 10
+        python -m benchmarks.bench_kernels --check --no-record
+"""
+
+import argparse
+import contextlib
+import copy
+import datetime
+import glob
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+from benchmarks.bench_pipeline import REPOSITORY_ROOT, load_config, get_git_revision
+
+
+CORPUS_ROOT = "./Testfiles/BUS3B_Test"
+DEFAULT_HISTORY_FILE = "./benchmark_results/kernels.jsonl"
+
+NUMBER_OF_SETS = 60             # sampled ocr sets
+NUMBER_OF_TABLES = 6            # tables the sets are sampled from
+NUMBER_OF_HOCR_FILES = 3
+MAX_SEARCH_SPACES = 2000        # recorded search spaces which are used
+SEED = 1969
+
+HISTORY_WINDOW = 5              # number of previous runs the baseline is taken from
+DEFAULT_THRESHOLD = 0.15        # relative slowdown against the baseline which counts as regression
+# kernels with very short calls are noisier
+THRESHOLDS = {
+    "levenshtein": 0.25,
+    "process_search_space": 0.25,
+}
+
+
+class SetFixture(object):
+    """
+        Sampled ocr set, the lines are in voting order (pivot in the middle) like in 'OCRset.obtain_line_info'
+    """
+
+    def __init__(self, table, line_index, texts, lines):
+        self.table = table
+        self.line_index = line_index
+        self.texts = texts
+        self.lines = lines
+
+
+class TextLine(object):
+    """
+        Minimal line with the 'ocr_text_normalized' property, which 'TextUnspacer' works on
+    """
+
+    def __init__(self, text):
+        self.ocr_text_normalized = text
+
+
+class KernelFixtures(object):
+
+    def __init__(self, config, seed=SEED, number_of_sets=NUMBER_OF_SETS):
+        from n_dist_keying.pipeline_context import PipelineContext
+
+        self.config = config
+        self.rnd = random.Random(seed)
+        self.pipeline_context = PipelineContext(config)
+        self.msa_handler = self.pipeline_context.msa_handler
+        self.sets = []
+        self.vote_args = []             # recorded arguments of 'vote_best_of_three_charconfs_searchspaces'
+        self.search_space_calls = []    # recorded (processor, arguments) of 'process_search_space'
+        self.hocr_lines = []
+        self.unavailable = {}           # kernel name -> reason
+
+        self.sample_sets(number_of_sets)
+        self.record_voting_inputs()
+        self.load_hocr_lines()
+
+    def sample_sets(self, number_of_sets):
+        from akf_corelib.database_handler import DatabaseHandler as CorelibDatabaseHandler
+        from akf_corelib.df_objectifier import DFObjectifier
+        from n_dist_keying.database_handler import DatabaseHandler
+        from n_dist_keying.result_database_writer import RESULTS_TABLE
+
+        config = self.config
+        dh = CorelibDatabaseHandler(dbdir=str(os.path.abspath(config.DB_DIR_VOTER)))
+        tables = []
+        for db in sorted(dh.db):
+            for table in sorted(dh.get_tablenames_from_db(db)):
+                if table != RESULTS_TABLE:
+                    tables.append(('sqlite:////' + db, table))
+        if not tables:
+            raise Exception("no tables in " + config.DB_DIR_VOTER + ", run main_prepare_dataset.py first")
+
+        candidates = []
+        for dbpath, table in self.rnd.sample(tables, min(NUMBER_OF_TABLES, len(tables))):
+            dataframe_wrapper = DFObjectifier(dbpath, table)
+            database_handler = DatabaseHandler(dataframe_wrapper, config.NUMBER_OF_INPUTS, None, None,
+                                               self.pipeline_context)
+            ocr_comparison = database_handler.create_ocr_comparison()
+            for line_index, ocr_set in enumerate(ocr_comparison.ocr_sets):
+                if config.MSA_BEST_USE_N_DIST_PIVOT:
+                    ocr_set.calculate_n_distance_keying()
+                best_index, other_indices = ocr_set.obtain_best_index(config.MSA_BEST_USE_N_DIST_PIVOT,
+                                                                      config.MSA_BEST_USE_LONGEST_PIVOT)
+                texts, lines, lines_ok, number_lines_ok = ocr_set.obtain_line_info(best_index, other_indices)
+                # only sets with a line of each engine, so every kernel gets three inputs
+                if number_lines_ok == 3:
+                    candidates.append(SetFixture(table, line_index, texts, lines))
+
+        self.sets = self.rnd.sample(candidates, min(number_of_sets, len(candidates)))
+
+    def record_voting_inputs(self):
+        from n_dist_keying.search_space_processor import SearchSpaceProcessor
+
+        ocr_voter = self.msa_handler.ocr_voter
+        vote_function = ocr_voter.vote_best_of_three_charconfs_searchspaces
+        process_search_space = SearchSpaceProcessor.process_search_space
+
+        def recording_vote(*args, **kwargs):
+            self.vote_args.append((copy.deepcopy(args), kwargs))
+            return vote_function(*args, **kwargs)
+
+        def recording_process_search_space(processor, *args):
+            self.search_space_calls.append((processor, copy.deepcopy(args)))
+            return process_search_space(processor, *args)
+
+        ocr_voter.vote_best_of_three_charconfs_searchspaces = recording_vote
+        SearchSpaceProcessor.process_search_space = recording_process_search_space
+        try:
+            for set_fixture in self.sets:
+                self.msa_handler.reset_table_state()
+                lines = copy.deepcopy(set_fixture.lines)
+                # charconfs and searchspaces on, else the character voting isn't called
+                self.msa_handler.get_best_of_three_wordwise(lines[0], lines[1], lines[2], True, True)
+        finally:
+            del ocr_voter.vote_best_of_three_charconfs_searchspaces
+            SearchSpaceProcessor.process_search_space = process_search_space
+
+        if len(self.search_space_calls) > MAX_SEARCH_SPACES:
+            self.search_space_calls = self.rnd.sample(self.search_space_calls, MAX_SEARCH_SPACES)
+
+    def load_hocr_lines(self):
+        try:
+            from n_dist_keying.hocr_sql_comparator import HocrSQLComparator
+        except ImportError as ex:
+            self.unavailable["line2dict"] = str(ex)
+            return
+
+        comparator = HocrSQLComparator()
+        hocr_files = sorted(glob.glob(os.path.join(CORPUS_ROOT, "*", "tess", "*", "*.hocr")))
+        for hocr_file in self.rnd.sample(hocr_files, min(NUMBER_OF_HOCR_FILES, len(hocr_files))):
+            page = comparator.get_hocr_document(os.path.abspath(hocr_file)).pages[0]
+            for area in page.areas:
+                for paragraph in area.paragraphs:
+                    self.hocr_lines.extend(paragraph.lines)
+        self.comparator = comparator
+
+
+# the kernel cases, each case is a tuple (function, argument factory), the factory is called before
+# each timed call and copies the inputs of kernels which change them
+
+def cases_pairwise_unicode(fixtures):
+    return [(fixtures.msa_handler.pairwise_unicode, lambda s=s: (s.texts[0], s.texts[1]))
+            for s in fixtures.sets]
+
+
+def cases_msa_alignment_biopython(fixtures):
+    return [(fixtures.msa_handler.msa_alignment_biopython, lambda s=s: tuple(s.texts))
+            for s in fixtures.sets]
+
+
+def cases_get_best_of_three_wordwise(fixtures):
+    config = fixtures.config
+
+    def run(line_1, line_2, line_3):
+        fixtures.msa_handler.reset_table_state()
+        return fixtures.msa_handler.get_best_of_three_wordwise(line_1, line_2, line_3, config.MSA_BEST_USE_CHARCONFS,
+                                                               config.MSA_BEST_USE_SEARCHSPACE)
+    return [(run, lambda s=s: tuple(copy.deepcopy(s.lines))) for s in fixtures.sets]
+
+
+def cases_vote_best_of_three_charconfs_searchspaces(fixtures):
+    ocr_voter = fixtures.msa_handler.ocr_voter
+
+    def run(args, kwargs):
+        return ocr_voter.vote_best_of_three_charconfs_searchspaces(*args, **kwargs)
+    return [(run, lambda args=args, kwargs=kwargs: (copy.deepcopy(args), kwargs))
+            for args, kwargs in fixtures.vote_args]
+
+
+def cases_process_search_space(fixtures):
+    return [(processor.process_search_space, lambda args=args: copy.deepcopy(args))
+            for processor, args in fixtures.search_space_calls]
+
+
+def cases_compare_texts(fixtures):
+    from n_dist_keying.n_distance_voter import NDistanceVoter
+    from n_dist_keying.distance_matrix import DistanceMatrix
+
+    config = fixtures.config
+    distance_matrix = DistanceMatrix(config.NDIST_DISTANCE_MODE, config.NDIST_EARLY_EXIT)
+
+    def run(texts):
+        return NDistanceVoter(texts, distance_matrix).compare_texts(
+            take_longest_on_empty_lines=config.NDIST_VOTE_LONGEST_IF_EMPTY_STRINGS,
+            vote_without_spaces=config.NDIST_VOTE_WITHOUT_SPACES)
+    return [(run, lambda s=s: (list(s.texts),)) for s in fixtures.sets]
+
+
+def cases_unspace_texts(fixtures):
+    text_unspacer = fixtures.pipeline_context.text_unspacer
+    # unspace ocropus with tesseract as template, like in main_n_dist_keying
+    return [(text_unspacer.unspace_texts, lambda s=s: ([TextLine(text) for text in s.texts], 2, 1))
+            for s in fixtures.sets]
+
+
+def cases_levenshtein(fixtures):
+    from ocr_validation.ocrolib_edist import Edist3
+    return [(Edist3.levenshtein, lambda pair=pair: pair)
+            for s in fixtures.sets for pair in [(s.texts[0], s.texts[1]), (s.texts[1], s.texts[2]),
+                                                (s.texts[0], s.texts[2])]]
+
+
+def cases_line2dict(fixtures):
+    if "line2dict" in fixtures.unavailable:
+        return []
+
+    def run(line):
+        return fixtures.comparator.line2dict(line, {}, "Tesseract", "default", 0, 0)
+    return [(run, lambda line=line: (line,)) for line in fixtures.hocr_lines]
+
+
+KERNELS = [
+    ("pairwise_unicode", cases_pairwise_unicode),
+    ("msa_alignment_biopython", cases_msa_alignment_biopython),
+    ("get_best_of_three_wordwise", cases_get_best_of_three_wordwise),
+    ("vote_best_of_three_charconfs_searchspaces", cases_vote_best_of_three_charconfs_searchspaces),
+    ("process_search_space", cases_process_search_space),
+    ("compare_texts", cases_compare_texts),
+    ("unspace_texts", cases_unspace_texts),
+    ("levenshtein", cases_levenshtein),
+    ("line2dict", cases_line2dict),
+]
+
+
+def time_cases(cases, repeats):
+    """
+    :return: tuple (best, median) of the mean time per call in microseconds over the repeats
+    """
+    times_per_call = []
+    for _ in range(repeats):
+        elapsed = 0.0
+        for function, create_args in cases:
+            args = create_args()
+            start = time.perf_counter()
+            function(*args)
+            elapsed += time.perf_counter() - start
+        times_per_call.append(elapsed / len(cases) * 1e6)
+    return min(times_per_call), statistics.median(times_per_call)
+
+
+def load_history(history_file, environment):
+    """
+    :return: list of the previous runs in the same environment (same fixtures, python and machine)
+    """
+    if not os.path.exists(history_file):
+        return []
+    runs = []
+    with open(history_file, 'r', encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            run = json.loads(line)
+            if run.get("environment") == environment:
+                runs.append(run)
+    return runs
+
+
+def get_baseline(history, kernel):
+    times = [run["kernels"][kernel]["best_us"] for run in history[-HISTORY_WINDOW:] if kernel in run["kernels"]]
+    if not times:
+        return None
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="microbenchmarks of the voting kernels, other arguments "
+                                                 "are configuration entries")
+    kernel_names = [name for name, _ in KERNELS]
+    parser.add_argument("--kernels", nargs="+", choices=kernel_names, default=kernel_names, help="kernels to run")
+    parser.add_argument("--repeats", type=int, default=5, help="number of timed passes over the fixtures")
+    parser.add_argument("--sets", type=int, default=NUMBER_OF_SETS, help="number of sampled ocr sets")
+    parser.add_argument("--seed", type=int, default=SEED, help="seed of the fixture sampling")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_FILE, help="JSON lines file with the previous runs")
+    parser.add_argument("--no-record", action="store_true", help="don't append this run to the history")
+    parser.add_argument("--check", action="store_true", help="exit with 1 if a kernel regressed")
+    args, config_args = parser.parse_known_args()
+
+    os.chdir(REPOSITORY_ROOT)
+    sys.path.insert(0, REPOSITORY_ROOT)
+    config = load_config(config_args)
+
+    from n_dist_keying.lazy_print import LazyPrint
+    LazyPrint.set_level(getattr(config, 'LOG_LEVEL', LazyPrint.DEFAULT_LEVEL))
+
+    print("creating fixtures, seed:", args.seed)
+    # the kernels print their diagnostics to stdout, this isn't part of the measurement
+    with contextlib.redirect_stdout(io.StringIO()):
+        fixtures = KernelFixtures(config, args.seed, args.sets)
+
+    environment = {
+        "python": platform.python_version(),
+        "machine": platform.node() + " " + platform.machine(),
+        "sets": args.sets,
+        "seed": args.seed,
+        "config_args": config_args,
+    }
+    history = load_history(args.history, environment)
+
+    results = {}
+    regressions = []
+    print("{:<45} {:>8} {:>12} {:>12} {:>12}  {}".format("kernel", "calls", "best [us]", "median [us]",
+                                                         "baseline", "status"))
+    for name, create_cases in KERNELS:
+        if name not in args.kernels:
+            continue
+        cases = create_cases(fixtures)
+        if not cases:
+            print("{:<45} unavailable: {}".format(name, fixtures.unavailable.get(name, "no fixtures")))
+            continue
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            best, median = time_cases(cases, args.repeats)
+        results[name] = {"calls": len(cases), "best_us": best, "median_us": median}
+
+        baseline = get_baseline(history, name)
+        status = "new"
+        if baseline is not None:
+            threshold = THRESHOLDS.get(name, DEFAULT_THRESHOLD)
+            change = best / baseline - 1.0
+            status = "{:+.1%}".format(change)
+            if change > threshold:
+                status += " REGRESSION (threshold {:.0%})".format(threshold)
+                regressions.append(name)
+        print("{:<45} {:>8} {:>12.1f} {:>12.1f} {:>12}  {}".format(
+            name, len(cases), best, median, "-" if baseline is None else "{:.1f}".format(baseline), status))
+
+    if not args.no_record and results:
+        run = {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "git_revision": get_git_revision(),
+            "environment": environment,
+            "kernels": results,
+        }
+        history_dir = os.path.dirname(args.history)
+        if history_dir:
+            os.makedirs(history_dir, exist_ok=True)
+        with open(args.history, 'a', encoding="utf-8") as history_file:
+            history_file.write(json.dumps(run, sort_keys=True) + "\n")
+
+    if regressions:
+        print("regressions:", ", ".join(regressions))
+    sys.exit(1 if args.check and regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+    Benchmark of the bit-parallel levenshtein distance in 'Edist3.levenshtein' against
+    the previous dynamic-programming implementation 'Edist3.levenshtein_classic'
+    on random ocr-like line pairs of different lengths
+
+    run from the repository root:
+        python -m benchmarks.bench_levenshtein
+"""
+
+import random
+import timeit
+from ocr_validation.ocrolib_edist import Edist3
+
+
+LINE_LENGTHS = [10, 40, 80, 160, 400]
+NUMBER_OF_PAIRS = 50
+ERROR_RATE = 0.1
+ALPHABET = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 .,:;-()¦"
+
+
+def create_ocr_pair(length, rnd):
+    # second line is a copy of the first one with substitutions, insertions and deletions
+    line = [rnd.choice(ALPHABET) for _ in range(length)]
+    other = []
+    for char in line:
+        action = rnd.random()
+        if action < ERROR_RATE / 3:
+            other.append(rnd.choice(ALPHABET))
+        elif action < ERROR_RATE * 2 / 3:
+            other.append(char)
+            other.append(rnd.choice(ALPHABET))
+        elif action < ERROR_RATE:
+            continue
+        else:
+            other.append(char)
+    return "".join(line), "".join(other)
+
+
+def main():
+    rnd = random.Random(42)
+    print("%8s %14s %14s %14s %8s" % ("length", "classic [ms]", "bitpar. [ms]", "cutoff5 [ms]", "speedup"))
+    for length in LINE_LENGTHS:
+        pairs = [create_ocr_pair(length, rnd) for _ in range(NUMBER_OF_PAIRS)]
+
+        for line, other in pairs:
+            assert Edist3.levenshtein(line, other) == Edist3.levenshtein_classic(line, other)
+
+        number = 3 if length > 100 else 10
+        time_classic = timeit.timeit(lambda: [Edist3.levenshtein_classic(a, b) for a, b in pairs],
+                                     number=number) / number
+        time_bitpar = timeit.timeit(lambda: [Edist3.levenshtein(a, b) for a, b in pairs],
+                                    number=number) / number
+        time_cutoff = timeit.timeit(lambda: [Edist3.levenshtein(a, b, 5) for a, b in pairs],
+                                    number=number) / number
+
+        print("%8d %14.3f %14.3f %14.3f %7.1fx" % (length, time_classic*1000, time_bitpar*1000,
+                                                  time_cutoff*1000, time_classic/time_bitpar))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+    End-to-end benchmark of the pipeline over the BUS3B test corpus (Testfiles/BUS3B_Test):
+
+        ingest      main_prepare_dataset.py, hocr/xml inputs to the sqlite databases
+        vote        main_msa_ndist_charconf.py, keying of all tables (without the isri validation)
+        validate    accuracy and word accuracy of the results against the groundtruth, in-process
+
+    Each stage reports wall time and peak RSS, the vote stage is the base for the throughput
+    (pages/s, lines/s, chars/s of the voted results). Accuracy is recorded with the timings, so a
+    performance change can be judged on speed and result quality together. One JSON object per run
+    is appended to the results file.
+
+    run from the repository root, arguments in the style of the configuration entries
+    are passed on to the main scripts (and override the .conf files):
+        python -m benchmarks.bench_pipeline
+        python -m benchmarks.bench_pipeline --label cached --MSA_RESULT_CACHE_ENABLED True
+        python -m benchmarks.bench_pipeline --stages vote validate
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CODED_CONFIGURATION_PATH_VOTER = './configuration/voter/config_vote_bus3b.conf'
+CODED_CONFIGURATION_PATH_DB_READER = './configuration/to_db_reader/config_read_bus3b.conf'
+
+STAGES = ["ingest", "vote", "validate"]
+STAGE_SCRIPTS = {
+    "ingest": "main_prepare_dataset.py",
+    "vote": "main_msa_ndist_charconf.py",
+}
+# the validation is a stage of its own, so it's not part of the voting time
+VOTE_STAGE_ARGS = ["--DO_ISRI_VAL", "False", "--SUMMARIZE_ISRI_REPORTS", "False"]
+
+# result category -> file suffix, like written by 'TableParser.parse_a_table'
+RESULT_CATEGORIES = {
+    "msa_best": "_msa_best.txt",
+    "ndist_keying": "_ndist.txt",
+    "abbyy": "_abbyy.txt",
+    "tess": "_tess.txt",
+    "ocro": "_ocro.txt",
+}
+
+DEFAULT_RESULTS_FILE = "./benchmark_results/pipeline.jsonl"
+
+
+class StageResult(object):
+
+    def __init__(self, name):
+        self.name = name
+        self.wall_time = None       # seconds
+        self.peak_rss_mb = None
+        self.returncode = None
+
+    def to_dict(self):
+        return {"wall_time_s": self.wall_time, "peak_rss_mb": self.peak_rss_mb, "returncode": self.returncode}
+
+
+def maxrss_to_mb(maxrss):
+    # ru_maxrss is in kilobytes on linux, in bytes on macos
+    if sys.platform == "darwin":
+        return maxrss / (1024.0 * 1024.0)
+    return maxrss / 1024.0
+
+
+def run_script_stage(name, script, script_args):
+    """
+    Run a main script in a child process
+    :return: StageResult with the peak RSS of the child
+    """
+    stage_result = StageResult(name)
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, script] + script_args, cwd=REPOSITORY_ROOT)
+    if hasattr(os, "wait4"):
+        # the resource usage of exactly this child
+        pid, status, rusage = os.wait4(process.pid, 0)
+        process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        stage_result.peak_rss_mb = maxrss_to_mb(rusage.ru_maxrss)
+    else:
+        process.wait()
+    stage_result.wall_time = time.perf_counter() - start
+    stage_result.returncode = process.returncode
+    return stage_result
+
+
+def find_result_files(output_root_path, category):
+    """
+    :return: dict (database name, table) -> path of the result file of the category
+    """
+    suffix = RESULT_CATEGORIES[category]
+    result_files = {}
+    for path in glob.glob(os.path.join(output_root_path, "*_" + category, "*", "*" + suffix)):
+        dbname = os.path.basename(os.path.dirname(path))
+        table = os.path.basename(path)[:-len(suffix)]
+        result_files[(dbname, table)] = path
+    return result_files
+
+
+def find_groundtruth_files(groundtruth_fileglob):
+    """
+    :return: dict database name -> list of groundtruth text files, the folder of a file is the database name
+    """
+    groundtruths = {}
+    for path in glob.glob(groundtruth_fileglob + "txt"):
+        dbname = os.path.basename(os.path.dirname(path))
+        groundtruths.setdefault(dbname, []).append(path)
+    return groundtruths
+
+
+def get_groundtruth_file(groundtruths, dbname, table):
+    for path in groundtruths.get(dbname, []):
+        if os.path.basename(path).startswith(table):
+            return path
+    return None
+
+
+def count_result_texts(result_files):
+    """
+    :return: pages, non-empty lines and characters (without linebreaks) of the result files
+    """
+    lines = 0
+    chars = 0
+    for path in result_files.values():
+        with open(path, 'r', encoding="utf-8") as file:
+            for line in file:
+                line = line.rstrip("\n")
+                if line.strip():
+                    lines += 1
+                    chars += len(line)
+    return len(result_files), lines, chars
+
+
+def validate_results(config, output_root_path):
+    """
+    Evaluate all result categories against the groundtruth, like 'TableParser.validate_table_against_gt_native'
+    :return: dict category -> accuracy values, summed over the pages like the isri 'accsum' and 'wordaccsum'
+    """
+    from ocr_validation.isri_evaluator import IsriEvaluator
+
+    isri_evaluator = IsriEvaluator()
+    groundtruths = find_groundtruth_files(config.GROUNDTRUTH_FILEGLOB)
+    reduce_texts = config.ISRI_IGNORE_SPACES or config.ISRI_IGNORE_EMPTY_LINES or config.ISRI_IGNORE_TABS
+
+    accuracies = {}
+    for category in RESULT_CATEGORIES:
+        result_files = find_result_files(output_root_path, category)
+        if not result_files:
+            continue
+
+        totals = {"pages": 0, "characters": 0, "errors": 0, "words": 0, "missed_words": 0}
+        for (dbname, table), path in sorted(result_files.items()):
+            groundtruth_path = get_groundtruth_file(groundtruths, dbname, table)
+            if groundtruth_path is None:
+                continue
+
+            text_table = isri_evaluator.read_text(path)
+            text_groundtruth = isri_evaluator.read_text(groundtruth_path)
+            if reduce_texts:
+                text_table = isri_evaluator.reduce_text(text_table, config.ISRI_IGNORE_SPACES,
+                                                        config.ISRI_IGNORE_EMPTY_LINES, config.ISRI_IGNORE_TABS)
+                text_groundtruth = isri_evaluator.reduce_text(text_groundtruth, config.ISRI_IGNORE_SPACES,
+                                                              config.ISRI_IGNORE_EMPTY_LINES, config.ISRI_IGNORE_TABS)
+
+            acc_data = isri_evaluator.accuracy_texts(text_groundtruth, text_table)
+            wac_data = isri_evaluator.wordacc_texts(text_groundtruth, text_table)
+            totals["pages"] += 1
+            totals["characters"] += acc_data.characters
+            totals["errors"] += acc_data.errors
+            totals["words"] += wac_data.words
+            totals["missed_words"] += wac_data.missed
+
+        totals["char_accuracy"] = None
+        totals["word_accuracy"] = None
+        if totals["characters"]:
+            totals["char_accuracy"] = 100.0 * (totals["characters"] - totals["errors"]) / totals["characters"]
+        if totals["words"]:
+            totals["word_accuracy"] = 100.0 * (totals["words"] - totals["missed_words"]) / totals["words"]
+        accuracies[category] = totals
+
+    return accuracies
+
+
+def load_config(config_args):
+    # the configuration is parsed from the command line, only the configuration entries are given to it
+    from configuration.configuration_handler import ConfigurationHandler
+    sys.argv = sys.argv[:1] + config_args
+    config_handler = ConfigurationHandler(first_init=True, fill_unkown_args=True,
+                                          coded_configuration_paths=[CODED_CONFIGURATION_PATH_VOTER,
+                                                                     CODED_CONFIGURATION_PATH_DB_READER])
+    return config_handler.get_config()
+
+
+def get_git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPOSITORY_ROOT,
+                                       stderr=subprocess.DEVNULL, universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="end-to-end benchmark over the BUS3B test corpus, other "
+                                                 "arguments are configuration entries for the main scripts")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, help="stages to run")
+    parser.add_argument("--results", default=DEFAULT_RESULTS_FILE, help="JSON lines file the run is appended to")
+    parser.add_argument("--label", default="", help="name of the run in the results file")
+    args, config_args = parser.parse_known_args()
+
+    os.chdir(REPOSITORY_ROOT)
+    sys.path.insert(0, REPOSITORY_ROOT)
+    config = load_config(config_args)
+
+    stage_results = {}
+    accuracies = None
+    for stage in STAGES:
+        if stage not in args.stages:
+            continue
+        print("benchmark stage:", stage)
+        if stage in STAGE_SCRIPTS:
+            script_args = config_args + (VOTE_STAGE_ARGS if stage == "vote" else [])
+            stage_result = run_script_stage(stage, STAGE_SCRIPTS[stage], script_args)
+            stage_results[stage] = stage_result
+            if stage_result.returncode != 0:
+                print("stage", stage, "failed with return code", stage_result.returncode)
+                break
+        else:
+            stage_result = StageResult(stage)
+            start = time.perf_counter()
+            accuracies = validate_results(config, config.OUTPUT_ROOT_PATH)
+            stage_result.wall_time = time.perf_counter() - start
+            # the validation runs in this process, this is the peak of the whole benchmark process
+            stage_result.peak_rss_mb = maxrss_to_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+            stage_result.returncode = 0
+            stage_results[stage] = stage_result
+
+    # throughput of the voting, counted on the main result
+    main_category = "msa_best" if config.DO_MSA_BEST else "ndist_keying"
+    pages, lines, chars = count_result_texts(find_result_files(config.OUTPUT_ROOT_PATH, main_category))
+    throughput = None
+    vote_result = stage_results.get("vote")
+    if vote_result is not None and vote_result.returncode == 0 and vote_result.wall_time:
+        throughput = {
+            "pages_per_s": pages / vote_result.wall_time,
+            "lines_per_s": lines / vote_result.wall_time,
+            "chars_per_s": chars / vote_result.wall_time,
+        }
+
+    run = {
+        "label": args.label,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_revision": get_git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config_args": config_args,
+        "main_result": main_category,
+        "corpus": {"pages": pages, "lines": lines, "chars": chars},
+        "stages": {stage: stage_result.to_dict() for stage, stage_result in stage_results.items()},
+        "total_wall_time_s": sum(stage_result.wall_time for stage_result in stage_results.values()),
+        "throughput": throughput,
+        "accuracy": accuracies,
+    }
+
+    results_dir = os.path.dirname(args.results)
+    if results_dir:
+        os.makedirs(results_dir, exist_ok=True)
+    with open(args.results, 'a', encoding="utf-8") as results_file:
+        results_file.write(json.dumps(run, sort_keys=True) + "\n")
+
+    print(json.dumps(run, indent=2, sort_keys=True))
+    failed = any(stage_result.returncode != 0 for stage_result in stage_results.values())
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+    Startup budget check, imports the modules which the command line tools and pool workers
+    load before they touch data, each in a fresh interpreter with 'python -X importtime'.
+    Fails if a module takes longer than its budget or if it pulls in one of the heavy optional
+    dependencies, which must only be loaded when their feature is enabled.
+
+    run from the repository root:
+        python -m benchmarks.check_import_time
+        python -m benchmarks.check_import_time --budget-ms 800 --module tableparser
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+
+# modules on the startup path of the main scripts and the workers
+CHECKED_MODULES = [
+    "tableparser",
+    "multi_sequence_alignment.msa_handler",
+    "ocr_validation.ocrolib_edist",
+    "vocabulary_checker.vocabulary_checker",
+    "machine_learning_components.special_character_predictor",
+]
+
+# top level packages which are only allowed to load on demand (plotting, msa with scikit-bio,
+# predictor, spellchecker, edist filters, biopython alignment)
+FORBIDDEN_PACKAGES = ["matplotlib", "skbio", "keras", "tensorflow", "pysymspell", "scipy", "Bio"]
+
+DEFAULT_BUDGET_MS = 1500
+
+
+def measure_import(module, python=sys.executable):
+    """
+    Import a module in a fresh interpreter
+    :param module: dotted module name
+    :return: tuple (total import time in ms, set of imported top level packages, error output or None)
+    """
+    repository_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.run([python, "-X", "importtime", "-c", "import " + module],
+                             cwd=repository_root, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             universal_newlines=True)
+
+    total_us = 0
+    packages = set()
+    other_output = []
+    for line in process.stderr.splitlines():
+        # format: 'import time: self [us] | cumulative | imported package'
+        if not line.startswith("import time:"):
+            other_output.append(line)
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # header line
+        name = fields[2]
+        package = name.strip().split(".")[0]
+        packages.add(package)
+        # entries without indentation are imported directly, their cumulative times add up to the total
+        if name.startswith(" ") and not name.startswith("  "):
+            total_us += int(fields[1])
+
+    error = "\n".join(other_output) if process.returncode != 0 else None
+    return total_us / 1000.0, packages, error
+
+
+def main():
+    parser = argparse.ArgumentParser(description="check the import time of the startup modules")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="maximum import time of each module in milliseconds")
+    parser.add_argument("--module", action="append", default=None,
+                        help="module to check, can be given multiple times (default: the startup modules)")
+    args = parser.parse_args()
+
+    modules = args.module if args.module else CHECKED_MODULES
+    failed = False
+
+    print("{:<60} {:>10} {:>10}  {}".format("module", "ms", "budget", "status"))
+    for module in modules:
+        import_ms, packages, error = measure_import(module)
+        heavy_packages = sorted(set(FORBIDDEN_PACKAGES) & packages)
+
+        if error is not None:
+            status = "IMPORT ERROR"
+        elif heavy_packages:
+            status = "LOADS " + ", ".join(heavy_packages)
+        elif import_ms > args.budget_ms:
+            status = "OVER BUDGET"
+        else:
+            status = "ok"
+
+        print("{:<60} {:>10.1f} {:>10.1f}  {}".format(module, import_ms, args.budget_ms, status))
+        if error is not None:
+            print(error)
+        if status != "ok":
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
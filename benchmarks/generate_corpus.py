@@ -0,0 +1,478 @@
+"""
+    Generator of synthetic multi-engine corpora for load tests of the ingest and the voting.
+
+    The groundtruth pages (i.e. Testfiles/BUS3B_Test/groundtruth) are set on a page grid and each
+    engine "recognizes" them with its own error model:
+
+        substitutions       characters are confused with their groups from 'SIMILAR_CHARS' (the similar
+                            characters of the search space processor), other characters with one of their kind
+        dropped characters  characters which the engine doesn't output
+        spacing errors      letter spaced words ('s p a c e d', like 'TextUnspacer' handles them)
+                            and words which are merged with the next word
+        dropped lines       lines which are missing in the output of the engine
+        confidences         normal distributions per engine, lower for the wrong characters,
+                            word confidences like the engine computes them (mean, product, minimum)
+
+    The groundtruth pages are repeated until the requested number of pages is reached, each copy
+    gets its own errors. Everything is deterministic for a seed, independent of the number of workers.
+
+    outputs, below the output folder:
+        input/<db>/<engine>/synthetic/<table>.hocr      --format hocr, folder structure of the BUS3B input,
+                                                        read it with main_prepare_dataset.py and
+                                                        --INPUT_FILEGLOB <output>/input/**/**/**/*.
+        sql/<db>.db                                     --format sql, the character records like
+                                                        'HocrSQLComparator.dict2sql' writes them, preprocess
+                                                        with main_prepare_dataset.py --HOCR2SQL False
+                                                        --DBDIR_READER <output>/sql/
+        groundtruth/<db>/<table>.txt                    the groundtruth of each table, for the validation
+
+    run from the repository root:
+        python -m benchmarks.generate_corpus --pages 1000
+        python -m benchmarks.generate_corpus --pages 50000 --pages-per-db 500 --format sql --workers 8
+        python -m benchmarks.generate_corpus --engines abbyy tess ocro tess --error-scale 2.0
+"""
+
+import argparse
+import glob
+import html
+import math
+import multiprocessing
+import os
+import random
+import time
+
+
+DEFAULT_GROUNDTRUTH_DIR = "./Testfiles/BUS3B_Test/groundtruth"
+DEFAULT_OUTPUT_DIR = "./benchmark_results/synthetic_corpus"
+OUTPUT_FORMATS = ["hocr", "sql", "both"]
+OCR_PROFILE = "synthetic"
+
+# page grid, in pixels like the BUS3B scans
+PAGE_WIDTH = 2560
+PAGE_HEIGHT = 3300
+PAGE_MARGIN_LEFT = 200
+PAGE_MARGIN_TOP = 150
+CHAR_WIDTH = 24
+CHAR_HEIGHT = 48
+LINE_HEIGHT = 60
+
+# groups of characters which the engines confuse with each other, the groups of
+# 'SearchSpaceProcessor.similar_chars' (which are created with the processor and need the configuration)
+SIMILAR_CHARS = ["oö", "<o", "OÖ", "0O9", "dö", "lj1", "Il", "uü", "UÜO", "aä", "AÄ", ":;", "-¬", "\"'", "CGc",
+                 ".,", ",;", "vV", "wW", "ilt1.", "rn", "%m", "&é", "eé"]
+
+# replacements for characters which are in none of the similar character groups
+FALLBACK_LETTERS = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+FALLBACK_DIGITS = "0123456789"
+FALLBACK_PUNCTUATION = ".,:;'-"
+
+
+class EngineErrorModel(object):
+
+    def __init__(self, ocr, folder, substitution_rate, char_drop_rate, letter_spacing_rate, word_merge_rate,
+                 line_drop_rate, conf_mean, conf_std, error_conf_mean, word_conf="mean", box_jitter=4):
+        """
+        :param ocr: engine name in the character records, like the reader stores it
+        :param folder: engine folder of the input structure
+        :param substitution_rate: probability of a character to be replaced
+        :param char_drop_rate: probability of a character to be missing
+        :param letter_spacing_rate: probability of a word to be letter spaced
+        :param word_merge_rate: probability of a word to be merged with the next word
+        :param line_drop_rate: probability of a line to be missing
+        :param conf_mean: mean confidence (0-100) of the correct characters
+        :param conf_std: standard deviation of the confidences
+        :param error_conf_mean: mean confidence of the substituted characters
+        :param word_conf: word confidence from the character confidences: 'mean', 'product' or 'min'
+        :param box_jitter: maximum shift of the boxes in pixels, has to stay below the line matching threshold
+        """
+        self.ocr = ocr
+        self.folder = folder
+        self.substitution_rate = substitution_rate
+        self.char_drop_rate = char_drop_rate
+        self.letter_spacing_rate = letter_spacing_rate
+        self.word_merge_rate = word_merge_rate
+        self.line_drop_rate = line_drop_rate
+        self.conf_mean = conf_mean
+        self.conf_std = conf_std
+        self.error_conf_mean = error_conf_mean
+        self.word_conf = word_conf
+        self.box_jitter = box_jitter
+
+    def scaled(self, error_scale, suffix=""):
+        """
+        :return: copy of the model with all error rates multiplied by the scale
+        """
+        return EngineErrorModel(self.ocr + suffix, self.folder + suffix,
+                                min(1.0, self.substitution_rate * error_scale),
+                                min(1.0, self.char_drop_rate * error_scale),
+                                min(1.0, self.letter_spacing_rate * error_scale),
+                                min(1.0, self.word_merge_rate * error_scale),
+                                min(1.0, self.line_drop_rate * error_scale),
+                                self.conf_mean, self.conf_std, self.error_conf_mean, self.word_conf, self.box_jitter)
+
+
+# the rates are in the range of the errors of the engines on the BUS3B corpus
+ENGINE_MODELS = {
+    "abbyy": EngineErrorModel("Abbyy", "abbyy", substitution_rate=0.01, char_drop_rate=0.003,
+                              letter_spacing_rate=0.01, word_merge_rate=0.01, line_drop_rate=0.01,
+                              conf_mean=90.0, conf_std=8.0, error_conf_mean=55.0, word_conf="mean"),
+    "tess": EngineErrorModel("Tesseract", "tess", substitution_rate=0.03, char_drop_rate=0.01,
+                             letter_spacing_rate=0.02, word_merge_rate=0.02, line_drop_rate=0.02,
+                             conf_mean=85.0, conf_std=10.0, error_conf_mean=50.0, word_conf="min"),
+    "ocro": EngineErrorModel("Ocropus", "ocropy", substitution_rate=0.02, char_drop_rate=0.005,
+                             letter_spacing_rate=0.005, word_merge_rate=0.03, line_drop_rate=0.015,
+                             conf_mean=95.0, conf_std=5.0, error_conf_mean=70.0, word_conf="product"),
+}
+
+
+def create_engine_models(engine_keys, error_scale):
+    """
+    :param engine_keys: keys of 'ENGINE_MODELS', a repeated key gets a numbered copy of the model
+    :return: list of error models
+    """
+    models = []
+    seen = {}
+    for key in engine_keys:
+        seen[key] = seen.get(key, 0) + 1
+        suffix = "" if seen[key] == 1 else "_" + str(seen[key])
+        models.append(ENGINE_MODELS[key].scaled(error_scale, suffix))
+    return models
+
+
+def create_similar_char_map():
+    """
+    :return: dict char -> list of the characters which are confused with it
+    """
+    similar_char_map = {}
+    for simchars in SIMILAR_CHARS:
+        for char in simchars:
+            others = similar_char_map.setdefault(char, [])
+            others.extend(other for other in simchars if other != char and other not in others)
+    return similar_char_map
+
+
+def read_groundtruth_pages(groundtruth_dir):
+    """
+    :return: list of tuples (page name, list of lines), sorted by path
+    """
+    pages = []
+    for path in sorted(glob.glob(os.path.join(groundtruth_dir, "**", "*.txt"), recursive=True)):
+        with open(path, 'r', encoding="utf-8", errors="replace") as file:
+            lines = [line.rstrip("\n").expandtabs() for line in file]
+        name = os.path.basename(path).split(".")[0]
+        pages.append((name, lines))
+    return pages
+
+
+def split_line_words(line):
+    """
+    :return: list of words, each word is a list of (char, column)
+    """
+    words = []
+    current_word = []
+    for column, char in enumerate(line):
+        if char.isspace():
+            if current_word:
+                words.append(current_word)
+                current_word = []
+            continue
+        current_word.append((char, column))
+    if current_word:
+        words.append(current_word)
+    return words
+
+
+class PageGenerator(object):
+
+    def __init__(self, models, similar_char_map):
+        self.models = models
+        self.similar_char_map = similar_char_map
+
+    def substitute(self, rng, char):
+        similar_chars = self.similar_char_map.get(char)
+        if similar_chars:
+            return rng.choice(similar_chars)
+        if char.isdigit():
+            return rng.choice(FALLBACK_DIGITS)
+        if char.isalpha():
+            return rng.choice(FALLBACK_LETTERS)
+        return rng.choice(FALLBACK_PUNCTUATION)
+
+    @staticmethod
+    def draw_conf(rng, mean, std):
+        return min(100.0, max(0.0, rng.gauss(mean, std)))
+
+    def recognize_line(self, rng, model, words):
+        """
+        Apply the error model to the words of one groundtruth line
+        :return: list of recognized words, each word is a list of (char, confidence, column)
+        """
+        recognized = []
+        for word in words:
+            chars = []
+            for char, column in word:
+                if rng.random() < model.char_drop_rate:
+                    continue
+                if rng.random() < model.substitution_rate:
+                    chars.append((self.substitute(rng, char), self.draw_conf(rng, model.error_conf_mean,
+                                                                             model.conf_std), column))
+                else:
+                    chars.append((char, self.draw_conf(rng, model.conf_mean, model.conf_std), column))
+            if not chars:
+                continue
+
+            if rng.random() < model.letter_spacing_rate:
+                # each character becomes a word, like 's p a c e d'
+                recognized.extend([char_entry] for char_entry in chars)
+            elif recognized and rng.random() < model.word_merge_rate:
+                recognized[-1].extend(chars)
+            else:
+                recognized.append(chars)
+        return recognized
+
+    @staticmethod
+    def word_confidence(model, word):
+        confs = [conf for char, conf, column in word]
+        if model.word_conf == "product":
+            return 100.0 * math.exp(sum(math.log(max(conf, 0.01) / 100.0) for conf in confs))
+        if model.word_conf == "min":
+            return min(confs)
+        return sum(confs) / len(confs)
+
+    def generate_page(self, rng, groundtruth_lines):
+        """
+        :return: dict engine index -> list of lines, each line is a tuple (line bbox, list of words),
+                 each word is a tuple (word bbox, word confidence, list of (char, confidence))
+        """
+        line_words = [split_line_words(line) for line in groundtruth_lines]
+        engine_lines = {}
+        for engine_index, model in enumerate(self.models):
+            lines = []
+            for line_index, words in enumerate(line_words):
+                if not words or rng.random() < model.line_drop_rate:
+                    continue
+                recognized = self.recognize_line(rng, model, words)
+                if not recognized:
+                    continue
+
+                jitter_x = rng.randint(-model.box_jitter, model.box_jitter)
+                jitter_y = rng.randint(-model.box_jitter, model.box_jitter)
+                y0 = PAGE_MARGIN_TOP + line_index * LINE_HEIGHT + jitter_y
+                y1 = y0 + CHAR_HEIGHT
+
+                output_words = []
+                for word in recognized:
+                    x0 = PAGE_MARGIN_LEFT + word[0][2] * CHAR_WIDTH + jitter_x
+                    x1 = PAGE_MARGIN_LEFT + (word[-1][2] + 1) * CHAR_WIDTH + jitter_x
+                    output_words.append(((x0, y0, x1, y1), self.word_confidence(model, word),
+                                         [(char, conf) for char, conf, column in word]))
+
+                line_bbox = (output_words[0][0][0], y0, output_words[-1][0][2], y1)
+                lines.append((line_bbox, output_words))
+            engine_lines[engine_index] = lines
+        return engine_lines
+
+
+def format_bbox(bbox):
+    return "bbox {} {} {} {}".format(*bbox)
+
+
+def format_word_hocr(word_index, word_bbox, word_conf, chars):
+    text = html.escape("".join(char for char, conf in chars))
+    confs = " ".join("{:.2f}".format(conf) for char, conf in chars)
+    return "<span class='ocrx_word' id='word_{}' title='{}; x_wconf {:.2f}; x_confs {}'>{}</span>".format(
+        word_index, format_bbox(word_bbox), word_conf, confs, text)
+
+
+def write_hocr(filepath, model, lines):
+    """
+    Writes the lines of one engine as hocr, ocropus has its lines directly in the page like
+    the ocropy output, the others have areas and paragraphs like tesseract
+    """
+    directory = os.path.dirname(filepath)
+    if not os.path.exists(directory):
+        os.makedirs(directory, exist_ok=True)
+
+    flat_lines = model.folder.startswith("ocropy")
+    word_index = 0
+    with open(filepath, 'w', encoding="utf-8") as file:
+        file.write("<?xml version='1.0' encoding='UTF-8'?>\n"
+                   "<html xmlns='http://www.w3.org/1999/xhtml' xml:lang='en' lang='en'>\n"
+                   "<head><title>OCR Results</title>\n"
+                   "<meta http-equiv='content-type' content='text/html; charset=utf-8' />\n"
+                   "<meta name='ocr-system' content='synthetic " + model.ocr + "' />\n"
+                   "<meta name='ocr-capabilities' content='ocr_page ocr_carea ocr_par ocr_line ocrx_word' />\n"
+                   "</head>\n<body>\n")
+        file.write("<div class='ocr_page' id='page_1' title='bbox 0 0 {} {}'>\n".format(PAGE_WIDTH, PAGE_HEIGHT))
+        for line_index, (line_bbox, words) in enumerate(lines):
+            word_spans = []
+            for word_bbox, word_conf, chars in words:
+                word_index += 1
+                word_spans.append(format_word_hocr(word_index, word_bbox, word_conf, chars))
+            line_span = "<span class='ocr_line' id='line_{}' title='{}'>{}</span>".format(
+                line_index + 1, format_bbox(line_bbox), " ".join(word_spans))
+            if flat_lines:
+                file.write(" " + line_span + "\n")
+            else:
+                file.write(" <div class='ocr_carea' id='block_{0}' title='{1}'><p class='ocr_par' id='par_{0}' "
+                           "title='{1}'>{2}</p></div>\n".format(line_index + 1, format_bbox(line_bbox), line_span))
+        file.write("</div>\n</body>\n</html>\n")
+
+
+# columns of 'NativeOCRLoader.add_char_record'
+RECORD_COLUMNS = ["ocr", "ocr_profile", "line_idx", "word_idx", "char_idx", "char", "char_eval", "char_weight",
+                  "x_confs", "w_confs", "line_match", "line_x0", "line_x1", "line_y0", "line_y1",
+                  "word_x0", "word_x1", "word_y0", "word_y1"]
+
+
+def create_records(models, engine_lines):
+    """
+    Character records of all engines of one page
+    :return: list of tuples with the values of 'RECORD_COLUMNS'
+    """
+    from n_dist_keying.native_ocr_loader import NativeOCRLoader
+
+    records = []
+    for engine_index, model in enumerate(models):
+        for line_index, (line_bbox, words) in enumerate(engine_lines[engine_index]):
+            line_values = (line_bbox[0], line_bbox[2], line_bbox[1], line_bbox[3])
+            for word_index, (word_bbox, word_conf, chars) in enumerate(words):
+                word_values = (word_bbox[0], word_bbox[2], word_bbox[1], word_bbox[3])
+                for char_index, (char, conf) in enumerate(chars):
+                    records.append((model.ocr, OCR_PROFILE, line_index, word_index, char_index, char, "", -1.0,
+                                    conf + NativeOCRLoader.XCONF_OFFSET, word_conf, -1) + line_values + word_values)
+    return records
+
+
+def write_sql_table(connection, table, records, batch_size):
+    """
+    Writes the records of one page as table, like 'HocrSQLComparator.dict2sql' creates it
+    :param connection: sqlite3 connection, the inserts through the engine spend most time in
+                       compiling the statement parameters
+    """
+    import pandas as pd
+
+    dataframe = pd.DataFrame.from_records(records, columns=RECORD_COLUMNS)
+    dataframe = dataframe.set_index(['ocr', 'line_idx', 'word_idx', 'char_idx'])
+    with connection:
+        dataframe.to_sql(table, connection, if_exists='replace', chunksize=batch_size)
+
+
+class GeneratorJob(object):
+
+    def __init__(self, args, db_index, page_indices):
+        self.args = args
+        self.db_index = db_index
+        self.page_indices = page_indices
+
+
+def generate_database(job):
+    """
+    Generates all pages of one database, runs in a worker process
+    :return: tuple (pages, groundtruth lines, engine lines, characters)
+    """
+    args = job.args
+    models = create_engine_models(args.engines, args.error_scale)
+    generator = PageGenerator(models, create_similar_char_map())
+    groundtruth_pages = read_groundtruth_pages(args.groundtruth)
+
+    dbname = "synthetic_{:04d}".format(job.db_index)
+    write_hocr_files = args.format in ("hocr", "both")
+    write_sql = args.format in ("sql", "both")
+
+    sql_url = None
+    sql_pool_connection = None
+    sql_connection = None
+    batch_size = None
+    if write_sql:
+        from n_dist_keying.database_engine_pool import DatabaseEnginePool
+        sql_dir = os.path.join(args.output, "sql")
+        os.makedirs(sql_dir, exist_ok=True)
+        sql_url = "sqlite:////" + os.path.abspath(os.path.join(sql_dir, dbname + ".db"))
+        # the connection of the pooled engine is tuned with the sqlite pragmas, the tables are
+        # written through the plain sqlite3 connection below it
+        sql_pool_connection = DatabaseEnginePool.get_engine(sql_url).raw_connection()
+        sql_connection = sql_pool_connection.connection
+        batch_size = DatabaseEnginePool.get_batch_size()
+
+    groundtruth_dir = os.path.join(args.output, "groundtruth", dbname)
+    os.makedirs(groundtruth_dir, exist_ok=True)
+
+    number_of_groundtruth_lines = 0
+    number_of_engine_lines = 0
+    number_of_chars = 0
+    for page_index in job.page_indices:
+        page_name, groundtruth_lines = groundtruth_pages[page_index % len(groundtruth_pages)]
+        table = "{}x{:07d}".format(page_name, page_index)
+        # each page has its own random sequence, so the result doesn't depend on the distribution to the workers
+        rng = random.Random(args.seed * 1000003 + page_index)
+        engine_lines = generator.generate_page(rng, groundtruth_lines)
+
+        with open(os.path.join(groundtruth_dir, table + ".txt"), 'w', encoding="utf-8") as file:
+            file.write("\n".join(groundtruth_lines) + "\n")
+
+        if write_hocr_files:
+            for engine_index, model in enumerate(models):
+                filepath = os.path.join(args.output, "input", dbname, model.folder, OCR_PROFILE, table + ".hocr")
+                write_hocr(filepath, model, engine_lines[engine_index])
+
+        if write_sql:
+            write_sql_table(sql_connection, table, create_records(models, engine_lines), batch_size)
+
+        number_of_groundtruth_lines += sum(1 for line in groundtruth_lines if line.strip())
+        for lines in engine_lines.values():
+            number_of_engine_lines += len(lines)
+            number_of_chars += sum(len(chars) for line_bbox, words in lines for word_bbox, conf, chars in words)
+
+    if sql_pool_connection is not None:
+        sql_pool_connection.close()
+        DatabaseEnginePool.dispose_all()
+    return len(job.page_indices), number_of_groundtruth_lines, number_of_engine_lines, number_of_chars
+
+
+def main():
+    parser = argparse.ArgumentParser(description="generate a synthetic multi-engine corpus from groundtruth texts")
+    parser.add_argument("--groundtruth", default=DEFAULT_GROUNDTRUTH_DIR, help="folder with the groundtruth .txt files")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_DIR, help="output folder")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default="hocr", help="hocr input files or sqlite tables")
+    parser.add_argument("--pages", type=int, default=None,
+                        help="number of generated pages (default: each groundtruth page once)")
+    parser.add_argument("--pages-per-db", type=int, default=100, help="number of pages (tables) per database")
+    parser.add_argument("--engines", nargs="+", choices=sorted(ENGINE_MODELS), default=["abbyy", "tess", "ocro"],
+                        help="error models of the engines, a repeated model adds another engine")
+    parser.add_argument("--error-scale", type=float, default=1.0, help="factor for all error rates")
+    parser.add_argument("--seed", type=int, default=1969, help="seed of the random errors")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes, one database each")
+    args = parser.parse_args()
+
+    number_of_groundtruth_pages = len(read_groundtruth_pages(args.groundtruth))
+    if number_of_groundtruth_pages == 0:
+        parser.error("no groundtruth .txt files in " + args.groundtruth)
+    number_of_pages = args.pages if args.pages is not None else number_of_groundtruth_pages
+
+    jobs = []
+    for db_index, first_page in enumerate(range(0, number_of_pages, args.pages_per_db)):
+        page_indices = range(first_page, min(first_page + args.pages_per_db, number_of_pages))
+        jobs.append(GeneratorJob(args, db_index, page_indices))
+
+    print("generating", number_of_pages, "pages in", len(jobs), "databases for the engines:", " ".join(args.engines))
+    start = time.perf_counter()
+    totals = [0, 0, 0, 0]
+    if args.workers > 1:
+        with multiprocessing.Pool(args.workers) as pool:
+            results = list(pool.imap_unordered(generate_database, jobs))
+    else:
+        results = [generate_database(job) for job in jobs]
+    for result in results:
+        totals = [total + value for total, value in zip(totals, result)]
+    elapsed = time.perf_counter() - start
+
+    pages, groundtruth_lines, engine_lines, chars = totals
+    print("pages: {}, groundtruth lines: {}, engine lines: {}, characters: {}".format(pages, groundtruth_lines,
+                                                                                  engine_lines, chars))
+    print("{:.1f}s, {:.0f} engine lines/s, output in {}".format(elapsed, engine_lines / elapsed if elapsed else 0.0,
+                                                                 os.path.abspath(args.output)))
+
+
+if __name__ == '__main__':
+    main()
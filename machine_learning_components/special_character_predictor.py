@@ -3,8 +3,6 @@ from akf_corelib.conditional_print import ConditionalPrint
 
 
 from pickle import load
-from keras.models import load_model
-from keras.preprocessing.sequence import pad_sequences
 
 
 
@@ -20,6 +18,11 @@ class SpecialCharPredictor():
 
 
     def load_prediction_model(self):
+        # keras (and its tensorflow backend) is loaded here and not on import, it takes seconds
+        from keras.models import load_model
+        from keras.preprocessing.sequence import pad_sequences
+        self.pad_sequences = pad_sequences
+
         # load model and tokenizer for aufsichtsrat prediction
         self.model_aufsichtsrat = load_model(self.config.PREDICTOR_AUFSICHTSRAT_MODEL)
         self.tokenizer_aufsichtsrat = load(open(self.config.PREDICTOR_AUFSICHTSRAT_TOKENIZER, 'rb'))
@@ -35,7 +38,7 @@ class SpecialCharPredictor():
             # encode the text as integer
             encoded = tokenizer.texts_to_sequences([in_text])[0]
             # truncate sequences to a fixed length
-            encoded = pad_sequences([encoded], maxlen=seq_length, truncating='pre')
+            encoded = self.pad_sequences([encoded], maxlen=seq_length, truncating='pre')
             # predict probabilities for each word
             yhat = model.predict_classes(encoded, verbose=0)
             # map predicted word index to word
@@ -12,6 +12,10 @@ from pathlib import Path
 from configuration.configuration_handler import ConfigurationHandler
 from tableparser import TableParser
 from akf_corelib.database_handler import DatabaseHandler
+from n_dist_keying.msa_result_cache import MsaResultCache
+from n_dist_keying.result_database_writer import RESULTS_TABLE
+from n_dist_keying.table_prefetcher import TablePrefetcher
+from n_dist_keying.lazy_print import LazyPrint
 import os
 
 # fetch configurations  (here it's the bus3b unlv-test configuration, these files come with the repository)
@@ -22,6 +26,7 @@ config_handler = ConfigurationHandler(first_init=True, fill_unkown_args=True, \
                                       coded_configuration_paths=[CODED_CONFIGURATION_PATH_VOTER, CODED_CONFIGURATION_PATH_DB_READER])
 
 config = config_handler.get_config()
+LazyPrint.set_level(getattr(config, 'LOG_LEVEL', LazyPrint.DEFAULT_LEVEL))
 dbdir = 'sqlite:///'+str(Path(config.DB_DIR_VOTER).absolute())
 dh = DatabaseHandler(dbdir=str(Path(config.DB_DIR_VOTER).absolute()))
 dh.fetch_gtfiles(config.GROUNDTRUTH_FILEGLOB, gtflag=False)
@@ -36,50 +41,90 @@ tableparser = TableParser(config)
 table_ctr = 0
 
 # possibility to delete dir on restart (comment if you don't wish overwrite)
-tableparser.delete_output_dir()
+if not config.RESUME_RUN:
+    tableparser.delete_output_dir()
 tableparser.create_output_dir()
 
-count = 1
+# collect the tables of all databases, the stored keying results are no input table
+tables_to_parse = []
+databases = {}
 for db in dh.db:
-    print("Parsing database:", db)
-    files = dh.get_tablenames_from_db(db)
+    dbpath = 'sqlite:////' + db
+    databases[dbpath] = db
+    for file in dh.get_tablenames_from_db(db):
+        if file == RESULTS_TABLE:
+            continue
+        tables_to_parse.append((dbpath, file))
 
-    # get the filename
-    temp = os.path.splitext(db)[0]
-    db_keyname = os.path.basename(temp)  # this returns just the filename
+# the next tables are loaded in the background while a table is voted, on resume the finished
+# tables are skipped (and their outputs kept) when the prefetcher comes to them
+table_prefetcher = TablePrefetcher(tableparser.skip_finished_tables(tables_to_parse), config.TABLE_PREFETCH_DEPTH)
 
-    if config.DO_ISRI_VAL:
-        # get the corresponding ground-truths for the key in database
-        files_gt = filestructs_gt[db_keyname]
+count = 1
+current_db = None
+for prefetched_table in table_prefetcher:
+    db = databases[prefetched_table.dbpath]
+    if db != current_db:
+        current_db = db
+        print("Parsing database:", db)
 
-    for file in files:
-        count += 1
-        table = file
-        dbpath = 'sqlite:////' + db
-        print("Parsing table: ", table, "in database: ", dbpath)
+        # get the filename
+        temp = os.path.splitext(db)[0]
+        db_keyname = os.path.basename(temp)  # this returns just the filename
 
-        table_ctr += 1
+        if config.DO_ISRI_VAL:
+            # get the corresponding ground-truths for the key in database
+            files_gt = filestructs_gt[db_keyname]
 
-        # parse the table ( which means combine all entries in database matching the table key), return generated
-        # .txt files for validation against groundtruth
-        path_created_file, additional_created_files = tableparser.parse_a_table(dbpath, table)
+    count += 1
+    table = prefetched_table.table
+    dbpath = prefetched_table.dbpath
+    print("Parsing table: ", table, "in database: ", dbpath)
+    if prefetched_table.exception is not None:
+        print("Prefetching the table failed, loading it again:", prefetched_table.exception)
 
-        # if validation is active search the corresponding groundtruth and check each
-        if config.DO_ISRI_VAL:
-            foundgt = None
-            for gt_key in files_gt:
-                gt_file = files_gt[gt_key]
-                if table in gt_key:
-                    foundgt = gt_file.path
-                    print("found:", foundgt)
-            if foundgt is not None:
-                tableparser.validate_table_against_gt(path_created_file, foundgt)
-                for additional_file in additional_created_files:
-                    # this validates the original outputs
-                    tableparser.validate_table_against_gt(additional_file,foundgt)
-
-
-# if validation was done there are lot's of validations done
+    table_ctr += 1
+
+    # parse the table ( which means combine all entries in database matching the table key), return generated
+    # .txt files for validation against groundtruth
+    path_created_file, additional_created_files = tableparser.parse_a_table(dbpath, table,
+                                                                            prefetched_table.dataframe_wrapper)
+
+    # if validation is active search the corresponding groundtruth and check each
+    if config.DO_ISRI_VAL:
+        # the created files have to be written completely for validation
+        tableparser.wait_for_outputs()
+        foundgt = None
+        for gt_key in files_gt:
+            gt_file = files_gt[gt_key]
+            if table in gt_key:
+                foundgt = gt_file.path
+                print("found:", foundgt)
+        if foundgt is not None:
+            tableparser.validate_table_against_gt(path_created_file, foundgt)
+            for additional_file in additional_created_files:
+                # this validates the original outputs
+                tableparser.validate_table_against_gt(additional_file,foundgt)
+
+    # the table is skipped if the run is resumed
+    tableparser.record_finished_table(dbpath, table, path_created_file, additional_created_files)
+
+# write the remaining output files
+tableparser.stop_output_thread()
+
+if config.RESUME_RUN:
+    print("Resumed the run, skipped", tableparser.number_of_skipped_tables, "finished tables")
+    if tableparser.aborted_tables:
+        print("Skipped", len(tableparser.aborted_tables), "tables which were aborted by the table watchdog:",
+              ", ".join(tableparser.aborted_tables))
+
+if config.DO_MSA_BEST and config.PRINT_CONSENSUS_TIERS:
+    tableparser.pipeline_context.consensus_checker.print_tier_shares()
+if config.DO_MSA_BEST and config.PRINT_MSA_RESULT_CACHE_STATS:
+    MsaResultCache.print_stats()
+
+# if validation was done there are lot's of validations done, on resume the reports of the
+# skipped tables are still in the output folders and go into the summaries as well
 if config.SUMMARIZE_ISRI_REPORTS is True:
     # for each result category create a summarized report for the inputs (for comparison)
     tableparser.create_isri_reports(dh.db, filestructs_gt, "abbyy")
@@ -91,3 +136,8 @@ if config.SUMMARIZE_ISRI_REPORTS is True:
         tableparser.create_isri_reports(dh.db, filestructs_gt, "ndist_keying")
     if config.DO_MSA_BEST:
         tableparser.create_isri_reports(dh.db, filestructs_gt, "msa_best")
+
+# timers and counters of the stages for each table and the whole run
+tableparser.write_stage_metrics()
+# ranking of the slowest tables with their top functions, if the tables are profiled
+tableparser.write_profile_report()
@@ -1,12 +1,16 @@
 import inspect
-from Bio import pairwise2
 from n_dist_keying.ocr_voter import OCRVoter
 from akf_corelib.random import Random
 import numpy as np
 from akf_corelib.typecasts import TypeCasts
-from akf_corelib.conditional_print import ConditionalPrint
+from n_dist_keying.lazy_print import LazyPrint
 from configuration.configuration_handler import ConfigurationHandler
 from n_dist_keying.table_handler import TableHandler
+from n_dist_keying.n_distance_voter import NDistanceVoter
+from n_dist_keying.distance_matrix import DistanceMatrix
+from n_dist_keying.voter_settings import VoterSettings
+from n_dist_keying.stage_metrics import NO_METRICS
+from n_dist_keying.voting_budget import NO_BUDGET, VotingBudgetExceeded
 
 class GapConfig(object):
 
@@ -35,12 +39,20 @@ class MsaSimilarities(object):
 
 class MsaHandler(object):
 
-    def __init__(self, predictor = None):
+    def __init__(self, predictor = None, settings=None):
+        """
+        :param settings: compiled 'VoterSettings', created from the configuration if None
+        """
         config_handler = ConfigurationHandler(first_init=False)
         self.config = config_handler.get_config()
-        self.cpr = ConditionalPrint(self.config.PRINT_MSA_HANDLER, self.config.PRINT_EXCEPTION_LEVEL,
-                                    self.config.PRINT_WARNING_LEVEL)
-        self.ocr_voter = OCRVoter()
+        if settings is None:
+            settings = VoterSettings.from_config(self.config)
+        self.settings = settings
+        self.cpr = LazyPrint(self.config.PRINT_MSA_HANDLER, self.config.PRINT_EXCEPTION_LEVEL,
+                             self.config.PRINT_WARNING_LEVEL, "msa_handler")
+        self.ocr_voter = OCRVoter(settings)
+        self.metrics = NO_METRICS
+        self.voting_budget = NO_BUDGET
 
         if predictor != None:
             self.predictor = predictor
@@ -48,7 +60,10 @@ class MsaHandler(object):
 
         self.vocab_checker = None
 
-        if self.config.TABLE_RECOGNITION_ENABLED:
+        # one distance engine for all word columns, all pair distances are used so no early exit
+        self._word_column_voter = NDistanceVoter(None, DistanceMatrix(early_exit=False))
+
+        if self.settings.table_recognition_enabled:
             self.table_handler = TableHandler()
 
     def add_predictor(self,predictor):
@@ -59,6 +74,37 @@ class MsaHandler(object):
         self.vocab_checker = vocab_checker
         self.ocr_voter.add_vocab_checker(vocab_checker)
 
+    def set_metrics(self, metrics):
+        """
+        :param metrics: 'StageMetrics' for the alignments and the voting (also of the ocr voter)
+        """
+        self.metrics = metrics
+        self.ocr_voter.metrics = metrics
+
+    def set_voting_budget(self, voting_budget):
+        """
+        :param voting_budget: 'VotingBudget' which is checked between the words and before the alignments
+        """
+        self.voting_budget = voting_budget
+
+    def vote(self, vote_function, *args):
+        """
+        Calls one of the voting functions of the ocr voter and measures it
+        :return: voted text with and without wildcards
+        """
+        start = self.metrics.clock()
+        best, best_stripped = vote_function(*args)
+        self.metrics.add_time("voting", start)
+        self.metrics.count("chars_voted", len(best_stripped))
+        return best, best_stripped
+
+    def reset_table_state(self):
+        """
+        Resets the state which is carried from line to line, the handler can be reused for the next table then
+        """
+        self.ocr_voter.reset_table_state()
+        self._word_column_voter.reset()
+
     def reduce_double_wildcards(self, line_1, line_2, wildcard_character='¦'):
         list_line_1 = list(line_1)
         list_line_2 = list(line_2)
@@ -238,6 +284,8 @@ class MsaHandler(object):
 
 
     def pairwise_unicode(self, text_1, text_2, wildcard_character='¦', gap_config=None, add_leading_gapchar=False):
+        # biopython is only loaded when an alignment is done, n-distance keying runs don't need it
+        from Bio import pairwise2
 
         if gap_config is None:
             points_identical_char = 2
@@ -264,21 +312,20 @@ class MsaHandler(object):
         wildcard_character_uclist = TypeCasts.convert_string_to_unicode_list(wildcard_character)
 
 
-        def custom_match_fn(charA, charB):
-            similarity_1 = "l1j"
-            similarity_1_uclist = TypeCasts.convert_string_to_unicode_list(similarity_1)
-
-            match = points_identical_char
-            mismatch = penalty_non_identical_char
-            gap_match = points_identical_char-0.5
-            gap_char = wildcard_character_uclist[0]
+        # bound once, the match function is called for each pair of characters
+        match = points_identical_char
+        mismatch = penalty_non_identical_char
+        gap_match = points_identical_char-0.5
+        gap_char = wildcard_character_uclist[0]
+        use_msa_similarities = self.settings.use_msa_similarities
 
+        def custom_match_fn(charA, charB):
             if charA == charB:
                 return match
             elif charA == gap_char or charB == gap_char:
                 return gap_match
 
-            elif self.config.MSA_BEST_USE_MSA_SIMILARITIES:
+            elif use_msa_similarities:
 
                 for sim in MsaSimilarities.sims:
                     if charA in sim and charB in sim:
@@ -286,11 +333,17 @@ class MsaHandler(object):
 
             return mismatch
 
+        # outside of the try, the exception has to reach the ocr_set which falls back to n-distance keying
+        self.voting_budget.check_alignment(len(text_1_uclist), len(text_2_uclist))
+
         try:
             #ms without match fn  match_fn = identity_match_custom(points_identical_char, penality_non_identical_char, wildcard_character),
+            start = self.metrics.clock()
             alignment12 = pairwise2.align.globalcs(text_1_uclist, text_2_uclist,custom_match_fn, penalty_opening_gap,
                                                          penalty_extending_gap, gap_char=wildcard_character_uclist,
                                                          penalize_end_gaps=False)
+            self.metrics.add_time("alignment", start)
+            self.metrics.count("alignments")
 
             if len(alignment12) == 0:
                 self.cpr.printw("msa_handler.py Alignment between, ",text_1, "and",text_2," was not possible just padding up results")
@@ -409,6 +462,8 @@ class MsaHandler(object):
 
 
             return res_final_1, res_final_2, res_final_3
+        except VotingBudgetExceeded:
+            raise
         except Exception as ex:
             tr = inspect.trace()
 
@@ -416,6 +471,7 @@ class MsaHandler(object):
             self.cpr.printex("trace", tr)
 
     def msa_alignment_biopython_old(self, text_1, text_2, text_3, wildcard_character='¦'):
+        from Bio import pairwise2
 
         wildcard_character2 = '@'
 
@@ -649,10 +705,11 @@ class MsaHandler(object):
 
 
 
-            self.cpr.print(len(res_one_1), TypeCasts.convert_unicodelist_to_string(res_one_1))
-            self.cpr.print(len(pivot_msa), TypeCasts.convert_unicodelist_to_string(pivot_msa))
-            self.cpr.print(len(res_three_2), TypeCasts.convert_unicodelist_to_string(res_three_2))
-            self.cpr.print("pivot index",pivot_index)
+            if self.cpr.enabled:
+                self.cpr.print(len(res_one_1), TypeCasts.convert_unicodelist_to_string(res_one_1))
+                self.cpr.print(len(pivot_msa), TypeCasts.convert_unicodelist_to_string(pivot_msa))
+                self.cpr.print(len(res_three_2), TypeCasts.convert_unicodelist_to_string(res_three_2))
+                self.cpr.print("pivot index",pivot_index)
             # if res_one_1.__contains__("Sitz:") is True:
             #    self.cpr.print("asd")
 
@@ -677,12 +734,14 @@ class MsaHandler(object):
 
                     new_pivot = res_three_2_multi[0][0]
                     res_three_2_filled = res_three_2_multi[0][1]
-                    self.cpr.print("new_pivot_......", TypeCasts.convert_unicodelist_to_string(new_pivot))
-                    self.cpr.print("res_thr_2_filled",TypeCasts.convert_unicodelist_to_string(res_three_2_filled))
+                    if self.cpr.enabled:
+                        self.cpr.print("new_pivot_......", TypeCasts.convert_unicodelist_to_string(new_pivot))
+                        self.cpr.print("res_thr_2_filled",TypeCasts.convert_unicodelist_to_string(res_three_2_filled))
 
                     res_one_1_multi_2 = pairwise2.align.globalxx(res_one_1_cp, pivot_msa, gap_char= wildcard_character_uclist, force_generic=False)
                     res_one_1_filled = res_one_1_multi_2[0][0]
-                    self.cpr.print("res_one_1_filled",TypeCasts.convert_unicodelist_to_string(res_one_1_filled))
+                    if self.cpr.enabled:
+                        self.cpr.print("res_one_1_filled",TypeCasts.convert_unicodelist_to_string(res_one_1_filled))
 
 
                     self.cpr.print("a")
@@ -766,7 +825,7 @@ class MsaHandler(object):
         table_line_preselected = False
         best = None
         best_stripped = None
-        if self.config.TABLE_RECOGNITION_ENABLED:
+        if self.settings.table_recognition_enabled:
             is_table_line_0 = self.table_handler.recognize_a_line(lines[0])
             is_table_line_1 = self.table_handler.recognize_a_line(lines[1])
             is_table_line_2 = self.table_handler.recognize_a_line(lines[2])
@@ -784,7 +843,7 @@ class MsaHandler(object):
                         break
                 # if there was a valid table line preselected skip all processing and take the selected line
                 if table_line_preselected:
-                    predef_seg_counter = [] # just a filler array for seg counter
+                    predef_seg_counter = np.zeros(0, dtype=np.int64) # just a filler array for seg counter
                     best_stripped_non_multi_whitespace = ' '.join(best_stripped.split())
                     best_stripped_non_multi_whitespace, text_seg = self.do_last_steps(best, best_stripped,
                                                                                       best_stripped_non_multi_whitespace,
@@ -845,14 +904,19 @@ class MsaHandler(object):
         max_range_word = int(max(m1, m2, m3)+1)  # add a one because it starts with zero
 
         try:
-            seg_counter = []
+            # word provenance of each aligned character, -1 marks the whitespace between words
+            seg_parts = []
+            debug = self.cpr.enabled
+            voting_budget = self.voting_budget
             for current_word_index in range(0, max_range_word):
+                voting_budget.check()
                 word1 = self.get_word_from_line(line_1, current_word_index)
                 word2 = self.get_word_from_line(line_2, current_word_index)
                 word3 = self.get_word_from_line(line_3, current_word_index)
-                self.cpr.print("word   1:", word1)
-                self.cpr.print("word   2:", word2)
-                self.cpr.print("word   3:", word3)
+                if debug:
+                    self.cpr.print("word   1:", word1)
+                    self.cpr.print("word   2:", word2)
+                    self.cpr.print("word   3:", word3)
 
 
 
@@ -890,7 +954,7 @@ class MsaHandler(object):
                         for word_index, word_current in enumerate(words_aligned):
                             words_aligned[word_index] = words_aligned[word_index].replace(deletion_marker,"")
 
-                if self.config.MSA_BEST_WORDWISE_DROP_LAST_WORD_SC:
+                if self.settings.wordwise_drop_last_word_sc:
                     # filter out last word only special char
                     if current_word_index == max_range_word-1:
                         if len(words_aligned[0]) == 1:
@@ -911,9 +975,10 @@ class MsaHandler(object):
 
 
 
-                self.cpr.print("word_al 1:", words_aligned[0])
-                self.cpr.print("word_al 2:", words_aligned[1])
-                self.cpr.print("word_al 3:", words_aligned[2])
+                if debug:
+                    self.cpr.print("word_al 1:", words_aligned[0])
+                    self.cpr.print("word_al 2:", words_aligned[1])
+                    self.cpr.print("word_al 3:", words_aligned[2])
 
                 update_word(line_1, current_word_index, words_aligned[0])
                 update_word(line_2, current_word_index, words_aligned[1])
@@ -921,11 +986,17 @@ class MsaHandler(object):
                 #if "COLONIA" in words_aligned[0]:
                 #    stop="STOP"
                 #Creates the segment counter for wordbbox
-                seg_counter.extend([current_word_index]*(max([len(words_aligned[0]),len(words_aligned[1]),len(words_aligned[2])])))
-                if current_word_index < max_range_word-1 and max([len(words_aligned[0]),len(words_aligned[1]),len(words_aligned[2])]) > 0:
-                    seg_counter.append(-1)
+                aligned_word_len = max([len(words_aligned[0]),len(words_aligned[1]),len(words_aligned[2])])
+                seg_parts.append(np.full(aligned_word_len, current_word_index, dtype=np.int64))
+                if current_word_index < max_range_word-1 and aligned_word_len > 0:
+                    seg_parts.append(np.full(1, -1, dtype=np.int64))
+
+            if len(seg_parts) >= 1:
+                seg_counter = np.concatenate(seg_parts)
+            else:
+                seg_counter = np.zeros(0, dtype=np.int64)
 
-            if self.config.MSA_BEST_WORDWISE_CRUNCH_WORDS:
+            if self.settings.wordwise_crunch_words:
                 # crunch neighboring words which are similar, this changes the wor assignment in the line objects by reference
                 # if similarity was detected
                 self.crunch_neighbouring_words( max_range_word, wildcard_character, line_1, line_2, line_3)
@@ -933,11 +1004,11 @@ class MsaHandler(object):
 
             if use_charconfs:
                 if use_searchspaces is False:
-                    best, best_stripped = self.ocr_voter.vote_best_of_three_charconfs(line_1, line_2, line_3, 1,
-                                                                                wildcard_character)  # res two is the best element
+                    best, best_stripped = self.vote(self.ocr_voter.vote_best_of_three_charconfs, line_1, line_2,
+                                                    line_3, 1, wildcard_character)  # res two is the best element
                 else:
-                    best, best_stripped = self.ocr_voter.vote_best_of_three_charconfs_searchspaces(line_1, line_2, line_3, 1,
-                                                                                wildcard_character)
+                    best, best_stripped = self.vote(self.ocr_voter.vote_best_of_three_charconfs_searchspaces, line_1,
+                                                    line_2, line_3, 1, wildcard_character)
 
                 best_stripped_non_multi_whitespace = ' '.join(best_stripped.split())
                 best_stripped_non_multi_whitespace, text_seg = self.do_last_steps(best, best_stripped,
@@ -951,7 +1022,8 @@ class MsaHandler(object):
                 print("not implemented yet")
                 # todo implement case without charconfs
 
-
+        except VotingBudgetExceeded:
+            raise
         except Exception as ex:
             tr = inspect.trace()
             self.cpr.printex("msa_handler.py exception", ex)
@@ -961,30 +1033,28 @@ class MsaHandler(object):
     def do_last_steps(self, best, best_stripped, best_stripped_non_multi_whitespace, seg_counter, PRINT_RESULTS):
         text_seg = {}
 
-        if PRINT_RESULTS:
+        if PRINT_RESULTS and self.cpr.enabled:
 
             self.cpr.print("best         ", best)
             self.cpr.print("best_stripped", best_stripped)
             self.cpr.print("best______nmw", best_stripped_non_multi_whitespace)
 
+        seg_counter = np.asarray(seg_counter, dtype=np.int64)
         if len(best) == len(seg_counter) and len(best.replace("¦", "").strip()) != 0:
-            # seg_counter = np.array(seg_counter)
             # Delete all wc
-            wc_pos = [number for number, symbol in enumerate(best) if symbol == "¦"]
-            for pos in reversed(wc_pos): del seg_counter[pos]
+            seg_counter = seg_counter[np.array(list(best)) != "¦"]
             # Delete the ws if the first or the second word was deleted
-            if seg_counter[0] == -1: del seg_counter[0]
-            if seg_counter[-1] == -1: del seg_counter[-1]
+            if seg_counter[0] == -1: seg_counter = seg_counter[1:]
+            if seg_counter[-1] == -1: seg_counter = seg_counter[:-1]
             # Delete the ws if a word in the middle was delete
             if best_stripped[0] == " ": best_stripped = best_stripped[1:]
             wc_pos = [number for number, symbol in enumerate(best_stripped.replace("  ", "¦")) if symbol == "¦"]
-            for pos in reversed(wc_pos):
-                del seg_counter[pos]
-            # seg_counter = [number for number in seg_counter if number != -1]
+            if wc_pos:
+                seg_counter = np.delete(seg_counter, wc_pos)
 
             if len(best_stripped_non_multi_whitespace) == len(seg_counter):
-                ws_pos = np.where(np.array(seg_counter) == -1)
-                ws_pos = np.ndarray.tolist(ws_pos[0])
+                ws_pos = np.flatnonzero(seg_counter == -1)
+                ws_pos = np.ndarray.tolist(ws_pos)
                 ws_pos.append(len(seg_counter))
                 last_pos = 0
                 for ws in ws_pos:
@@ -1122,10 +1192,11 @@ class MsaHandler(object):
 
         res_final_1, res_final_2, res_final_3 = self.align_three_texts(text_1, text_2, text_3, wildcard_character)
         #if "Aufsichtsrat:" in res_final_1:
-        self.cpr.print("my final resolutions before vote")
-        self.cpr.print("res_final_1", res_final_1)
-        self.cpr.print("res_final_2", res_final_2)
-        self.cpr.print("res_final_3", res_final_3)
+        if self.cpr.enabled:
+            self.cpr.print("my final resolutions before vote")
+            self.cpr.print("res_final_1", res_final_1)
+            self.cpr.print("res_final_2", res_final_2)
+            self.cpr.print("res_final_3", res_final_3)
 
         if use_charconfs is True:
 
@@ -1135,12 +1206,11 @@ class MsaHandler(object):
             line_3.update_textspace(res_final_3, wildcard_character)
 
             if use_searchspaces is False:
-                best, best_stripped = self.ocr_voter.vote_best_of_three_charconfs(line_1, line_2, line_3, 1,
-                                                                                  wildcard_character)  # res two is the best element
+                best, best_stripped = self.vote(self.ocr_voter.vote_best_of_three_charconfs, line_1, line_2, line_3,
+                                                1, wildcard_character)  # res two is the best element
             else:
-                best, best_stripped = self.ocr_voter.vote_best_of_three_charconfs_searchspaces(line_1, line_2, line_3,
-                                                                                               1,
-                                                                                               wildcard_character)
+                best, best_stripped = self.vote(self.ocr_voter.vote_best_of_three_charconfs_searchspaces, line_1,
+                                                line_2, line_3, 1, wildcard_character)
 
             # This is the voting algorithm -
             #best, best_stripped = self.ocr_voter.vote_best_of_three_charconfs(line_1, line_2, line_3, 1, wildcard_character)  # res two is the best element
@@ -1149,10 +1219,11 @@ class MsaHandler(object):
         else:
             # todo add searchspaces possibility here
             # This is the voting algorithm -
-            best, best_stripped = self.ocr_voter.vote_best_of_three_simple(res_final_1, res_final_2, res_final_3, 1,wildcard_character)  # res two is the best element
+            best, best_stripped = self.vote(self.ocr_voter.vote_best_of_three_simple, res_final_1, res_final_2,
+                                            res_final_3, 1, wildcard_character)  # res two is the best element
             best_stripped_non_multi_whitespace = ' '.join(best_stripped.split())
 
-        if PRINT_RESULTS:
+        if PRINT_RESULTS and self.cpr.enabled:
             self.cpr.print("A:", res_final_1)
             self.cpr.print("B:", res_final_2)
             self.cpr.print("C:", res_final_3)
@@ -1180,7 +1251,6 @@ class MsaHandler(object):
 
 
     def get_word_column_feats(self, word1, word2, word3, wildcard_character):
-        from n_dist_keying.n_distance_voter import NDistanceVoter
 
         detected_feats = []
 
@@ -1243,7 +1313,8 @@ class MsaHandler(object):
 
 
 
-        ndist_voter = NDistanceVoter(counters_with_chars.keys())
+        ndist_voter = self._word_column_voter
+        ndist_voter.set_texts(list(counters_with_chars.keys()))
         ndist_index = ndist_voter.compare_texts(take_longest_on_empty_lines=True)
 
         #ndist_result = words_input[ndist_index]
@@ -1259,12 +1330,11 @@ class MsaHandler(object):
         counter_same_words = 0
         if len(counters_with_chars.keys()) >= 2:
             acc_vals = 0
-            for key in ndist_voter.d_storage.key_val_dict:
-                value = ndist_voter.d_storage.key_val_dict[key]
+            for value in ndist_voter.distance_matrix.get_pair_distances():
                 acc_vals += value
                 if value <= 0.18:
                     counter_similar_words += 1
-            #average_dist_between_words = acc_vals / len(ndist_voter.d_storage.key_val_dict)
+            #average_dist_between_words = acc_vals / len(ndist_voter.distance_matrix.get_pair_distances())
             #print("asd")
             #if average_dist_between_words <= 0.35:
             #    words_are_similar = True
@@ -1307,9 +1377,10 @@ class MsaHandler(object):
                 detected_feats.append(self.WordColumnFeats.WILDCARDS_LEFT)
 
 
-        print(counters_wildcard_streaks)
-        print("input:", words_input)
-        print("output:", (detected_feats, return_index))
+        if self.cpr.enabled:
+            self.cpr.print(counters_wildcard_streaks)
+            self.cpr.print("input:", words_input)
+            self.cpr.print("output:", (detected_feats, return_index))
         #if "Dr." in words_input[0]:
         #    print("asd")
 
@@ -0,0 +1,166 @@
+from n_dist_keying.distance_matrix import DistanceMatrix
+from n_dist_keying.voter_settings import VoterSettings
+
+
+class ConsensusChecker(object):
+    """
+        Cheap preselection for the msa best keying of one ocr_set, decides on which tier a set is processed:
+
+            full agreement:     all engine lines have the same text after whitespace normalization,
+                                the text is taken directly
+            majority agreement: two lines have the same text with high confidence and the third line
+                                differs only slightly, the text of the two lines is taken directly
+            msa:                real disagreement, the full alignment and voting is done
+            budget fallback:    the msa exceeded its time budget (see 'VotingBudget'), the line
+                                selected by the n-distance keying is taken
+
+        The tiers skip the msa, so the lines on them don't update the state which the ocr voter and the table
+        handler carry from line to line. They are only used if no component depends on that state, see 'is_enabled'.
+        The counters belong to the checker, the pipeline context holds one checker for the whole run, so the share
+        of lines on each tier can be printed for a run.
+    """
+
+    TIER_FULL_AGREEMENT = "full_agreement"
+    TIER_MAJORITY_AGREEMENT = "majority_agreement"
+    TIER_MSA = "msa"
+    TIER_BUDGET_FALLBACK = "budget_fallback"
+
+    def __init__(self, wildcard_character='¦', use_majority=False, min_confidence=90, max_dissent_distance=0.2):
+        self._wildcard_character = wildcard_character
+        self._use_majority = use_majority
+        self._min_confidence = min_confidence
+        self._max_dissent_distance = max_dissent_distance
+        self._distance_matrix = DistanceMatrix(DistanceMatrix.MODE_NORMED_LEVENSHTEIN, early_exit=False)
+        self.tier_counts = {}
+        self.reset_counts()
+
+    @classmethod
+    def from_config(cls, config):
+        return cls('¦', config.MSA_BEST_CONSENSUS_MAJORITY == True,
+                   float(config.MSA_BEST_CONSENSUS_MIN_CONFIDENCE),
+                   float(config.MSA_BEST_CONSENSUS_MAX_DISSENT_PERCENT) / 100)
+
+    @staticmethod
+    def is_enabled(config):
+        """
+        The tiers are off if a voting component carries state from line to line, see 'VoterSettings.uses_line_state'
+        :return: True if the sets can be taken on the consensus tiers
+        """
+        if 'ExceptionInitializing' in config:
+            return False
+        if VoterSettings.uses_line_state(config):
+            return False
+        return config.MSA_BEST_CONSENSUS_FULL_AGREEMENT == True
+
+    def normalize_text(self, text):
+        return ' '.join(text.replace(self._wildcard_character, '').split())
+
+    @staticmethod
+    def get_mean_confidence(line, wildcard_character='¦'):
+        """
+        Mean character confidence of a database line, wildcards and whitespaces are not counted
+        :return: mean confidence or None if there are no confidences
+        """
+        data = getattr(line, 'data', None)
+        if data is None or "x_confs" not in data:
+            return None
+
+        confs = []
+        for char, conf in zip(data["char"], data["x_confs"]):
+            if char == wildcard_character or char is None or str(char).isspace():
+                continue
+            confs.append(conf)
+
+        if len(confs) == 0:
+            return None
+        return sum(confs) / len(confs)
+
+    def decide(self, texts, lines, lines_ok):
+        """
+        Decide the tier of one set, all lines need to be defined to skip the msa
+        :param texts: texts of the three lines
+        :param lines: the line objects, used for the confidences
+        :param lines_ok: flags if the lines are defined
+        :return: tier, index of the line which gives the text (None for msa), normalized text
+        """
+        if not all(lines_ok):
+            return self.count(self.TIER_MSA), None, None
+
+        normalized = [self.normalize_text(text) for text in texts]
+        if normalized[0] == normalized[1] == normalized[2]:
+            return self.count(self.TIER_FULL_AGREEMENT), 1, normalized[1]
+
+        if self._use_majority:
+            for index_1, index_2, index_other in ((0, 1, 2), (1, 2, 0), (0, 2, 1)):
+                if normalized[index_1] != normalized[index_2] or normalized[index_1] == "":
+                    continue
+
+                conf_1 = self.get_mean_confidence(lines[index_1], self._wildcard_character)
+                conf_2 = self.get_mean_confidence(lines[index_2], self._wildcard_character)
+                if conf_1 is None or conf_2 is None or (conf_1 + conf_2) / 2 < self._min_confidence:
+                    break
+
+                dissent_distance = self._distance_matrix.get_distance(normalized[index_1], normalized[index_other])
+                if dissent_distance <= self._max_dissent_distance:
+                    return self.count(self.TIER_MAJORITY_AGREEMENT), index_1, normalized[index_1]
+                break
+
+        return self.count(self.TIER_MSA), None, None
+
+    @staticmethod
+    def get_word_texts(line):
+        """
+        :return: dictionary word number -> word text of a database line, empty if the line has no words
+        """
+        return getattr(line, 'word', {}).get("text", {})
+
+    def get_text_segments(self, word_texts, text):
+        """
+        Word segments for the hocr-output like 'MsaHandler.do_last_steps' creates them,
+        the words of the text are assigned to the word numbers of the line
+        :param word_texts: word texts of the line, see 'get_word_texts'
+        :return: dictionary word number -> word
+        """
+        words = text.split(' ')
+        numbers = [number for number, word in word_texts.items() if self.normalize_text(word) != ""]
+        if text == "" or len(numbers) != len(words):
+            return {-1.0: text}
+
+        text_seg = {}
+        for number, word in zip(numbers, words):
+            text_seg[float(number)] = word
+        return text_seg
+
+    def count(self, tier):
+        self.tier_counts[tier] += 1
+        return tier
+
+    def recount(self, previous_tier, tier):
+        """
+        Moves a set which was already counted to another tier
+        :param previous_tier: tier the set was counted on, None if it wasn't counted
+        """
+        if previous_tier is not None:
+            self.tier_counts[previous_tier] -= 1
+        return self.count(tier)
+
+    def reset_counts(self):
+        for tier in (self.TIER_FULL_AGREEMENT, self.TIER_MAJORITY_AGREEMENT, self.TIER_MSA, self.TIER_BUDGET_FALLBACK):
+            self.tier_counts[tier] = 0
+
+    def get_tier_shares(self):
+        """
+        :return: dictionary tier -> (number of sets, share of all sets)
+        """
+        total = sum(self.tier_counts.values())
+        shares = {}
+        for tier, tier_count in self.tier_counts.items():
+            share = tier_count / total if total > 0 else 0.0
+            shares[tier] = (tier_count, share)
+        return shares
+
+    def print_tier_shares(self):
+        shares = self.get_tier_shares()
+        print("Consensus tiers of the msa best keying:")
+        for tier, (tier_count, share) in shares.items():
+            print("  %-20s %8d %7.2f%%" % (tier, tier_count, share * 100))
@@ -0,0 +1,113 @@
+"""
+    Shared access to the sqlite databases for the reader (dict2sql) and the
+    writes of the voter (result tables, run journal).
+    Instead of creating a fresh SQLAlchemy engine for each file or table,
+    one engine (with a connection pool) is kept per database url for the
+    whole process. Each new sqlite connection gets tuned by pragmas
+    (journal mode, page size, cache size), statement echo is off by default.
+
+    The tables which are voted are not loaded through the pool: 'DFObjectifier'
+    of akf_corelib takes the database url and creates its own connection.
+    The journal mode is stored in the database file, so these connections
+    still use the WAL journal of the databases written by the reader.
+"""
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.pool import QueuePool
+from configuration.configuration_handler import ConfigurationHandler
+
+
+class EngineSettings(object):
+    # default values, used if the configuration isn't initialized or doesn't contain the sql settings
+    echo = False
+    journal_mode = "WAL"
+    synchronous = "NORMAL"
+    page_size = 4096            # bytes, only takes effect for newly created databases
+    cache_size_kb = 65536       # page cache per connection in KiB
+    batch_size = 5000           # number of rows which are inserted per statement batch
+    pool_size = 4               # connections kept open per database
+
+
+class DatabaseEnginePool(object):
+
+    _engines = {}
+
+    @staticmethod
+    def get_settings():
+        """
+        Fetch the sql-settings from configuration, take the defaults from 'EngineSettings' if
+        the configuration isn't initialized
+        :return: settings object with the fields of 'EngineSettings'
+        """
+        config_handler = ConfigurationHandler(first_init=False)
+        config = config_handler.get_config()
+
+        settings = EngineSettings()
+        if 'ExceptionInitializing' in config:
+            return settings
+
+        settings.echo = getattr(config, 'SQL_ECHO', EngineSettings.echo)
+        settings.journal_mode = getattr(config, 'SQL_JOURNAL_MODE', EngineSettings.journal_mode)
+        settings.synchronous = getattr(config, 'SQL_SYNCHRONOUS', EngineSettings.synchronous)
+        settings.page_size = getattr(config, 'SQL_PAGE_SIZE', EngineSettings.page_size)
+        settings.cache_size_kb = getattr(config, 'SQL_CACHE_SIZE_KB', EngineSettings.cache_size_kb)
+        settings.batch_size = getattr(config, 'SQL_BATCH_SIZE', EngineSettings.batch_size)
+        settings.pool_size = getattr(config, 'SQL_POOL_SIZE', EngineSettings.pool_size)
+        return settings
+
+    @classmethod
+    def get_engine(cls, dburl):
+        """
+        Returns the engine for the given database url, the engine is created on first request
+        and shared by all following requests within this process
+        :param dburl: sqlalchemy url like 'sqlite:////path/to/db.db'
+        :return: sqlalchemy engine
+        """
+        engine = cls._engines.get(dburl)
+        if engine is None:
+            engine = cls._create_engine(dburl, cls.get_settings())
+            cls._engines[dburl] = engine
+        return engine
+
+    @classmethod
+    def _create_engine(cls, dburl, settings):
+
+        if not dburl.startswith("sqlite"):
+            return create_engine(dburl, echo=settings.echo)
+
+        # sqlite file databases use a NullPool by default, which opens a new connection for each
+        # statement, explicitly use a queue pool which is shareable between threads
+        engine = create_engine(dburl, echo=settings.echo, poolclass=QueuePool, pool_size=settings.pool_size,
+                               connect_args={"check_same_thread": False})
+
+        @event.listens_for(engine, "connect")
+        def set_sqlite_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            # page size has to be set before the journal mode switches to wal
+            cursor.execute("PRAGMA page_size={}".format(int(settings.page_size)))
+            cursor.execute("PRAGMA journal_mode={}".format(settings.journal_mode))
+            cursor.execute("PRAGMA synchronous={}".format(settings.synchronous))
+            # negative value means the size is given in KiB instead of pages
+            cursor.execute("PRAGMA cache_size=-{}".format(int(settings.cache_size_kb)))
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.close()
+
+        return engine
+
+    @classmethod
+    def get_batch_size(cls):
+        return cls.get_settings().batch_size
+
+    @staticmethod
+    def table_exists(connection, tablename):
+        return tablename in inspect(connection).get_table_names()
+
+    @classmethod
+    def dispose_all(cls):
+        """
+        Close all pooled connections, i.e. at the end of a run or before forking worker processes
+        :return:
+        """
+        for dburl in cls._engines:
+            cls._engines[dburl].dispose()
+        cls._engines = {}
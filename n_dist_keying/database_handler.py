@@ -1,19 +1,33 @@
+import copy
 from akf_corelib.df_objectifier import DFObjectifier
 from n_dist_keying.ocr_comparison import OCRcomparison
 from n_dist_keying.ocr_set import OCRset
 from multi_sequence_alignment.msa_handler import MsaHandler
+from n_dist_keying.stage_metrics import NO_METRICS
+
+# column of the character records with the index of the matched line over all engines (set by the preprocessing)
+LINE_INDEX_COLUMN = "line_match"
 
 # todo multiple classes with the name 'DatabaseHandler' in project
 class DatabaseHandler():
 
-    def __init__(self, dataframe_wrapper, number_of_inputs, predictor, vocab_checker):
-
+    def __init__(self, dataframe_wrapper, number_of_inputs, predictor, vocab_checker, pipeline_context=None):
+        """
+        :param pipeline_context: if given, its components are used for the sets of this table,
+                                 otherwise a new msa handler is created
+        """
         print("Init database handler")
         self._dataframe_wrapper = dataframe_wrapper
         self._number_of_inputs = number_of_inputs
-        self.msa_handler = MsaHandler()
-        self.msa_handler.add_predictor(predictor)
-        self.msa_handler.add_vocabulary_checker(vocab_checker)
+        self._pipeline_context = pipeline_context
+        if pipeline_context is not None:
+            self.msa_handler = pipeline_context.msa_handler
+            self.metrics = pipeline_context.metrics
+        else:
+            self.metrics = NO_METRICS
+            self.msa_handler = MsaHandler()
+            self.msa_handler.add_predictor(predictor)
+            self.msa_handler.add_vocabulary_checker(vocab_checker)
 
     def get_some_empty_object(self):
 
@@ -33,7 +47,7 @@ class DatabaseHandler():
         DEFAULT_OCROPUS_INDEX = 2
 
 
-        ocr_set = OCRset(self._number_of_inputs, line_index, self.msa_handler)
+        ocr_set = OCRset(self._number_of_inputs, line_index, self.msa_handler, self._pipeline_context)
         ocr_set.is_database_set(True, self)
 
         for input_element in input_list_db:
@@ -71,8 +85,9 @@ class DatabaseHandler():
         calls create_ocr_set multiple times
         :return: OCRComparison filled object
         """
-        ocr_comparison = OCRcomparison(predictor=predictor)
+        ocr_comparison = OCRcomparison(predictor=predictor, metrics=self.metrics)
         lines_object = self._dataframe_wrapper.get_line_obj()
+        self.metrics.count("sets", len(lines_object))
 
         for line_index in lines_object:
             list_of_inputs = lines_object[line_index]
@@ -82,4 +97,58 @@ class DatabaseHandler():
             ocr_comparison.add_set(ocr_set)
 
 
-        return ocr_comparison
\ No newline at end of file
+        return ocr_comparison
+
+    def stream_ocr_sets(self, predictor=None):
+        """
+        Generator alternative to create_ocr_comparison, yields the ocr_sets ordered by y_mean
+        (which is the line index for database sets) one at a time. The rows of the table are
+        grouped by their matched line index ('line_match') once, the line objects of a set are
+        created from the rows of its line when the set is requested, so only the line objects
+        of the current set are in memory. Tables without the matched line index are grouped
+        by 'get_line_obj' (akf_corelib) for the whole table before the first set
+        :return: number of sets, generator for the sets
+        """
+        dataframe = getattr(self._dataframe_wrapper, "df", None)
+        if dataframe is None or LINE_INDEX_COLUMN not in dataframe.columns:
+            return self._stream_ocr_sets_of_line_object(predictor)
+
+        # row positions of each line, the rows themselves are selected when the set is created,
+        # unmatched rows (-1) belong to no line
+        line_positions = dataframe.groupby(LINE_INDEX_COLUMN, sort=True).indices
+        line_indices = sorted(line_index for line_index in line_positions.keys() if line_index >= 0)
+        self.metrics.count("sets", len(line_indices))
+
+        def generate_sets():
+            for line_index in line_indices:
+                # wrapper which only contains the rows of this line, 'get_line_obj' creates its line objects
+                line_wrapper = copy.copy(self._dataframe_wrapper)
+                line_wrapper.df = dataframe.iloc[line_positions.pop(line_index)]
+                # one set per line, the number of sets is given to the writers in advance
+                list_of_inputs = [line for lines in line_wrapper.get_line_obj().values() for line in lines]
+                ocr_set = self.create_ocr_set(list_of_inputs, line_index)
+                if predictor != None:
+                    ocr_set.add_predictor(predictor=predictor)
+                yield ocr_set
+
+        return len(line_indices), generate_sets()
+
+    def _stream_ocr_sets_of_line_object(self, predictor=None):
+        """
+        Like 'stream_ocr_sets', the line objects of all sets are created at the start by 'get_line_obj',
+        each is released from the line dictionary when its set is created
+        :return: number of sets, generator for the sets
+        """
+        lines_object = self._dataframe_wrapper.get_line_obj()
+        line_indices = sorted(lines_object.keys())
+        self.metrics.count("sets", len(line_indices))
+
+        def generate_sets():
+            for line_index in line_indices:
+                list_of_inputs = lines_object.pop(line_index)
+                ocr_set = self.create_ocr_set(list_of_inputs, line_index)
+                if predictor != None:
+                    ocr_set.add_predictor(predictor=predictor)
+                yield ocr_set
+
+        return len(line_indices), generate_sets()
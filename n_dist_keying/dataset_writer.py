@@ -0,0 +1,491 @@
+import glob
+import os
+import time
+from itertools import chain
+from xml.sax.saxutils import escape, quoteattr
+from n_dist_keying.word_boxes import WordBoxes
+
+
+# TODO: Import const to config or/and rework imagepath generating
+IMG_PATH = "/media/sf_ShareVB/many_years_firmprofiles/"
+IMG_FILETYPES = [".jpg"]
+
+# size of the write buffer of the output files, the rendered sets are written through it
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# image paths found for the output files, the search is recursive so it's done only once per image
+_image_paths = {}
+
+
+def get_image_path(filename):
+    """
+    Searches the image of a dataset in IMG_PATH, the image name is derived from the output filename
+    :param filename: output filename of the dataset
+    :return: path of the image or "None"
+    """
+    filename = os.path.normpath(filename).replace("\\","/")
+    if IMG_PATH == "":
+        return "None"
+
+    imgname = "_".join(filename.split("/")[-1].replace("msa_best","").split("_")[:-1])
+    if imgname[-3:] == "msa":
+        imgname = imgname[:-3]
+    imgfolder = filename.split("/")[-2]
+    imgpath = IMG_PATH+"**/"+imgfolder+"/**/"+imgname+"*"
+    if imgpath not in _image_paths:
+        imgdirs = list(chain.from_iterable(glob.iglob(imgpath+ filetype, recursive=True) for filetype in IMG_FILETYPES))
+        if imgdirs is not None and len(imgdirs) > 0:
+            _image_paths[imgpath] = imgdirs[0]
+        else:
+            _image_paths[imgpath] = "None"
+    return _image_paths[imgpath]
+
+
+class DatasetWriter(object):
+    """
+        Base of the dataset writers, the file is opened on creation and the rendered
+        sets are written as they come, through a buffered file handle.
+        Writers without an output file (e.g. to a database) give no filename
+    """
+
+    def __init__(self, filename=None):
+        self._filename = filename
+        self._file = None
+        if filename is None:
+            return
+
+        dir = os.path.dirname(filename)
+        if dir != "" and not os.path.exists(dir):
+            os.makedirs(dir)
+        self._file = open(filename, 'w', encoding="utf-8", buffering=WRITE_BUFFER_SIZE)
+
+    def _write(self, text):
+        self._file.write(text)
+
+    def write_set(self, lidx, current_set):
+        """
+        Renders one ocr_set, the base writer writes nothing
+        :param lidx: index of the set in the table
+        """
+        pass
+
+    def close(self):
+        """
+        :return: number of written bytes
+        """
+        if self._file is None:
+            return 0
+        self._file.flush()
+        written_bytes = self._file.tell()
+        self._file.close()
+        return written_bytes
+
+
+class DatasetWriterGroup(object):
+    """
+        All writers of a table, renders the configured outputs in one pass over the ocr_sets
+    """
+
+    def __init__(self, writers=None):
+        self._writers = []
+        if writers is not None:
+            self._writers.extend(writers)
+
+    def add(self, writer):
+        self._writers.append(writer)
+
+    def is_empty(self):
+        return len(self._writers) == 0
+
+    def write_set(self, lidx, current_set):
+        for writer in self._writers:
+            writer.write_set(lidx, current_set)
+
+    def write_sets(self, ocr_sets):
+        for lidx, current_set in enumerate(ocr_sets):
+            self.write_set(lidx, current_set)
+
+    def write_sets_and_close(self, ocr_sets):
+        self.write_sets(ocr_sets)
+        return self.close()
+
+    def close(self):
+        """
+        :return: number of bytes written to files
+        """
+        written_bytes = 0
+        for writer in self._writers:
+            written_bytes += writer.close() or 0
+        return written_bytes
+
+
+class DatasetTextWriter(DatasetWriter):
+    """
+        Writes the lines of one dataset (input engine or keying result) of
+        consecutive ocr_sets to a textfile, one ocr_set at a time
+    """
+
+    def __init__(self, ocr_comparison, filename, set_index, mode_add_linebreaks=False, other_set=""):
+        DatasetWriter.__init__(self, filename)
+        self._ocr_comparison = ocr_comparison
+        self._set_index = set_index
+        self._mode_add_linebreaks = mode_add_linebreaks
+        self._other_set = other_set
+        self._previous_dataset_line = None
+        self._previous_dataset_line_index = None
+
+    def write_set(self, lidx, current_set):
+        if self._other_set == 'msa_best':
+            dataset_text = current_set.get_msa_best_text()
+        elif self._other_set == 'ndist_keying':
+            dataset_text = current_set.get_shortest_n_distance_text()
+        else:
+            dataset_text = current_set.get_line_set_value_text(self._set_index)
+
+        # add comparison from previous to actual line break here
+        if self._mode_add_linebreaks:
+            dataset_line = current_set.get_line_set_value_line(self._set_index)
+            if dataset_line is True or dataset_line is False:
+                return
+
+            additional_breaks = \
+                self._ocr_comparison.add_linebreaks(self._previous_dataset_line, dataset_line,
+                                                    self._previous_dataset_line_index, self._set_index,
+                                                    self._ocr_comparison.line_height_information)
+
+            if additional_breaks is not None:
+                self._write(additional_breaks)
+            self._previous_dataset_line = dataset_line
+            self._previous_dataset_line_index = self._set_index
+
+        # do not print lines which are mostly recognized with no content at the moment
+        if dataset_text is not None and dataset_text is not False:
+            self._write(dataset_text + "\n")
+
+
+class DatasetLayoutWriter(DatasetWriter):
+    """
+        Base of the writers with line- and word-boxes (hocr, alto, page-xml),
+        gives the text and the boxes of a dataset line in an ocr_set
+    """
+
+    def __init__(self, filename, set_index, other_set=""):
+        DatasetWriter.__init__(self, filename)
+        self._set_index = set_index
+        self._other_set = other_set
+
+    def get_line_layout(self, current_set):
+        """
+        :return: text, bbox [x0, y0, x1, y1] or None, name of the dataset
+        """
+        set_index = self._set_index
+        if self._other_set == 'msa_best':
+            dataset_text = current_set.get_msa_best_text()
+            dataset_bbox = None
+            name = ["msa","combined"]
+            for lines in current_set._set_lines:
+                ldata = lines.data
+                if dataset_bbox is None and ldata["line_x0"]:
+                    dataset_bbox = [min(ldata["line_x0"]), min(ldata["line_y0"]), max(ldata["line_x1"]),
+                                    max(ldata["line_y1"])]
+                elif ldata["line_x0"]:
+                    if min(ldata["line_x0"]) < dataset_bbox[0]:
+                        dataset_bbox[0] = min(ldata["line_x0"])
+                    if min(ldata["line_y0"]) < dataset_bbox[1]:
+                        dataset_bbox[1] = min(ldata["line_y0"])
+                    if max(ldata["line_x1"]) > dataset_bbox[2]:
+                        dataset_bbox[2] = max(ldata["line_x1"])
+                    if max(ldata["line_y1"]) > dataset_bbox[3]:
+                        dataset_bbox[3] = max(ldata["line_y1"])
+        else:
+            if self._other_set == 'ndist_keying':
+                set_index = current_set.get_shortest_n_distance_index()
+                if set_index is None:
+                    return None, None, ["None", "None"]
+                dataset_text = current_set.get_shortest_n_distance_text()
+            else:
+                dataset_text = current_set.get_line_set_value_text(set_index)
+            dataset_bbox = None
+            ldata = current_set._set_lines[set_index].data
+            name =  current_set._set_lines[set_index].name
+            if ldata["line_x0"]:
+                dataset_bbox = [min(ldata["line_x0"]), min(ldata["line_y0"]), max(ldata["line_x1"]),
+                                max(ldata["line_y1"])]
+
+        return dataset_text, dataset_bbox, name
+
+    def is_line_written(self, dataset_text, dataset_bbox):
+        # do not print lines which are mostly recognized with no content at the moment
+        return dataset_text is not None and dataset_text is not False and bool(dataset_bbox)
+
+    def get_word_layouts(self, dataset_bbox, current_set):
+        """
+        The words of a dataset line with their boxes, words without own box keep the box of the previous word
+        :param dataset_bbox: box of the line
+        :return: list of tuples (word, (x0, y0, x1, y1))
+        """
+        words = []
+        dataset_bbox = list(dataset_bbox)
+        # word box lookups of the lines, only kept while this set is rendered
+        word_boxes = {}
+        if self._other_set == "msa_best":
+            if current_set._text_seg == None:
+                words.append((current_set.get_msa_best_text(), tuple(dataset_bbox)))
+            else:
+                for number, word in current_set._text_seg.items():
+                    if number != -1.0:
+                        set_index = 2
+                        if number in current_set._set_lines[1].word["UID"].keys() and \
+                                set(current_set._set_lines[1].word["text"][number]) != set("¦") and \
+                                current_set._set_lines[1].data["word_x0"]:
+                            set_index = 1
+                        elif number in current_set._set_lines[0].word["UID"].keys() and \
+                                set(current_set._set_lines[0].word["text"][number]) != set("¦") and \
+                                current_set._set_lines[0].data["word_x0"]:
+                            set_index = 0
+                        if set_index not in word_boxes:
+                            word_boxes[set_index] = WordBoxes(current_set._set_lines[set_index])
+                        dataset_bbox = self._get_wbbox_new(dataset_bbox,number,word_boxes[set_index])
+                    words.append((word, tuple(dataset_bbox)))
+        else:
+            set_index = self._set_index
+            if self._other_set == 'ndist_keying':
+                set_index = current_set.get_shortest_n_distance_index()
+            line = WordBoxes(current_set._set_lines[set_index])
+            for number, word in line.word["text"].items():
+                dataset_bbox = self._get_wbbox(dataset_bbox,number,line)
+                words.append((word, tuple(dataset_bbox)))
+        return words
+
+    def _get_wbbox(self,bbox, number, line, avg=True):
+        if not isinstance(line, WordBoxes):
+            line = WordBoxes(line)
+
+        wbbox_pos = line.get_word_uid_position(number)
+        if wbbox_pos != 0:
+            if number != 0.0:
+                bbox[0] = line.data["word_x0"][int(wbbox_pos)]
+            bbox[2] = line.data["word_x1"][int(wbbox_pos)]
+        return bbox
+
+    def _get_wbbox_new(self,bbox, number, line, avg=True):
+        if not isinstance(line, WordBoxes):
+            line = WordBoxes(line)
+
+        # positions of the word without the wildcard entries
+        word_span = line.get_word_span(number)
+        if word_span is None:
+            return bbox
+        (first_position, wbbox_pos, last_position) = word_span
+        if wbbox_pos != 0:
+            bbox[0] = line.data["word_x0"][first_position]
+            bbox[2] = line.data["word_x1"][last_position]
+        return bbox
+
+
+class DatasetHocrWriter(DatasetLayoutWriter):
+    """
+        Writes the lines of one dataset (input engine or keying result) of
+        consecutive ocr_sets to a hocr-file, one ocr_set at a time
+    """
+
+    def __init__(self, filename, set_index, number_of_sets, mode_add_linebreaks=False, other_set=""):
+        self._imgdir = get_image_path(filename)
+        DatasetLayoutWriter.__init__(self, filename + ".hocr", set_index, other_set)
+
+        self._number_of_sets = number_of_sets
+        self._wrote_header = False
+        self._finished = False
+        self._file_cords = None
+
+    def write_set(self, lidx, current_set):
+        if self._finished:
+            return
+
+        if lidx == 0:
+            for last_set in current_set._set_lines:
+                if last_set.data["line_x1"] != []:
+                    self._file_cords = last_set.data
+                    break
+
+        dataset_text, dataset_bbox, name = self.get_line_layout(current_set)
+
+        if self.is_line_written(dataset_text, dataset_bbox):
+            if self._wrote_header == False:
+                self._wrote_header = True
+                file_cords = self._file_cords
+                hocr_header = f'''<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN"
+"http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
+    <html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en" lang="en">
+        <head>
+            <title>OCR Results</title>
+            <meta http-equiv="content-type" content="text/html; charset=utf-8" />
+            <meta name='AKF-OCR' content='{name[0]}-{name[1]}' />
+            <meta name='ocr-capabilities' content='ocr_line ocrx_word'/>
+        </head>
+        <body>
+            <div class='ocr_page' title='image {self._imgdir}; bbox 0 0 {int(file_cords["line_x1"][0])} {int(file_cords["line_y1"][0])}'>\n'''
+                self._write(hocr_header)
+            self._write(self._write_line_infos(dataset_bbox, current_set))
+        if lidx == self._number_of_sets-1:
+            self._write_footer()
+
+    def _write_footer(self):
+        # the page is only closed if it was opened by a written line
+        if self._wrote_header:
+            self._write("\t\t</div>\n\t</body>\n</html>")
+        self._finished = True
+
+    def close(self):
+        # the sets of the table could have been fewer than announced
+        if not self._finished:
+            self._write_footer()
+        return DatasetLayoutWriter.close(self)
+
+    def _write_line_infos(self, dataset_bbox, current_set):
+        # lines for which the msa exceeded its time budget are marked, they contain the n-distance keying line
+        fallback = "; x_fallback ndist_keying" if self._other_set == "msa_best" and current_set.budget_fallback else ""
+        dtext = [f'''            <span class ='ocr_line' title='bbox {int(dataset_bbox[0])} {int(dataset_bbox[1])} {int(dataset_bbox[2])} {int(dataset_bbox[3])}{fallback}' ><br/>\n''']
+        for word, wbbox in self.get_word_layouts(dataset_bbox, current_set):
+            dtext.append(f'''                <span  class ='ocrx_word' title='bbox {int(wbbox[0])} {int(wbbox[1])} {int(wbbox[2])} {int(wbbox[3])}' >{word}</span >\n''')
+        dtext.append(f'''            </span>\n''')
+        return "".join(dtext)
+
+
+class DatasetPageLayoutWriter(DatasetLayoutWriter):
+    """
+        Base of the xml page formats, the lines are collected and the
+        page is rendered on close, because the page size is known at the end
+    """
+
+    def __init__(self, filename, set_index, other_set=""):
+        self._imgdir = get_image_path(filename)
+        DatasetLayoutWriter.__init__(self, filename, set_index, other_set)
+        self._lines = []
+        self._name = ["None", "None"]
+
+    def write_set(self, lidx, current_set):
+        dataset_text, dataset_bbox, name = self.get_line_layout(current_set)
+        if not self.is_line_written(dataset_text, dataset_bbox):
+            return
+
+        self._name = name
+        words = [(word, [int(value) for value in wbbox]) for word, wbbox in
+                 self.get_word_layouts(dataset_bbox, current_set)]
+        self._lines.append((dataset_text, [int(value) for value in dataset_bbox], words))
+
+    def get_page_size(self):
+        width = 0
+        height = 0
+        for text, bbox, words in self._lines:
+            width = max(width, bbox[2])
+            height = max(height, bbox[3])
+        return width, height
+
+    def render(self):
+        """
+        Writes the collected lines as page, the base writer writes nothing
+        """
+        pass
+
+    def close(self):
+        self.render()
+        self._lines = []
+        return DatasetLayoutWriter.close(self)
+
+
+class DatasetAltoWriter(DatasetPageLayoutWriter):
+    """
+        Writes the lines of one dataset to an ALTO (v4) file, one TextBlock with all lines
+    """
+
+    def __init__(self, filename, set_index, other_set=""):
+        DatasetPageLayoutWriter.__init__(self, filename + ".alto.xml", set_index, other_set)
+
+    @staticmethod
+    def _get_position(bbox):
+        return f'HPOS="{bbox[0]}" VPOS="{bbox[1]}" WIDTH="{bbox[2]-bbox[0]}" HEIGHT="{bbox[3]-bbox[1]}"'
+
+    def render(self):
+        width, height = self.get_page_size()
+        self._write(f'''<?xml version="1.0" encoding="UTF-8"?>
+<alto xmlns="http://www.loc.gov/standards/alto/ns-v4#">
+    <Description>
+        <MeasurementUnit>pixel</MeasurementUnit>
+        <sourceImageInformation>
+            <fileName>{escape(self._imgdir)}</fileName>
+        </sourceImageInformation>
+        <OCRProcessing ID="ocr_processing">
+            <ocrProcessingStep>
+                <processingSoftware>
+                    <softwareName>{escape(self._name[0] + "-" + self._name[1])}</softwareName>
+                </processingSoftware>
+            </ocrProcessingStep>
+        </OCRProcessing>
+    </Description>
+    <Layout>
+        <Page ID="page_1" PHYSICAL_IMG_NR="1" WIDTH="{width}" HEIGHT="{height}">
+            <PrintSpace HPOS="0" VPOS="0" WIDTH="{width}" HEIGHT="{height}">
+                <TextBlock ID="block_1" HPOS="0" VPOS="0" WIDTH="{width}" HEIGHT="{height}">\n''')
+
+        for line_number, (text, bbox, words) in enumerate(self._lines):
+            self._write(f'''                    <TextLine ID="line_{line_number}" {self._get_position(bbox)}>\n''')
+            for word_number, (word, wbbox) in enumerate(words):
+                if word_number > 0:
+                    self._write('''                        <SP/>\n''')
+                self._write(f'''                        <String ID="line_{line_number}_word_{word_number}" CONTENT={quoteattr(word)} {self._get_position(wbbox)}/>\n''')
+            self._write('''                    </TextLine>\n''')
+
+        self._write('''                </TextBlock>
+            </PrintSpace>
+        </Page>
+    </Layout>
+</alto>\n''')
+
+
+class DatasetPageXmlWriter(DatasetPageLayoutWriter):
+    """
+        Writes the lines of one dataset to a PAGE-XML (2019-07-15) file, one TextRegion with all lines
+    """
+
+    def __init__(self, filename, set_index, other_set=""):
+        DatasetPageLayoutWriter.__init__(self, filename + ".page.xml", set_index, other_set)
+
+    @staticmethod
+    def _get_points(bbox):
+        return f'{bbox[0]},{bbox[1]} {bbox[2]},{bbox[1]} {bbox[2]},{bbox[3]} {bbox[0]},{bbox[3]}'
+
+    def render(self):
+        width, height = self.get_page_size()
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%S")
+        region_bbox = [0, 0, width, height]
+        if self._lines:
+            region_bbox = [min(line[1][0] for line in self._lines), min(line[1][1] for line in self._lines),
+                           max(line[1][2] for line in self._lines), max(line[1][3] for line in self._lines)]
+
+        self._write(f'''<?xml version="1.0" encoding="UTF-8"?>
+<PcGts xmlns="http://schema.primaresearch.org/PAGE/gts/pagecontent/2019-07-15">
+    <Metadata>
+        <Creator>ocromore {escape(self._name[0] + "-" + self._name[1])}</Creator>
+        <Created>{timestamp}</Created>
+        <LastChange>{timestamp}</LastChange>
+    </Metadata>
+    <Page imageFilename={quoteattr(self._imgdir)} imageWidth="{width}" imageHeight="{height}">
+        <TextRegion id="region_1">
+            <Coords points="{self._get_points(region_bbox)}"/>\n''')
+
+        for line_number, (text, bbox, words) in enumerate(self._lines):
+            self._write(f'''            <TextLine id="line_{line_number}">
+                <Coords points="{self._get_points(bbox)}"/>\n''')
+            for word_number, (word, wbbox) in enumerate(words):
+                self._write(f'''                <Word id="line_{line_number}_word_{word_number}">
+                    <Coords points="{self._get_points(wbbox)}"/>
+                    <TextEquiv><Unicode>{escape(word)}</Unicode></TextEquiv>
+                </Word>\n''')
+            self._write(f'''                <TextEquiv><Unicode>{escape(text)}</Unicode></TextEquiv>
+            </TextLine>\n''')
+
+        self._write('''        </TextRegion>
+    </Page>
+</PcGts>\n''')
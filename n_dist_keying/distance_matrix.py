@@ -0,0 +1,152 @@
+import difflib
+import math
+import numpy as np
+from n_dist_keying.text_comparator import TextComparator
+
+
+class DistanceMatrix(object):
+    """
+        Distance engine for the n-distance keying, stores the distances between all texts
+        of a set in a symmetric N x N array and the accumulated distance of each text to all others.
+        An instance can be reused for many sets, each call of 'calculate' starts a new matrix.
+
+        With early exit enabled, a pair is only calculated up to the point where it's clear
+        that none of the two texts can have the shortest accumulated distance anymore, in this
+        case the stored value is a lower bound of the real distance and the pair is marked in
+        'lower_bounds'. The shortest distance index is the same as with the full calculation,
+        users of the single distances ('get_pair_distances') have to disable early exit.
+    """
+
+    MODE_DIFFLIB = 'difflib'  # best bet
+    MODE_NORMED_LEVENSHTEIN = 'normed_levenshtein'  # bit-parallel levenshtein distance normed by the longer text
+    MODE_SORENSEN = 'sorensen'
+    MODE_JACCARD = 'jaccard'
+    MODE_HAMMING = 'hamming'
+    MODE_MYERS = 'myers'  # use myers special difflib sequence matcher
+
+    def __init__(self, mode=MODE_DIFFLIB, early_exit=True):
+        self.mode = mode
+        self.early_exit = early_exit
+        self.reset()
+
+    def reset(self):
+        self.distances = np.zeros((0, 0))
+        self.lower_bounds = np.zeros((0, 0), dtype=bool)
+        self.accumulated_distances = np.zeros(0)
+        self.shortest_distance_index = -1
+
+    def calculate(self, texts):
+        """
+        Calculates the distances between all texts, pairs are processed in ascending index order
+        :param texts: list of texts, entries can be False or None for undefined lines
+        :return: index of the text with the shortest accumulated distance to all others
+        """
+        texts = list(texts)
+        number_of_texts = len(texts)
+        distances = np.zeros((number_of_texts, number_of_texts))
+        lower_bounds = np.zeros((number_of_texts, number_of_texts), dtype=bool)
+        accumulated = np.zeros(number_of_texts)
+        best_accumulated = None
+
+        for text_index in range(number_of_texts):
+            text = texts[text_index]
+            for text_index_cmp in range(text_index+1, number_of_texts):
+                limit = None
+                if self.early_exit and best_accumulated is not None:
+                    # above this distance both texts are worse than the best complete text
+                    limit = best_accumulated - min(accumulated[text_index], accumulated[text_index_cmp])
+
+                distance = self.get_distance(text, texts[text_index_cmp], limit)
+                distances[text_index, text_index_cmp] = distance
+                distances[text_index_cmp, text_index] = distance
+                if limit is not None and distance > limit:
+                    # the calculation may have stopped at the limit
+                    lower_bounds[text_index, text_index_cmp] = True
+                    lower_bounds[text_index_cmp, text_index] = True
+
+                # distances to items which are not defined (negative distance value) are not counted in
+                if distance >= 0:
+                    accumulated[text_index] += distance
+                    accumulated[text_index_cmp] += distance
+
+            # all distances of this text are known now
+            if best_accumulated is None or accumulated[text_index] < best_accumulated:
+                best_accumulated = accumulated[text_index]
+
+        self.distances = distances
+        self.lower_bounds = lower_bounds
+        self.accumulated_distances = accumulated
+        if number_of_texts >= 1:
+            self.shortest_distance_index = int(np.argmin(accumulated))
+        else:
+            self.shortest_distance_index = -1
+
+        return self.shortest_distance_index
+
+    def get_shortest_distance_index(self):
+        return self.shortest_distance_index
+
+    def get_pair_distances(self):
+        """
+        :return: distances of all pairs (i, j) with i < j, pairs whose calculation was cut off
+                 by the early exit are NaN, their distance isn't known
+        """
+        pair_indices = np.triu_indices(len(self.distances), 1)
+        pair_distances = self.distances[pair_indices]
+        pair_distances[self.lower_bounds[pair_indices]] = np.nan
+        return pair_distances
+
+    def get_distance(self, text1, text2, limit=None):
+        """
+        Distance of two texts
+        :param limit: if not None, the calculation can stop as soon as the distance is
+                      known to be higher than limit and return a lower bound of the distance
+        :return: distance
+        """
+        # return a fixed value if one of the strings is not defined
+        if text1 is False and text2 is False or text1 is None and text2 is None:
+            return 0
+
+        # One is false and one is not false
+        if (text1 is False or text2 is False) or (text1 is None or text2 is None):
+            return 1
+
+        mode = self.mode
+        dist = 1
+
+        if mode == self.MODE_DIFFLIB:
+            if text1 == text2:
+                return 0.0
+            if limit is not None:
+                # quick ratios are upper bounds of the ratio, so these are lower bounds of the distance
+                sqmatch = difflib.SequenceMatcher(None, text1, text2, True)
+                lower_bound = 1 - sqmatch.real_quick_ratio()
+                if lower_bound > limit:
+                    return lower_bound
+                lower_bound = 1 - sqmatch.quick_ratio()
+                if lower_bound > limit:
+                    return lower_bound
+                dist = 1 - sqmatch.ratio()
+            else:
+                dist = TextComparator.compare_ocr_strings_difflib_seqmatch(text1, text2)
+
+        elif mode == self.MODE_NORMED_LEVENSHTEIN:
+            cutoff = None
+            if limit is not None:
+                max_len = max(len(text1), len(text2))
+                cutoff = int(math.floor(limit * max_len + 1e-9)) if limit >= 0 else 0
+            dist = TextComparator.compare_ocr_strings_levensthein_normed(text1, text2, cutoff)
+
+        elif mode == self.MODE_HAMMING:
+            dist = TextComparator.compare_ocr_strings_hamming(text1, text2)
+
+        elif mode == self.MODE_SORENSEN:
+            dist = TextComparator.compare_ocr_strings_sorensen(text1, text2)
+
+        elif mode == self.MODE_JACCARD:
+            dist = TextComparator.compare_ocr_strings_jaccard(text1, text2)
+
+        elif mode == self.MODE_MYERS:
+            dist = TextComparator.compare_ocr_strings_myers(text1, text2)
+
+        return dist
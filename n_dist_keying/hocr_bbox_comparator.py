@@ -5,9 +5,12 @@ from n_dist_keying.text_comparator import TextComparator
 from n_dist_keying.ocr_comparison import OCRcomparison
 from n_dist_keying.ocr_set import OCRset
 from n_dist_keying.marker import Marker
+from n_dist_keying.line_interval_index import LineIntervalIndex
 
 class HocrBBoxComparator(object):
 
+    TRESHOLD_VALUE = 30  # maximum y-difference of line start and end points to match lines in 'ENDPOINT_TRESHOLD' mode
+
     def __init__(self):
         self._ocropus_page = None
         self._abbyy_page = None
@@ -103,7 +106,7 @@ class HocrBBoxComparator(object):
         (x2_start, y2_start, x2_end, y2_end) = coordinates2
 
         if MODE == "ENDPOINT_TRESHOLD":
-            TRESHOLD_VALUE = 30
+            TRESHOLD_VALUE = self.TRESHOLD_VALUE
             y_start_diff = abs(y1_start - y2_start)
             y_end_diff = abs(y1_end - y2_end)
             if (y_start_diff < TRESHOLD_VALUE and y_end_diff < TRESHOLD_VALUE):
@@ -180,25 +183,28 @@ class HocrBBoxComparator(object):
                         print("--------")
                         break
 
-    def get_matches_in_other_lists(self, my_list_index, my_ocr_lists, line_element):
+    def get_matches_in_other_lists(self, my_list_index, my_ocr_lists, line_element, list_indices=None):
+
+        if list_indices is None:
+            list_indices = [LineIntervalIndex(ocr_list) for ocr_list in my_ocr_lists]
 
         my_current_set = OCRset(len(my_ocr_lists), None, None)
         my_current_set.edit_line_set_value(my_list_index, line_element)
 
-        # this is the search loop which finds matches in each list
+        # this is the search loop which finds matches in each list, the index only returns
+        # lines within the 'ENDPOINT_TRESHOLD' of the line element in original list order
         for list_index, ocr_list in enumerate(my_ocr_lists):
             if list_index is my_list_index:
                 # don't compare the same list
                 continue
 
-            for line_element_compare in ocr_list:
+            candidates = list_indices[list_index].get_candidates(line_element.coordinates, self.TRESHOLD_VALUE)
+            for line_element_compare in candidates:
                 if Marker.is_not_marked(line_element_compare):
-                    cmpr_result = self.compare_coordinates(line_element.coordinates, line_element_compare.coordinates)
-                    if cmpr_result is True:
-                        Marker.mark_element(line_element_compare)
-                        my_current_set.edit_line_set_value(list_index, line_element_compare)
-                        if my_current_set.is_full():
-                            break
+                    Marker.mark_element(line_element_compare)
+                    my_current_set.edit_line_set_value(list_index, line_element_compare)
+                    if my_current_set.is_full():
+                        break
 
         Marker.mark_element(line_element)
         my_current_set.calculate_y_mean()
@@ -208,11 +214,14 @@ class HocrBBoxComparator(object):
 
         return_comparison = OCRcomparison(first_config_init)
 
+        # y-index for each list, so matching lines are found without scanning the whole lists
+        list_indices = [LineIntervalIndex(ocr_list) for ocr_list in ocr_lists]
+
         # this is the big loop which goes trough every element
         for list_index, ocr_list in enumerate(ocr_lists):
             for line_element in ocr_list:
                 if Marker.is_not_marked(line_element):
-                    set_created = self.get_matches_in_other_lists(list_index, ocr_lists, line_element)
+                    set_created = self.get_matches_in_other_lists(list_index, ocr_lists, line_element, list_indices)
                     return_comparison.add_set(set_created)
 
-        return return_comparison
\ No newline at end of file
+        return return_comparison
@@ -5,11 +5,10 @@ from n_dist_keying.ocr_comparison import OCRcomparison
 from n_dist_keying.ocr_set import OCRset
 from n_dist_keying.marker import Marker
 import pandas as pd
-from pandas.io.json import json_normalize
-import numpy as np
-import matplotlib.pyplot as plt
 import sys
-from sqlalchemy import create_engine
+from n_dist_keying.database_engine_pool import DatabaseEnginePool
+from n_dist_keying.native_ocr_loader import NativeOCRLoader
+from configuration.configuration_handler import ConfigurationHandler
 
 class HocrSQLComparator(object):
 
@@ -18,6 +17,12 @@ class HocrSQLComparator(object):
         self._abbyy_page = None
         self._tesseract_page = None
 
+        config_handler = ConfigurationHandler(first_init=False)
+        config = config_handler.get_config()
+        self._use_native_loaders = 'ExceptionInitializing' not in config and \
+                                   getattr(config, 'NATIVE_INPUT_LOADERS', False)
+        self._native_loader = NativeOCRLoader()
+
 
     def get_hocr_document(self, filename):
 
@@ -33,6 +38,14 @@ class HocrSQLComparator(object):
         :return: list of lines with boxes
         """
 
+        if self._use_native_loaders:
+            # read the per-line json-files directly if they are available, skips parsing the hocr
+            json_dir = NativeOCRLoader.get_ocropus_json_dir(filename)
+            if json_dir is not None:
+                df_dict = self._native_loader.create_table_ocropus_json(json_dir, ocr_profile)
+                self.dict2sql(df_dict, dbpath, filename)
+                return 0
+
         document = self.get_hocr_document(filename)
         page = document.pages[0]
 
@@ -85,6 +98,12 @@ class HocrSQLComparator(object):
 
     def create_table_abbyy(self, filename,dbpath=None,ocr_profile="None"):
 
+        if self._use_native_loaders and filename.endswith(".xml"):
+            # native FineReader xml, no hocr to parse
+            df_dict = self._native_loader.create_table_abbyy_xml(filename, ocr_profile)
+            self.dict2sql(df_dict, dbpath, filename)
+            return 0
+
         document = self.get_hocr_document(filename)
         page = document.pages[0]
 
@@ -154,21 +173,24 @@ class HocrSQLComparator(object):
         df_new = pd.DataFrame.from_dict(df_dict, orient='index')
         df_new = df_new.set_index(['ocr', 'line_idx', 'word_idx', 'char_idx'])
 
-        # creating and appending database
-        engine = create_engine(dbpath, echo=True)
+        # creating and appending database, the engine is shared for all files of one database
+        engine = DatabaseEnginePool.get_engine(dbpath)
+        batch_size = DatabaseEnginePool.get_batch_size()
         tablename = str(os.path.basename(filename)).split(".")[0]
 
-        # try to create a table
-        try:
-            df_new.to_sql(tablename, engine)
-            print(f'The table:"{tablename}" was created!')
-        except:
-            # loading the table
-            df_old = pd.read_sql_table(tablename, engine)
-            df_old = df_old.set_index(['ocr', 'line_idx', 'word_idx', 'char_idx'])
-            df_old.update(df_new)
-            df_old.to_sql(tablename, engine, if_exists='replace')
-            print(f'The table:"{tablename}" was updated!')
+        # all writes of one file are committed in a single transaction
+        with engine.begin() as connection:
+            if not DatabaseEnginePool.table_exists(connection, tablename):
+                # create a table
+                df_new.to_sql(tablename, connection, chunksize=batch_size)
+                print(f'The table:"{tablename}" was created!')
+            else:
+                # loading the table
+                df_old = pd.read_sql_table(tablename, connection)
+                df_old = df_old.set_index(['ocr', 'line_idx', 'word_idx', 'char_idx'])
+                df_old.update(df_new)
+                df_old.to_sql(tablename, connection, if_exists='replace', chunksize=batch_size)
+                print(f'The table:"{tablename}" was updated!')
 
     def compare_coordinates(self, coordinates1, coordinates2):
         MODE = "ENDPOINT_TRESHOLD"
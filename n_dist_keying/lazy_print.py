@@ -0,0 +1,90 @@
+"""
+    Drop-in replacement for 'ConditionalPrint' on top of the logging module, for the components
+    which print diagnostics from their per-word and per-character loops.
+
+    The arguments of a print are only joined to a message if the message is really emitted,
+    the components' print flags (i.e. PRINT_MSA_HANDLER) decide if the debug prints are passed
+    to the logger at all. For prints with expensive arguments, hot paths check 'enabled' once
+    and skip the whole block:
+
+        debug = self.cpr.enabled
+        ...
+        if debug:
+            self.cpr.print("aligned:", TypeCasts.convert_unicodelist_to_string(alignment))
+
+    The messages go to stdout without decoration like the prints before, the level of all
+    messages can be limited with 'LazyPrint.set_level' (configuration entry LOG_LEVEL, DEBUG
+    if it isn't set).
+"""
+
+import logging
+import sys
+
+
+class LazyMessage(object):
+    """
+        Message which is joined from its parts like print() does, when it's formatted by the logging handler
+    """
+    __slots__ = ("_parts",)
+
+    def __init__(self, parts):
+        self._parts = parts
+
+    def __str__(self):
+        return " ".join(str(part) for part in self._parts)
+
+
+class LazyPrint(object):
+
+    ROOT_LOGGER_NAME = "ocromore"
+    DEFAULT_LEVEL = "DEBUG"     # level if LOG_LEVEL isn't configured, the print flags decide about the prints
+    _root_logger = None
+
+    @classmethod
+    def get_root_logger(cls):
+        if cls._root_logger is None:
+            root_logger = logging.getLogger(cls.ROOT_LOGGER_NAME)
+            if not root_logger.handlers:
+                handler = logging.StreamHandler(sys.stdout)
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                root_logger.addHandler(handler)
+                root_logger.propagate = False
+            if root_logger.level == logging.NOTSET:
+                root_logger.setLevel(cls.DEFAULT_LEVEL)
+            cls._root_logger = root_logger
+        return cls._root_logger
+
+    @classmethod
+    def set_level(cls, level):
+        """
+        :param level: name like 'DEBUG', 'WARNING' or a logging level number
+        """
+        if isinstance(level, str):
+            level = logging.getLevelName(level.upper())
+        cls.get_root_logger().setLevel(level)
+
+    def __init__(self, print_enabled, print_exceptions, print_warnings, name="voter"):
+        self._root = self.get_root_logger()
+        self._logger = logging.getLogger(self.ROOT_LOGGER_NAME + "." + name)
+        self._print_enabled = bool(print_enabled)
+        self._print_exceptions = bool(print_exceptions)
+        self._print_warnings = bool(print_warnings)
+
+    @property
+    def enabled(self):
+        """
+        True if debug prints are emitted, use it as guard for prints with expensive arguments
+        """
+        return self._print_enabled and self._logger.isEnabledFor(logging.DEBUG)
+
+    def print(self, *args):
+        if self._print_enabled:
+            self._logger.debug("%s", LazyMessage(args))
+
+    def printw(self, *args):
+        if self._print_warnings:
+            self._logger.warning("%s", LazyMessage(args))
+
+    def printex(self, *args):
+        if self._print_exceptions:
+            self._logger.error("%s", LazyMessage(args))
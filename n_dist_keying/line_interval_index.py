@@ -0,0 +1,45 @@
+from bisect import bisect_left, bisect_right
+
+
+class LineIntervalIndex(object):
+    """
+        Index over the lines of one ocr-list, sorted by the y-start coordinate.
+        Finds the lines which have y-start and y-end within a treshold of a given line
+        with a binary search instead of comparing against each line of the list
+    """
+
+    def __init__(self, ocr_list):
+        self._ocr_list = ocr_list
+        y_starts = []
+        y_ends = []
+        for line in ocr_list:
+            (x_start, y_start, x_end, y_end) = line.coordinates
+            y_starts.append(y_start)
+            y_ends.append(y_end)
+
+        self._y_ends = y_ends
+        # list positions sorted by y-start
+        self._order = sorted(range(len(ocr_list)), key=lambda position: y_starts[position])
+        self._sorted_y_starts = [y_starts[position] for position in self._order]
+
+    def get_candidates(self, coordinates, treshold):
+        """
+        Lines with abs(y_start difference) < treshold and abs(y_end difference) < treshold
+        :param coordinates: (x_start, y_start, x_end, y_end) of the line to match
+        :param treshold: maximum difference (exclusive)
+        :return: matching lines in the order of the original list
+        """
+        (x_start, y_start, x_end, y_end) = coordinates
+
+        # y_start - treshold < candidate y_start < y_start + treshold
+        lower = bisect_right(self._sorted_y_starts, y_start - treshold)
+        upper = bisect_left(self._sorted_y_starts, y_start + treshold)
+
+        positions = []
+        for sorted_position in range(lower, upper):
+            position = self._order[sorted_position]
+            if abs(y_end - self._y_ends[position]) < treshold:
+                positions.append(position)
+        positions.sort()
+
+        return [self._ocr_list[position] for position in positions]
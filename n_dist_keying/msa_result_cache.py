@@ -0,0 +1,202 @@
+"""
+    On-disk cache for the msa best results of ocr_sets, the results are stored in json-files
+    which are named after a hash of the input:
+
+        - the engine names, texts, character confidences and word indices of the three lines
+        - the parameters of 'OCRset.calculate_msa_best_all'
+        - the voting relevant configuration entries (see 'VOTING_CONFIG_PREFIXES')
+
+    So reruns on the same corpus with the same voting settings, or lines which recur over
+    pages, take the voted text, the word segments, the mean voted confidence and the consensus
+    tier from the cache. If the cache exceeds the maximum size, the least recently used entries
+    are evicted.
+
+    The key doesn't contain the state which the voting components carry from line to line, and a
+    hit doesn't advance it, so the cache isn't used if one of these components is enabled
+    (see 'VoterSettings.uses_line_state').
+"""
+
+import os
+import json
+import hashlib
+from n_dist_keying.voter_settings import VoterSettings
+
+
+class MsaResultCache(object):
+
+    # increase this if the results of the msa change with the same inputs and configuration
+    CACHE_VERSION = 3
+
+    # configuration entries starting with these prefixes change the voted results
+    VOTING_CONFIG_PREFIXES = ("MSA_BEST_", "NDIST_VOTE_", "PREDICTOR_", "KEYING_RESULT_VOCABULARY_CORRECTION_VOTE",
+                              "KEYING_RESULT_VC_", "TABLE_RECOGNITION_")
+
+    # line data columns which go into the key
+    LINE_DATA_KEYS = ("char", "x_confs", "word_idx")
+
+    _caches = {}
+
+    @classmethod
+    def get_cache(cls, config):
+        """
+        One cache per directory for the whole process
+        :return: cache or None if the cache is disabled in config or can't be used with it
+        """
+        if not getattr(config, 'MSA_RESULT_CACHE_ENABLED', False) or VoterSettings.uses_line_state(config):
+            return None
+
+        cache_dir = os.path.abspath(config.MSA_RESULT_CACHE_DIR)
+        if cache_dir not in cls._caches:
+            cls._caches[cache_dir] = MsaResultCache(cache_dir, config.MSA_RESULT_CACHE_MAX_SIZE_MB * 1024 * 1024,
+                                                    cls.get_config_hash(config))
+        return cls._caches[cache_dir]
+
+    @classmethod
+    def get_config_hash(cls, config):
+        config_entries = []
+        for key, value in sorted(vars(config).items()):
+            if key.startswith(cls.VOTING_CONFIG_PREFIXES):
+                config_entries.append((key, str(value)))
+        config_entries.append(("CACHE_VERSION", cls.CACHE_VERSION))
+
+        return hashlib.sha256(json.dumps(config_entries).encode("utf-8")).hexdigest()
+
+    def __init__(self, cache_dir, max_size, config_hash):
+        self._cache_dir = cache_dir
+        self._max_size = max_size
+        self._config_hash = config_hash
+
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        # sizes of the existing entries, to decide about the eviction without scanning the folder each time
+        self._entry_sizes = {}
+        for root, dirs, files in os.walk(cache_dir):
+            for file in files:
+                if file.endswith(".json"):
+                    self._entry_sizes[os.path.join(root, file)] = os.path.getsize(os.path.join(root, file))
+        self._size = sum(self._entry_sizes.values())
+
+    def get_key(self, lines, texts, parameters):
+        """
+        Hash of the inputs of one ocr_set
+        :param lines: the three line objects in the order they are voted
+        :param texts: the texts of the lines
+        :param parameters: the parameters of the msa best calculation
+        :return: hex digest
+        """
+        key_entries = [self._config_hash, list(parameters)]
+        for line, text in zip(lines, texts):
+            if line is False or line is None or line is True:
+                key_entries.append(None)
+                continue
+
+            line_entry = {"text": text, "name": list(getattr(line, 'name', []) or [])}
+            data = getattr(line, 'data', None)
+            if data is not None:
+                for data_key in self.LINE_DATA_KEYS:
+                    if data_key in data:
+                        line_entry[data_key] = [str(value) for value in data[data_key]]
+            key_entries.append(line_entry)
+
+        return hashlib.sha256(json.dumps(key_entries, default=str).encode("utf-8")).hexdigest()
+
+    def _get_path(self, key):
+        return os.path.join(self._cache_dir, key[:2], key + ".json")
+
+    def load(self, key):
+        """
+        :return: tuple (text, text_seg, confidence, consensus tier, consensus confidence) or None if the entry
+                 isn't cached
+        """
+        path = self._get_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                entry = json.load(file)
+        except (IOError, OSError, ValueError):
+            self.misses += 1
+            return None
+
+        # refresh the access time for the eviction
+        os.utime(path, None)
+        self.hits += 1
+
+        text_seg = entry["text_seg"]
+        if text_seg is not None:
+            text_seg = {float(number): word for number, word in text_seg}
+        return entry["text"], text_seg, entry.get("confidence"), entry.get("consensus_tier"), \
+            entry.get("consensus_confidence")
+
+    def store(self, key, text, text_seg, confidence=None, consensus_tier=None, consensus_confidence=None):
+        if text_seg is not None:
+            text_seg = [(number, word) for number, word in text_seg.items()]
+        entry_str = json.dumps({"text": text, "text_seg": text_seg, "confidence": confidence,
+                                "consensus_tier": consensus_tier, "consensus_confidence": consensus_confidence})
+
+        path = self._get_path(key)
+        dir = os.path.dirname(path)
+        if not os.path.exists(dir):
+            os.makedirs(dir)
+
+        # write to a temporary file first, so an aborted run doesn't leave broken entries
+        path_tmp = path + ".tmp"
+        with open(path_tmp, "w", encoding="utf-8") as file:
+            file.write(entry_str)
+        os.replace(path_tmp, path)
+
+        entry_size = os.path.getsize(path)
+        self._size += entry_size - self._entry_sizes.get(path, 0)
+        self._entry_sizes[path] = entry_size
+        self.stores += 1
+
+        if self._size > self._max_size:
+            self.evict()
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache is below 90% of the maximum size
+        """
+        target_size = self._max_size * 0.9
+        entries = []
+        for path in self._entry_sizes:
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                entries.append((0, path))
+        entries.sort()
+
+        for mtime, path in entries:
+            if self._size <= target_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            self._size -= self._entry_sizes.pop(path)
+            self.evictions += 1
+
+    def get_stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "entries": len(self._entry_sizes),
+            "size_mb": self._size / (1024 * 1024),
+        }
+
+    @classmethod
+    def print_stats(cls):
+        for cache_dir, cache in cls._caches.items():
+            stats = cache.get_stats()
+            print("Msa result cache", cache_dir + ":")
+            print("  hits: %d misses: %d hit rate: %.2f%% stores: %d evictions: %d entries: %d size: %.2f MB" %
+                  (stats["hits"], stats["misses"], stats["hit_rate"] * 100, stats["stores"], stats["evictions"],
+                   stats["entries"], stats["size_mb"]))
@@ -0,0 +1,204 @@
+"""
+    Loaders which read the native engine outputs directly into the character records
+    used by 'HocrSQLComparator.line2dict', without generating and parsing an
+    intermediate hocr-file:
+
+        ocropus: the per-line '*.ocropy.json' files in the folder next to the hocr-file
+        abbyy:   FineReader10 xml files
+
+    The records have the same columns as the ones from the hocr-based path. The boxes are
+    filled like in 'line2dict', which stores the hocr bbox (x0, y0, x1, y1) in the columns
+    x0, x1, y0, y1 in this order, so the line matching compares the same values for all engines.
+"""
+
+import os
+import glob
+import json
+import xml.etree.ElementTree as ET
+
+
+class NativeOCRLoader(object):
+
+    # offset which is added to each character confidence, same as in 'HocrSQLComparator.line2dict'
+    XCONF_OFFSET = 4
+
+    @staticmethod
+    def get_ocropus_json_dir(filename):
+        """
+        Folder with the per-line json-files for a ocropus hocr-file,
+        i.e. '.../8500_001.3B.tif.hocr' -> '.../8500_001/'
+        :param filename: path of the hocr-file
+        :return: path of the folder, None if the folder doesn't exist
+        """
+        basename = os.path.basename(filename).split(".")[0]
+        json_dir = os.path.join(os.path.dirname(filename), basename)
+        if not os.path.isdir(json_dir):
+            return None
+        return json_dir
+
+    @staticmethod
+    def add_char_record(df_dict, idx, ocr, ocr_profile, lidx, widx, cidx, char, xconf, wconf, line_bbox, word_bbox):
+        """
+        Add one character to the records
+        :param line_bbox: (x0, y0, x1, y1) of the line, like the hocr bbox
+        :param word_bbox: (x0, y0, x1, y1) of the word, like the hocr bbox
+        :return: next free record index
+        """
+        df_dict[idx] = {
+            "ocr": ocr,
+            "ocr_profile": ocr_profile,
+            "line_idx": lidx,
+            "word_idx": widx,
+            "char_idx": cidx,
+            "char": char,
+            "char_eval": "",
+            "char_weight": -1.0,
+            "x_confs": float(xconf) + NativeOCRLoader.XCONF_OFFSET,
+            "w_confs": float(wconf),
+            "line_match": -1,
+            # same column order as the coordinates in 'HocrSQLComparator.line2dict'
+            "line_x0": int(line_bbox[0]),
+            "line_x1": int(line_bbox[1]),
+            "line_y0": int(line_bbox[2]),
+            "line_y1": int(line_bbox[3]),
+            "word_x0": int(word_bbox[0]),
+            "word_x1": int(word_bbox[1]),
+            "word_y0": int(word_bbox[2]),
+            "word_y1": int(word_bbox[3]),
+        }
+        return idx + 1
+
+    @staticmethod
+    def split_words(chars, keep_empty_words=False):
+        """
+        Split a sequence of (char, conf, bbox) entries at whitespaces
+        :param chars: list of tuples (char, conf, bbox), bbox can be None
+        :param keep_empty_words: each whitespace ends a word, so consecutive whitespaces give empty words
+                                 (ocropus does this, the empty words have an index and a box in its outputs)
+        :return: list of words, each word is a list of (char, conf, bbox)
+        """
+        words = []
+        current_word = []
+        for entry in chars:
+            if entry[0].isspace():
+                if current_word or keep_empty_words:
+                    words.append(current_word)
+                    current_word = []
+                continue
+            current_word.append(entry)
+        if current_word:
+            words.append(current_word)
+        return words
+
+    def create_table_ocropus_json(self, json_dir, ocr_profile=None):
+        """
+        Reads the '*.ocropy.json' files of one page, each file contains one line with
+        character probabilities and the line- and word-boxes in page coordinates
+        :param json_dir: folder of the page, the json-files are in the subfolders
+        :return: records dictionary like in 'HocrSQLComparator'
+        """
+        df_dict = {}
+        ocr = "Ocropus"
+        if not ocr_profile:
+            ocr_profile = "default"
+        idx = 0
+        lidx = 0
+
+        json_files = sorted(glob.glob(os.path.join(json_dir, "**", "*.ocropy.json"), recursive=True))
+        for json_file in json_files:
+            with open(json_file, "r", encoding="utf-8") as file:
+                line_json = json.load(file)
+
+            bboxes = line_json["bbox"]
+            line_bbox_json = bboxes["line"]
+            line_bbox = (line_bbox_json["x0"], line_bbox_json["y0"], line_bbox_json["x1"], line_bbox_json["y1"])
+            word_bboxes_json = bboxes.get("word", {})
+
+            chars_json = line_json.get("chars", {})
+            chars = []
+            for char_key in sorted(chars_json, key=int):
+                char_json = chars_json[char_key]
+                if char_json["char"] == "":
+                    # empty classes of the lstm-output, they aren't in the hocr-output (text and x_confs)
+                    continue
+                chars.append((char_json["char"], char_json["prob"], None))
+
+            words = self.split_words(chars, keep_empty_words=True)
+            if not any(words):
+                # lines without text aren't in the hocr-output
+                continue
+
+            for widx, word in enumerate(words):
+                word_bbox_json = word_bboxes_json.get(str(widx))
+                if word_bbox_json is not None:
+                    word_bbox = (word_bbox_json["x0"], word_bbox_json["y0"],
+                                 word_bbox_json["x1"], word_bbox_json["y1"])
+                else:
+                    word_bbox = line_bbox
+
+                # word confidence is the product of the character probabilities like in the ocropus hocr-output
+                wconf = 1.0
+                for char, prob, bbox in word:
+                    wconf *= prob
+                wconf *= 100
+
+                for cidx, (char, prob, bbox) in enumerate(word):
+                    idx = self.add_char_record(df_dict, idx, ocr, ocr_profile, lidx, widx, cidx, char,
+                                               prob * 100, wconf, line_bbox, word_bbox)
+            lidx += 1
+
+        return df_dict
+
+    def create_table_abbyy_xml(self, filename, ocr_profile=None):
+        """
+        Reads a FineReader10 xml file, the characters are in the
+        page/block/text/par/line/formatting/charParams elements
+        :param filename: path of the xml-file
+        :return: records dictionary like in 'HocrSQLComparator'
+        """
+        df_dict = {}
+        ocr = "Abbyy"
+        if not ocr_profile:
+            ocr_profile = "default"
+        idx = 0
+        lidx = 0
+
+        tree = ET.parse(filename)
+        root = tree.getroot()
+        # the schema namespace changes with the FineReader version, so match the local names only
+        for element in root.iter():
+            if self._localname(element.tag) != "line":
+                continue
+
+            line_bbox = (element.get("l"), element.get("t"), element.get("r"), element.get("b"))
+            chars = []
+            for char_params in element.iter():
+                if self._localname(char_params.tag) != "charParams" or not char_params.text:
+                    continue
+                bbox = (int(char_params.get("l")), int(char_params.get("t")),
+                        int(char_params.get("r")), int(char_params.get("b")))
+                conf = float(char_params.get("charConfidence", 0))
+                for char in char_params.text:
+                    chars.append((char, conf, bbox))
+
+            words = self.split_words(chars)
+            if not words:
+                continue
+
+            for widx, word in enumerate(words):
+                word_bbox = (min(entry[2][0] for entry in word), min(entry[2][1] for entry in word),
+                             max(entry[2][2] for entry in word), max(entry[2][3] for entry in word))
+                wconf = sum(entry[1] for entry in word) / len(word)
+
+                for cidx, (char, conf, bbox) in enumerate(word):
+                    idx = self.add_char_record(df_dict, idx, ocr, ocr_profile, lidx, widx, cidx, char,
+                                               conf, wconf, line_bbox, word_bbox)
+            lidx += 1
+
+        return df_dict
+
+    @staticmethod
+    def _localname(tag):
+        if "}" in tag:
+            return tag.split("}", 1)[1]
+        return tag
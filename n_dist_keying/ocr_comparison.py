@@ -3,9 +3,8 @@ from akf_corelib.random import Random
 from n_dist_keying.text_corrector import TextCorrector
 from akf_corelib.conditional_print import ConditionalPrint
 from configuration.configuration_handler import ConfigurationHandler
-import glob
-import numpy as np
-from itertools import chain
+from n_dist_keying.dataset_writer import DatasetTextWriter, DatasetHocrWriter
+from n_dist_keying.stage_metrics import NO_METRICS
 
 import os
 
@@ -16,7 +15,10 @@ class OCRcomparison:
         Storage class for multiple Ocr_Sets
     """
 
-    def __init__(self, predictor = None, vocabulary_checker = None, first_config_init=False):
+    def __init__(self, predictor = None, vocabulary_checker = None, first_config_init=False, metrics=None):
+        """
+        :param metrics: 'StageMetrics' the keying and correction steps are measured with
+        """
         self.ocr_sets = []
         self.line_height_information = []
         config_handler = ConfigurationHandler(first_init=first_config_init)
@@ -30,6 +32,7 @@ class OCRcomparison:
 
         self.predictor = predictor
         self.vocabulary_checker = vocabulary_checker
+        self.metrics = metrics if metrics is not None else NO_METRICS
 
     def load_predictor(self, predictor):
         self.predictor = predictor
@@ -80,15 +83,20 @@ class OCRcomparison:
             current_set.print_me(diff_only)
 
     def do_n_distance_keying(self, wordwise_keying = False):
+        for current_set in self.ocr_sets:
+            self.do_n_distance_keying_for_set(current_set, wordwise_keying)
+
+    def do_n_distance_keying_for_set(self, current_set, wordwise_keying = False):
+        start = self.metrics.clock()
 
         if wordwise_keying is False:
             # the keying is done on line base - this is the standard mode without database
-            for current_set in self.ocr_sets:
-                current_set.calculate_n_distance_keying()
+            current_set.calculate_n_distance_keying()
         else:
             # the keying is done wordwise - can be done with sets originated by database
-            for current_set in self.ocr_sets:
-                current_set.calculate_n_distance_keying_wordwise()
+            current_set.calculate_n_distance_keying_wordwise()
+
+        self.metrics.add_time("ndist_keying", start)
 
     def do_msa_best(self):
         for current_set in self.ocr_sets:
@@ -108,11 +116,9 @@ class OCRcomparison:
 
     def do_msa_best_new(self, use_ndist_pivot, use_longest_pivot, use_charconfs, use_wordwise, use_searchspaces, do_postcorrection):
 
-        if use_ndist_pivot is True:
-            self.do_n_distance_keying()
-
         for current_set in self.ocr_sets:
-            current_set.calculate_msa_best_all(use_ndist_pivot, use_longest_pivot, use_charconfs, use_wordwise, use_searchspaces)
+            self.do_msa_best_for_set(current_set, use_ndist_pivot, use_longest_pivot, use_charconfs, use_wordwise,
+                                     use_searchspaces)
 
 
         if do_postcorrection is True:
@@ -121,6 +127,20 @@ class OCRcomparison:
 
         print("done")
 
+    def do_msa_best_for_set(self, current_set, use_ndist_pivot, use_longest_pivot, use_charconfs, use_wordwise,
+                            use_searchspaces):
+        """
+        Msa best for a single set, the sets don't depend on each other in this step,
+        so this can be called for each set as it arrives
+        """
+        start = self.metrics.clock()
+        if use_ndist_pivot is True:
+            current_set.calculate_n_distance_keying()
+
+        current_set.calculate_msa_best_all(use_ndist_pivot, use_longest_pivot, use_charconfs, use_wordwise,
+                                           use_searchspaces)
+        self.metrics.add_time("msa_best", start)
+
     def print_n_distance_keying_results(self):
         self.cpr.print("N_DISTANCE_KEYING_RESULTS ")
         for current_set in self.ocr_sets:
@@ -192,185 +212,16 @@ class OCRcomparison:
         file.close()
 
     def save_dataset_to_file(self, filename, set_index, mode_add_linebreaks = False, other_set=""):
-
-        dir = os.path.dirname(filename)
-        if not os.path.exists(dir):
-            os.makedirs(dir)
-
-
-        file = open(filename, 'w+', encoding="utf-8")
-
-        previous_dataset_line = None
-        previous_dataset_line_index = None
-
-        for current_set in self.ocr_sets:
-            if other_set == 'msa_best':
-                dataset_text = current_set.get_msa_best_text()
-            elif other_set == 'ndist_keying':
-                dataset_text = current_set.get_shortest_n_distance_text()
-            else:
-                dataset_text = current_set.get_line_set_value_text(set_index)
-
-            # add comparison from previous to actual line break here
-            if mode_add_linebreaks:
-                dataset_line = current_set.get_line_set_value_line(set_index)
-                if dataset_line is True or dataset_line is False:
-                    continue
-
-                additional_breaks = \
-                    self.add_linebreaks(previous_dataset_line, dataset_line, previous_dataset_line_index, set_index,
-                                        self.line_height_information)
-
-                if additional_breaks is not None:
-                    file.write(additional_breaks)
-                previous_dataset_line = dataset_line
-                previous_dataset_line_index = set_index
-
-            # do not print lines which are mostly recognized with no content at the moment
-            if dataset_text is not None and dataset_text is not False:
-                file.write(dataset_text + "\n")
-
-        file.close()
+        writer = DatasetTextWriter(self, filename, set_index, mode_add_linebreaks, other_set)
+        for lidx, current_set in enumerate(self.ocr_sets):
+            writer.write_set(lidx, current_set)
+        writer.close()
 
     def save_dataset_to_hocr(self, filename, set_index, mode_add_linebreaks = False, other_set=""):
-        #TODO: Import const to config or/and rework imagepath generating
-        filename = os.path.normpath(filename).replace("\\","/")
-        IMG_PATH = "/media/sf_ShareVB/many_years_firmprofiles/"
-        IMG_FILETYPES = [".jpg"]
-        imgdir = "None"
-        if IMG_PATH != "":
-            imgname = "_".join(filename.split("/")[-1].replace("msa_best","").split("_")[:-1])
-            if imgname[-3:] == "msa":
-                imgname = imgname[:-3]
-            imgfolder = filename.split("/")[-2]
-            imgpath = IMG_PATH+"**/"+imgfolder+"/**/"+imgname+"*"
-            imgdirs = list(chain.from_iterable(glob.iglob(imgpath+ filetype, recursive=True) for filetype in IMG_FILETYPES))
-            if imgdirs is not None and len(imgdirs) > 0:
-                imgdir = imgdirs[0]
-
-        filename += ".hocr"
-        dir = os.path.dirname(filename)
-        if not os.path.exists(dir):
-            os.makedirs(dir)
-
-        file = open(filename, 'w+', encoding="utf-8")
-        wrote_header = False
+        writer = DatasetHocrWriter(filename, set_index, len(self.ocr_sets), mode_add_linebreaks, other_set)
         for lidx, current_set in enumerate(self.ocr_sets):
-            if lidx == 0:
-                for last_set in self.ocr_sets[lidx]._set_lines:
-                    if last_set.data["line_x1"] != []:
-                        file_cords = last_set.data
-                        break
-            if other_set == 'msa_best':
-                dataset_text = current_set.get_msa_best_text()
-                dataset_bbox = None
-                name = ["msa","combined"]
-                for lines in current_set._set_lines:
-                    ldata = lines.data
-                    if dataset_bbox is None and ldata["line_x0"]:
-                        dataset_bbox = [min(ldata["line_x0"]), min(ldata["line_y0"]), max(ldata["line_x1"]),
-                                        max(ldata["line_y1"])]
-                    elif ldata["line_x0"]:
-                        if min(ldata["line_x0"]) < dataset_bbox[0]:
-                            dataset_bbox[0] = min(ldata["line_x0"])
-                        if min(ldata["line_y0"]) < dataset_bbox[1]:
-                            dataset_bbox[1] = min(ldata["line_y0"])
-                        if max(ldata["line_x1"]) > dataset_bbox[2]:
-                            dataset_bbox[2] = max(ldata["line_x1"])
-                        if max(ldata["line_y1"]) > dataset_bbox[3]:
-                            dataset_bbox[3] = max(ldata["line_y1"])
-            else:
-                dataset_text = current_set.get_line_set_value_text(set_index)
-                dataset_bbox = None
-                ldata = current_set._set_lines[set_index].data
-                name =  current_set._set_lines[set_index].name
-                if ldata["line_x0"]:
-                    dataset_bbox = [min(ldata["line_x0"]), min(ldata["line_y0"]), max(ldata["line_x1"]),
-                                    max(ldata["line_y1"])]
-
-            # do not print lines which are mostly recognized with no content at the moment
-            if dataset_text is not None and dataset_text is not False and dataset_bbox:
-                if wrote_header == False:
-                    wrote_header = True
-                    hocr_header = f'''<?xml version="1.0" encoding="UTF-8"?>
-<!DOCTYPE html PUBLIC "-//W3C//DTD XHTML 1.0 Transitional//EN"
-"http://www.w3.org/TR/xhtml1/DTD/xhtml1-transitional.dtd">
-    <html xmlns="http://www.w3.org/1999/xhtml" xml:lang="en" lang="en">
-        <head>
-            <title>OCR Results</title>
-            <meta http-equiv="content-type" content="text/html; charset=utf-8" />
-            <meta name='AKF-OCR' content='{name[0]}-{name[1]}' />
-            <meta name='ocr-capabilities' content='ocr_line ocrx_word'/>
-        </head>
-        <body>
-            <div class='ocr_page' title='image {imgdir}; bbox 0 0 {int(file_cords["line_x1"][0])} {int(file_cords["line_y1"][0])}'>\n'''
-                    file.write(hocr_header)
-                dtext = self._write_line_infos(dataset_bbox, dataset_text, set_index, other_set, lidx, current_set)
-                file.write(dtext)
-            if lidx == len(self.ocr_sets)-2:
-                file.write("\t\t</div>\n\t</body>\n</html>")
-                break
-        file.close()
-
-    def _write_line_infos(self,dataset_bbox, dataset_text,set_index, other_set,lidx, current_set):
-        dtext = f'''            <span class ='ocr_line' title='bbox {int(dataset_bbox[0])} {int(dataset_bbox[1])} {int(dataset_bbox[2])} {int(dataset_bbox[3])}' ><br/>\n'''
-        if other_set == "msa_best":
-            if current_set._text_seg == None:
-                dtext += f'''                <span  class ='ocrx_word' title='bbox {int(dataset_bbox[0])} {int(dataset_bbox[1])} {int(dataset_bbox[2])} {int(dataset_bbox[3])}' >{dataset_text}</span >\n'''
-            else:
-                for number, word in current_set._text_seg.items():
-                    if number != -1.0:
-                        set_index = 2
-                        if number in current_set._set_lines[1].word["UID"].keys() and \
-                                set(current_set._set_lines[1].word["text"][number]) != set("¦") and \
-                                current_set._set_lines[1].data["word_x0"]:
-                            set_index = 1
-                        elif number in current_set._set_lines[0].word["UID"].keys() and \
-                                set(current_set._set_lines[0].word["text"][number]) != set("¦") and \
-                                current_set._set_lines[0].data["word_x0"]:
-                            set_index = 0
-                        dataset_bbox = self._get_wbbox_new(dataset_bbox,number,current_set._set_lines[set_index].data)
-                    dtext += f'''                <span  class ='ocrx_word' title='bbox {int(dataset_bbox[0])} {int(dataset_bbox[1])} {int(dataset_bbox[2])} {int(dataset_bbox[3])}' >{word}</span >\n'''
-                    set_index= 0
-        else:
-            for number, word in current_set._set_lines[set_index].word["text"].items():
-                dataset_bbox = self._get_wbbox(dataset_bbox,number,current_set._set_lines[set_index].word["UID"],current_set._set_lines[set_index].data)
-                dtext +=f'''                <span  class ='ocrx_word' title='bbox {int(dataset_bbox[0])} {int(dataset_bbox[1])} {int(dataset_bbox[2])} {int(dataset_bbox[3])}' >{word}</span >\n'''
-        dtext += f'''            </span>\n'''
-        return dtext
-
-    def _get_wbbox(self,bbox, number, nb_dict, data, avg=True):
-        wbbox_pos = 0
-        for nbkey in nb_dict:
-            if nbkey != number:
-                if wbbox_pos == 0: wbbox_pos=-1
-                wbbox_pos += len(nb_dict[nbkey])
-            else:
-                wbbox_pos += len(nb_dict[nbkey])/2
-                break
-        if wbbox_pos != 0:
-            if number != 0.0:
-                bbox[0] = data["word_x0"][int(wbbox_pos)]
-            bbox[2] = data["word_x1"][int(wbbox_pos)]
-        return bbox
-
-    def _get_wbbox_new(self,bbox, number, data, avg=True):
-        uid_arr = np.array(data["UID"])
-        wc_arr = np.where(uid_arr == -1)
-        nb_arr = np.array(data["word_match"])
-        nb_arr = np.delete(nb_arr,wc_arr)
-        #for wc_pos in wc_arr[0]:
-        #    del nb_arr[wc_pos]
-        nb_pos = np.where(nb_arr==number)
-        if len(nb_pos[0]) == 0:
-            stop="STOP"
-            #return
-        wbbox_pos = nb_pos[0][int(len(nb_pos[0])/2)]
-        if wbbox_pos != 0:
-            bbox[0] = data["word_x0"][int(nb_pos[0][0])]
-            bbox[2] = data["word_x1"][int(nb_pos[0][-1])]
-        return bbox
-
+            writer.write_set(lidx, current_set)
+        writer.close()
 
     def export_text_lines(self):
         """
@@ -392,56 +243,69 @@ class OCRcomparison:
     def do_vocabulary_correction(self):
         store_last_entry = None
         for current_set in self.ocr_sets:
-            msa_best_text = current_set.get_msa_best_text()
-            msa_best_text_corrected = ""
-            msa_best_ttokenized = msa_best_text.split()
-
-            len_tokens = len(msa_best_ttokenized)
-            for word_index, word in enumerate(msa_best_ttokenized):
-                #if "Tee" in word:
-                #    print("asd")
-
-                if self.config.KEYING_RESULT_VC_IGNORE_SEPERATE_WRITING_CORRECTION:
-                    if store_last_entry != None:
-                        # don't correct first follow up line word to seperation word
-                        store_last_entry = None
-                        msa_best_text_corrected += " " + word
-                        continue
-
-                    if len_tokens-1 == word_index:
-                        tdash = self.vocabulary_checker.word_trails_with_dash(word)
-                        if tdash:
-                            store_last_entry = word
-                            msa_best_text_corrected += " " + word
-                            continue
+            store_last_entry = self.do_vocabulary_correction_for_set(current_set, store_last_entry)
 
-                word_wo_sc, ratio = self.vocabulary_checker.without_special_chars(word)
-                if ratio == 0 or len(word_wo_sc) <= 2:
+    def do_vocabulary_correction_for_set(self, current_set, store_last_entry):
+        """
+        Vocabulary correction of the msa best text of one set
+        :param store_last_entry: state from the previous set (word seperated with dash at the end of line)
+        :return: state for the next set
+        """
+        start = self.metrics.clock()
+        msa_best_text = current_set.get_msa_best_text()
+        msa_best_text_corrected = ""
+        msa_best_ttokenized = msa_best_text.split()
+
+        len_tokens = len(msa_best_ttokenized)
+        self.metrics.count("words_vocabulary_checked", len_tokens)
+        for word_index, word in enumerate(msa_best_ttokenized):
+            #if "Tee" in word:
+            #    print("asd")
+
+            if self.config.KEYING_RESULT_VC_IGNORE_SEPERATE_WRITING_CORRECTION:
+                if store_last_entry != None:
+                    # don't correct first follow up line word to seperation word
+                    store_last_entry = None
                     msa_best_text_corrected += " " + word
                     continue
 
-                word_wb, bstart, btrail, changeb = self.vocabulary_checker.remove_and_give_borders(word)
-                if changeb:
-                    word_correct_vc, suggestions, first_letter_high = self.vocabulary_checker.correct_text(word_wb)
-                    if word_correct_vc is None:
-                        word_correct = word
-                    else:
-                        word_correct = bstart + word_correct_vc + btrail
-                else:
-                    word_correct, suggestions, first_letter_high = self.vocabulary_checker.correct_text(word)
+                if len_tokens-1 == word_index:
+                    tdash = self.vocabulary_checker.word_trails_with_dash(word)
+                    if tdash:
+                        store_last_entry = word
+                        msa_best_text_corrected += " " + word
+                        continue
 
-                if word_correct is None:
-                    msa_best_text_corrected += " " + word
+            word_wo_sc, ratio = self.vocabulary_checker.without_special_chars(word)
+            if ratio == 0 or len(word_wo_sc) <= 2:
+                msa_best_text_corrected += " " + word
+                continue
+
+            word_wb, bstart, btrail, changeb = self.vocabulary_checker.remove_and_give_borders(word)
+            if changeb:
+                word_correct_vc, suggestions, first_letter_high = self.vocabulary_checker.correct_text(word_wb)
+                if word_correct_vc is None:
+                    word_correct = word
                 else:
-                    msa_best_text_corrected += " " + word_correct
+                    word_correct = bstart + word_correct_vc + btrail
+            else:
+                word_correct, suggestions, first_letter_high = self.vocabulary_checker.correct_text(word)
 
-            msa_best_text_corrected = msa_best_text_corrected.lstrip(" ")
+            if word_correct is None:
+                msa_best_text_corrected += " " + word
+            else:
+                msa_best_text_corrected += " " + word_correct
 
-            if self.config.KEYING_RESULT_VC_PRINTDIFF and msa_best_text_corrected != msa_best_text:
-                print("vocab in :", msa_best_text)
-                print("vocab out:", msa_best_text_corrected)
+        msa_best_text_corrected = msa_best_text_corrected.lstrip(" ")
 
-            current_set.set_msa_best_text(msa_best_text_corrected)
+        if self.config.KEYING_RESULT_VC_PRINTDIFF and msa_best_text_corrected != msa_best_text:
+            print("vocab in :", msa_best_text)
+            print("vocab out:", msa_best_text_corrected)
+
+        current_set.set_msa_best_text(msa_best_text_corrected)
+
+        self.metrics.add_time("vocabulary_correction", start)
+        return store_last_entry
 
 
 
@@ -458,15 +322,20 @@ class OCRcomparison:
             return
 
         for current_set in self.ocr_sets:
-            if postcorrect_ndist:
-                sd_line_text = current_set.get_shortest_n_distance_text()
-                if sd_line_text is not None and sd_line_text is not True and sd_line_text is not False:
-                    sd_line_text_corrected = TextCorrector.correct_line_text(sd_line_text)
-                    current_set.set_shortest_n_distance_text(sd_line_text_corrected)
-            if postcorrect_msa:
-                msa_best_text = current_set.get_msa_best_text()
-                if msa_best_text is not None and msa_best_text is not True and msa_best_text is not False:
-                    msa_best_text_corrected = TextCorrector.correct_line_text(msa_best_text)
-                    current_set.set_msa_best_text(msa_best_text_corrected)
+            self.do_postcorrection_for_set(current_set, postcorrect_ndist, postcorrect_msa)
+
+    def do_postcorrection_for_set(self, current_set, postcorrect_ndist=False, postcorrect_msa=False):
+        start = self.metrics.clock()
+        if postcorrect_ndist:
+            sd_line_text = current_set.get_shortest_n_distance_text()
+            if sd_line_text is not None and sd_line_text is not True and sd_line_text is not False:
+                sd_line_text_corrected = TextCorrector.correct_line_text(sd_line_text)
+                current_set.set_shortest_n_distance_text(sd_line_text_corrected)
+        if postcorrect_msa:
+            msa_best_text = current_set.get_msa_best_text()
+            if msa_best_text is not None and msa_best_text is not True and msa_best_text is not False:
+                msa_best_text_corrected = TextCorrector.correct_line_text(msa_best_text)
+                current_set.set_msa_best_text(msa_best_text_corrected)
+        self.metrics.add_time("postcorrection", start)
 
 
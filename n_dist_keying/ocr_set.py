@@ -1,8 +1,13 @@
 from n_dist_keying.text_unspacer import TextUnspacer
 from n_dist_keying.n_distance_voter import NDistanceVoter
+from n_dist_keying.distance_matrix import DistanceMatrix
+from n_dist_keying.consensus_checker import ConsensusChecker
+from n_dist_keying.msa_result_cache import MsaResultCache
+from n_dist_keying.stage_metrics import NO_METRICS
+from n_dist_keying.voting_budget import VotingBudgetExceeded
 import numpy as np
 from akf_corelib.random import Random
-from akf_corelib.conditional_print import ConditionalPrint
+from n_dist_keying.lazy_print import LazyPrint
 from configuration.configuration_handler import ConfigurationHandler
 
 
@@ -17,7 +22,7 @@ class OCRset:
     """
     N_DISTANCE_SHORTEST_TAG = "n_distance_shortest"
 
-    def __init__(self, lines_size, y_mean, msa_handler):
+    def __init__(self, lines_size, y_mean, msa_handler, pipeline_context=None):
         lineset = []
         for x in range(0, lines_size):
             lineset.append(False)
@@ -28,22 +33,44 @@ class OCRset:
         self.shortest_distance_line_index = -1
         self._unspaced = False  # indicates the set_lines was unspaced
         self._refspaced = False # indicates the set_lines was reference spaced
-        self._text_unspacer = TextUnspacer()
+        self._pipeline_context = pipeline_context
         self.shortest_distance_line = None  # holder element for recognized shortest distance line
         self._best_msa_text =""
         self._text_seg = None
+        self.consensus_tier = None  # tier of the msa best decision, see 'ConsensusChecker'
+        self.consensus_confidence = None  # mean char confidence of the line taken on a consensus tier
+        self.msa_best_confidence = None  # mean accumulated confidence of the characters voted by the msa
+        self.budget_fallback = False  # the msa exceeded its time budget, the n-distance keying line was taken
         self._is_origin_database = False
         self._database_handler = None
-        config_handler = ConfigurationHandler(first_init=False)
-        self._config = config_handler.get_config()
 
-        if 'ExceptionInitializing' in self._config:
-            print("Exception initializing config, don't print")
-            self._cpr = ConditionalPrint(False, False, False)
+        if pipeline_context is not None:
+            # take the shared components instead of creating them for each set
+            self._text_unspacer = pipeline_context.text_unspacer
+            self._config = pipeline_context.config
+            self._cpr = pipeline_context.ocr_set_cpr
+            self._metrics = pipeline_context.metrics
+            self._consensus_checker = pipeline_context.consensus_checker
+            self._use_consensus_tiers = pipeline_context.use_consensus_tiers
         else:
+            self._metrics = NO_METRICS
+            self._text_unspacer = TextUnspacer()
+            config_handler = ConfigurationHandler(first_init=False)
+            self._config = config_handler.get_config()
+
+            if 'ExceptionInitializing' in self._config:
+                print("Exception initializing config, don't print")
+                self._cpr = LazyPrint(False, False, False, "ocr_set")
+            else:
+
+                self._cpr = LazyPrint(self._config.PRINT_MSA_HANDLER, self._config.PRINT_EXCEPTION_LEVEL,
+                                      self._config.PRINT_WARNING_LEVEL, "ocr_set")
 
-            self._cpr = ConditionalPrint(self._config.PRINT_MSA_HANDLER, self._config.PRINT_EXCEPTION_LEVEL,
-                                        self._config.PRINT_WARNING_LEVEL)
+            self._use_consensus_tiers = ConsensusChecker.is_enabled(self._config)
+            if self._use_consensus_tiers:
+                self._consensus_checker = ConsensusChecker.from_config(self._config)
+            else:
+                self._consensus_checker = ConsensusChecker()
 
         self._msa_handler = msa_handler
 
@@ -155,21 +182,30 @@ class OCRset:
 
 
 
-    def calculate_n_distance_keying(self):
+    def calculate_n_distance_keying(self, texts=None):
+        """
+        :param texts: texts of the lines, taken from the lines if None
+        """
 
         # get the texts
-        texts = []
-        for line in self._set_lines:
-            text = self.get_line_content(line)
-            texts.append(text)
+        if texts is None:
+            texts = []
+            for line in self._set_lines:
+                text = self.get_line_content(line)
+                texts.append(text)
 
-        self._n_distance_voter = NDistanceVoter(texts)
         if "ExceptionInitializing" in self._config.keys():
             print("Exception in initializing config using default in c")
+            self._n_distance_voter = NDistanceVoter(texts)
             shortest_dist_index = self._n_distance_voter.compare_texts( \
                     take_longest_on_empty_lines = True, \
                     vote_without_spaces = False)
         else:
+            if self._pipeline_context is not None:
+                distance_matrix = self._pipeline_context.ndist_distance_matrix
+            else:
+                distance_matrix = DistanceMatrix(self._config.NDIST_DISTANCE_MODE, self._config.NDIST_EARLY_EXIT)
+            self._n_distance_voter = NDistanceVoter(texts, distance_matrix)
             shortest_dist_index = self._n_distance_voter.compare_texts( \
                     take_longest_on_empty_lines = self._config.NDIST_VOTE_LONGEST_IF_EMPTY_STRINGS, \
                     vote_without_spaces = self._config.NDIST_VOTE_WITHOUT_SPACES)
@@ -383,6 +419,67 @@ class OCRset:
         # fetch the lines to process and info which (and how many) lines are ok
         texts, lines, lines_ok, number_lines_ok = self.obtain_line_info(best_index, other_indices)
 
+        # take the result from the cache if the same inputs were already voted
+        msa_result_cache = None
+        if 'ExceptionInitializing' not in self._config:
+            msa_result_cache = MsaResultCache.get_cache(self._config)
+        if msa_result_cache is not None:
+            # the key is created before the msa, because the msa changes the lines
+            cache_key = msa_result_cache.get_key(lines, texts, (use_ndist_pivot, use_longest_pivot, use_charconfs,
+                                                                use_wordwise, use_searchspaces, best_index))
+            cached_result = msa_result_cache.load(cache_key)
+            if cached_result is not None:
+                self._metrics.count("msa_cache_hits")
+                self._best_msa_text, self._text_seg, self.msa_best_confidence, self.consensus_tier, \
+                    self.consensus_confidence = cached_result
+                if self.consensus_tier is not None:
+                    # counted like the set was decided again
+                    self._consensus_checker.count(self.consensus_tier)
+                    self._metrics.count("lines_tier_" + self.consensus_tier)
+                return
+            self._metrics.count("msa_cache_misses")
+
+        self.calculate_msa_best_lines(texts, lines, lines_ok, number_lines_ok, use_charconfs, use_wordwise,
+                                      use_searchspaces)
+
+        # a fallback depends on the time it took, so it isn't cached
+        if msa_result_cache is not None and not self.budget_fallback:
+            msa_result_cache.store(cache_key, self._best_msa_text, self._text_seg, self.msa_best_confidence,
+                                   self.consensus_tier, self.consensus_confidence)
+
+    def calculate_msa_best_lines(self, texts, lines, lines_ok, number_lines_ok, use_charconfs, use_wordwise,
+                                 use_searchspaces):
+
+        # skip the msa if the engines already agree
+        if self._use_consensus_tiers:
+            if self.calculate_consensus(texts, lines, lines_ok, use_wordwise):
+                return
+
+        voting_budget = self._msa_handler.voting_budget
+        if not voting_budget.enabled:
+            self.calculate_msa_voting(lines, number_lines_ok, use_charconfs, use_wordwise, use_searchspaces)
+            return
+
+        # the msa changes the lines, the fallback is done with their state from before
+        set_snapshots = [self.get_line_snapshot(line) for line in self._set_lines]
+        if voting_budget.table_exhausted():
+            self.calculate_budget_fallback(set_snapshots, use_wordwise)
+            return
+
+        voting_budget.start_line()
+        try:
+            self.calculate_msa_voting(lines, number_lines_ok, use_charconfs, use_wordwise, use_searchspaces)
+        except VotingBudgetExceeded as ex:
+            self._cpr.print("msa exceeded the time budget, taking the n-distance keying line:", ex)
+            self.calculate_budget_fallback(set_snapshots, use_wordwise)
+        finally:
+            voting_budget.end_line()
+
+    def calculate_msa_voting(self, lines, number_lines_ok, use_charconfs, use_wordwise, use_searchspaces):
+
+        # collect the confidences of the characters voted for this set
+        self._msa_handler.ocr_voter.reset_voted_confidences()
+
         # do the msa if there is at least one line ok (confidence vote can be done with one line also :))
         if use_wordwise is True:
             if number_lines_ok != 0:
@@ -404,8 +501,65 @@ class OCRset:
                 result = None
 
         self._best_msa_text = result
+        self.msa_best_confidence = self._msa_handler.ocr_voter.get_mean_voted_confidence()
+
 
 
+    def calculate_consensus(self, texts, lines, lines_ok, use_wordwise):
+        """
+        Takes the text directly if all engines, or a confident majority of them, agree
+        :return: True if a text was taken, False if the msa has to be done
+        """
+        consensus_checker = self._consensus_checker
+
+        tier, line_index, text = consensus_checker.decide(texts, lines, lines_ok)
+        self.consensus_tier = tier
+        self._metrics.count("lines_tier_" + tier)
+        if line_index is None:
+            return False
+
+        self._cpr.print("consensus on tier", tier, "taking:", text)
+        self._best_msa_text = text
+        self.consensus_confidence = consensus_checker.get_mean_confidence(lines[line_index])
+        if use_wordwise is True:
+            self._text_seg = consensus_checker.get_text_segments(ConsensusChecker.get_word_texts(lines[line_index]),
+                                                                 text)
+        return True
+
+    def get_line_snapshot(self, line):
+        """
+        State of a line which the budget fallback takes, from before the msa changes the line
+        (the msa updates the texts and confidences of the words)
+        :return: tuple (text, word texts, mean confidence)
+        """
+        text = self.get_line_content(line)
+        if text is False:
+            return False, {}, None
+        return text, dict(ConsensusChecker.get_word_texts(line)), ConsensusChecker.get_mean_confidence(line)
+
+    def calculate_budget_fallback(self, set_snapshots, use_wordwise):
+        """
+        Takes the line selected by the n-distance keying instead of the msa result, if the msa
+        exceeded its time budget
+        :param set_snapshots: snapshots of the lines of this set before the msa, see 'get_line_snapshot'
+        """
+        set_texts = [text for text, word_texts, confidence in set_snapshots]
+        self.calculate_n_distance_keying(set_texts)
+
+        consensus_checker = self._consensus_checker
+        text, word_texts, confidence = set_snapshots[self.shortest_distance_line_index]
+        if text is False or text is None:
+            # no line of the set is defined, like the msa result in this case
+            self._best_msa_text = None
+        else:
+            self._best_msa_text = consensus_checker.normalize_text(text)
+            if use_wordwise is True:
+                self._text_seg = consensus_checker.get_text_segments(word_texts, self._best_msa_text)
+        self.consensus_confidence = confidence
+        self.msa_best_confidence = None
+        self.budget_fallback = True
+        self.consensus_tier = consensus_checker.recount(self.consensus_tier, ConsensusChecker.TIER_BUDGET_FALLBACK)
+        self._metrics.count("lines_budget_fallback")
 
     def calculate_msa_best_charconf(self, take_n_dist_best_index=False, take_longest_as_pivot = True):
 
@@ -2,10 +2,13 @@ from akf_corelib.queues import SearchSpace
 from n_dist_keying.search_space_processor import SearchSpaceProcessor
 import numpy as np
 import inspect
-from akf_corelib.conditional_print import ConditionalPrint
+import time
+from n_dist_keying.lazy_print import LazyPrint
 from akf_corelib.random import Random
 from configuration.configuration_handler import ConfigurationHandler
 from akf_corelib.queues import Filo
+from n_dist_keying.voter_settings import VoterSettings, ConfidenceModifications
+from n_dist_keying.stage_metrics import NO_METRICS
 
 class SpecialChars():
     # increment some special characters confidence when recognized
@@ -17,37 +20,52 @@ class SpecialChars():
     special_char_increment = 27
     percentage_increment = 45
 
-class ConfidenceModifications():
-    # scaling factors for confidence values of engines
-    # used if configuration flag MSA_BEST_VOTER_SCALE_ENGINE_CONFIDENCES is active
-    # 98,02 in 1969
-    tesseract_factor = 1.00 #95
-    ocropus_factor = 0.90 #90
-    abby_factor = 0.98    # 1.00 -99,60
-
-    # 97,62 in 1969
-    #abby_factor = 0.79
-    #ocropus_factor = 0.98
-    #tesseract_factor = 0.979
-    whitespace_push = 100
-
 class OCRVoter(object):
 
-    def __init__(self):
+    def __init__(self, settings=None):
+        """
+        :param settings: compiled 'VoterSettings', created from the configuration if None
+        """
         config_handler = ConfigurationHandler(first_init=False)
         self.config = config_handler.get_config()
-        self.cpr = ConditionalPrint(self.config.PRINT_MSA_HANDLER, self.config.PRINT_EXCEPTION_LEVEL,
-                                    self.config.PRINT_WARNING_LEVEL)
-        self.cpr_vocab_check = ConditionalPrint(self.config.PRINT_VOCABULARY_CHECKER, self.config.PRINT_EXCEPTION_LEVEL,
-                                    self.config.PRINT_WARNING_LEVEL)
-        self.cpr_sc_predict = ConditionalPrint(self.config.PRINT_SPECIALCHAR_PREDICTOR, self.config.PRINT_EXCEPTION_LEVEL,
-                                    self.config.PRINT_WARNING_LEVEL)
+        if settings is None:
+            settings = VoterSettings.from_config(self.config)
+        self.settings = settings
+        self.cpr = LazyPrint(self.config.PRINT_MSA_HANDLER, self.config.PRINT_EXCEPTION_LEVEL,
+                             self.config.PRINT_WARNING_LEVEL, "ocr_voter")
+        self.cpr_vocab_check = LazyPrint(self.config.PRINT_VOCABULARY_CHECKER, self.config.PRINT_EXCEPTION_LEVEL,
+                                         self.config.PRINT_WARNING_LEVEL, "vocabulary_checker")
+        self.cpr_sc_predict = LazyPrint(self.config.PRINT_SPECIALCHAR_PREDICTOR, self.config.PRINT_EXCEPTION_LEVEL,
+                                        self.config.PRINT_WARNING_LEVEL, "specialchar_predictor")
 
         self.filo_last_chars = Filo(250)
         self.predictor = None
         self.use_aufsichtsrat_prediction = False
         self.vocab_checker = None
         self.previous_word_with_seperator = False
+        # accumulated confidences of the voted characters since the last reset, used for the stored results
+        self.voted_confidences = []
+        self.metrics = NO_METRICS  # set by the msa handler
+
+    def reset_table_state(self):
+        """
+        Resets the state which is carried from line to line within a table (predictor history, separated words)
+        """
+        self.filo_last_chars = Filo(250)
+        self.use_aufsichtsrat_prediction = False
+        self.previous_word_with_seperator = False
+        self.voted_confidences = []
+
+    def reset_voted_confidences(self):
+        self.voted_confidences = []
+
+    def get_mean_voted_confidence(self):
+        """
+        :return: mean accumulated confidence of the characters voted since the last reset or None
+        """
+        if len(self.voted_confidences) == 0:
+            return None
+        return sum(self.voted_confidences) / len(self.voted_confidences)
 
     def add_predictor(self, predictor):
         self.predictor = predictor
@@ -103,17 +121,14 @@ class OCRVoter(object):
             # if there is two wildcards and one characters, characters confidence has to be higher than
             # WILDCARD_TRESH to be taken
 
-            wildcard_tresh = 98.5
-            if self.config.MSA_BEST_CHANGE_VOTING_TRESHS_ON_EMPTY_LINE:
-                wildcard_tresh -= 10  # 0:99,19%, 20:99.16%, 10:99.27%
-
-            return 1, wildcard_tresh
+            # 98.5, lowered by 10 if MSA_BEST_CHANGE_VOTING_TRESHS_ON_EMPTY_LINE (0:99,19%, 20:99.16%, 10:99.27%)
+            return 1, self.settings.wildcard_tresh
 
         elif char1 == wildcard_char and same_ctr == 0:
             pass  # todo maybe cover this case (cause wildcard has no confidence i.e if the two otherchars are very low prob, take wildcard)
         elif char1 == '' and same_ctr == 0:
             pass  # todo maybe cover this case (cause space has no confidence ...
-        elif self.config.MSA_BEST_VOTING_DOWNSCALE_ONLY_SC \
+        elif self.settings.downscale_only_sc \
             and Random.is_special_character(char1) and same_ctr == 0 \
             and char2 == wildcard_char and char3 == wildcard_char:
             # lower the confidence of special characters which stand without any other chars
@@ -170,9 +185,10 @@ class OCRVoter(object):
             key_confs_mapping = 'UID'
             key_confs = 'x_confs'
             key_char = 'calc_char'
-            self.cpr.print("vote_text1", line_1.textstr)
-            self.cpr.print("vote_text2", line_2.textstr)
-            self.cpr.print("vote_text3", line_3.textstr)
+            if self.cpr.enabled:
+                self.cpr.print("vote_text1", line_1.textstr)
+                self.cpr.print("vote_text2", line_2.textstr)
+                self.cpr.print("vote_text3", line_3.textstr)
             #if "¦¦lt.H" in line_1.textstr:
             #    self.cpr.print("asd")
 
@@ -180,6 +196,10 @@ class OCRVoter(object):
 
             accumulated_chars = ""
 
+            # settings used in the loop
+            drop_chars_below_tresh = self.settings.drop_chars_below_tresh
+            dropping_tresh = self.settings.dropping_tresh
+
             for character_index in range(0, maximum_char_number): # check: is list 1 always best reference?
 
                 character_1 = line_1.value(key_char, character_index)
@@ -200,20 +220,22 @@ class OCRVoter(object):
                 if character_index ==  maximum_char_number-1 and character_2 == "¦" and character_3 == "¦" and character_1 == "I":
                     continue
 
-                if self.config.MSA_BEST_VOTER_DROP_CHARS_BELOW_TRESH == True:
-                    tresh = self.config.MSA_BEST_VOTER_DROPPING_TRESH
+                if drop_chars_below_tresh:
                     maximum_conf = max(acc_conf_1,acc_conf_2,acc_conf_3)
-                    if maximum_conf <tresh:
+                    if maximum_conf < dropping_tresh:
                         if [character_2,character_1,character_3][maxindices] != '¦':
                             continue
 
 
                 if maxindices == 0:
                     accumulated_chars += character_2
+                    self.voted_confidences.append(acc_conf_2)
                 elif maxindices == 1:
                     accumulated_chars += character_1
+                    self.voted_confidences.append(acc_conf_1)
                 else:
                     accumulated_chars += character_3
+                    self.voted_confidences.append(acc_conf_3)
 
             accumulated_chars_stripped = accumulated_chars.replace(wildcard_character, '')
 
@@ -246,9 +268,10 @@ class OCRVoter(object):
             key_confs_mapping = 'UID'
             key_confs = 'x_confs'
             key_char = 'calc_char'
-            self.cpr.print("vote_text1", line_1.textstr)
-            self.cpr.print("vote_text2", line_2.textstr)
-            self.cpr.print("vote_text3", line_3.textstr)
+            if self.cpr.enabled:
+                self.cpr.print("vote_text1", line_1.textstr)
+                self.cpr.print("vote_text2", line_2.textstr)
+                self.cpr.print("vote_text3", line_3.textstr)
             #if "Beteiligung:" in line_1.textstr:
             #     self.cpr.print("asd")
 
@@ -265,7 +288,16 @@ class OCRVoter(object):
             SEARCH_SPACE_PROCESSING_SUBSTITUTION_CHAR ='¦'
             SEARCH_SPACE_PROCESSING_USE_SIMILAR_CHARS = True
             SEARCH_RANGE = 1
-            PRINT_MATRICES = self.config.PRINT_SEARCH_SPACE_MATRICES
+            PRINT_MATRICES = self.settings.print_search_space_matrices
+
+            # settings used in the loop
+            drop_chars_below_tresh = self.settings.drop_chars_below_tresh
+            dropping_tresh = self.settings.dropping_tresh
+            metrics = self.metrics
+            collect_metrics = metrics.enabled
+            # time of the search space processing, summed up over the characters and added once per line
+            ssp_time = 0.0
+            ssp_calls = 0
 
             # initialize search space processor and search spaces
             search_space_processor = SearchSpaceProcessor(SEARCH_SPACE_Y_SIZE, SEARCH_SPACE_X_SIZE_INNER, \
@@ -276,8 +308,8 @@ class OCRVoter(object):
 
             # check if one of the lines is empty for certain settings
             one_line_empty = False
-            if self.config.MSA_BEST_VOTER_PUSH_LESS_LINES_WHITESPACE_CONFS or \
-                self.config.MSA_BEST_CHANGE_VOTING_TRESHS_ON_EMPTY_LINE:
+            if self.settings.push_less_lines_whitespace_confs or \
+                self.settings.change_voting_treshs_on_empty_line:
                 one_line_empty = self.check_if_one_line_empty([line_1, line_2, line_3], wildcard_character)
 
             # loop through the maximum character range of the lines
@@ -315,8 +347,13 @@ class OCRVoter(object):
                 # update the mid-window of the search space (this is the actual search space processing step)
                 mid_chars = ssp_chars.get_middle_matrix(PRINT_MATRICES)
                 mid_confs = ssp_confs.get_middle_matrix(PRINT_MATRICES)
+                if collect_metrics:
+                    start = time.perf_counter()
                 mid_chars_processed, mid_confs_processed, change_done = \
                     search_space_processor.process_search_space(mid_chars, mid_confs,SEARCH_SPACE_PROCESSING_USE_SIMILAR_CHARS)
+                if collect_metrics:
+                    ssp_time += time.perf_counter() - start
+                    ssp_calls += 1
                 if change_done is True:
                     ssp_chars.update_middle_matrix(mid_chars_processed)
                     ssp_confs.update_middle_matrix(mid_confs_processed)
@@ -361,10 +398,9 @@ class OCRVoter(object):
                     continue
 
                 # drop chars completely if they fall below a certain dropping treshhold and the setting is active
-                if self.config.MSA_BEST_VOTER_DROP_CHARS_BELOW_TRESH == True:
-                    tresh = self.config.MSA_BEST_VOTER_DROPPING_TRESH
+                if drop_chars_below_tresh:
                     maximum_conf = max(acc_conf_1,acc_conf_2,acc_conf_3)
-                    if maximum_conf < tresh:
+                    if maximum_conf < dropping_tresh:
                         if [character_2,character_1,character_3][maxindices] != '¦':
                             continue
 
@@ -389,10 +425,14 @@ class OCRVoter(object):
                 # push the voted char and the accumulated confidence of this char to results
                 accumulated_confs.push(voted_acc_conf)
                 accumulated_chars += voted_char
+                self.voted_confidences.append(voted_acc_conf)
 
                 # if the predictor is enabled fill the filo with the voted_char
                 self.fill_filo_last_chars(voted_char)
 
+            if collect_metrics:
+                metrics.add_elapsed("search_space_processing", ssp_time, ssp_calls)
+
             # do vocabulary related steps, if activated
             accumulated_chars = self.vocabulary_related_corrections(accumulated_chars, wildcard_character,
                                                                     accumulated_confs)
@@ -523,27 +563,23 @@ class OCRVoter(object):
             return undef_value
 
         returnvalue = value_confidence
+        settings = self.settings
 
-        if self.config.MSA_BEST_VOTER_SCALE_ENGINE_CONFIDENCES and engine_key is not None:
+        if settings.scale_engine_confidences and engine_key is not None:
             if engine_key == 'Abbyy':
-                if self.config.MSA_BEST_INCREASE_CONFIDENCE_OF_SOME_ABBYY_CHARS:
+                if settings.increase_confidence_of_some_abbyy_chars:
                     if value == "%": # improve ocropus in confidence of % because it was trained
                         value_confidence = value_confidence + 80
 
-                returnvalue = ConfidenceModifications.abby_factor * value_confidence
+                returnvalue = settings.abbyy_factor * value_confidence
             elif engine_key == 'Tess':
-                returnvalue = ConfidenceModifications.tesseract_factor * value_confidence
+                returnvalue = settings.tesseract_factor * value_confidence
 
             elif engine_key == 'Ocro':
+                returnvalue = settings.ocropus_factor * value_confidence
 
-
-                returnvalue = ConfidenceModifications.ocropus_factor * value_confidence
-
-        if (self.config.MSA_BEST_VOTER_PUSH_LESS_LINES_WHITESPACE_CONFS and one_line_empty and value == " ") \
-            or (self.config.MSA_BEST_VOTER_PUSH_WHITESPACE_IF_MOSTLY_WILDCARD and one_line_empty \
-                and value == " "):
-
-            returnvalue += ConfidenceModifications.whitespace_push
+        if settings.push_whitespace and one_line_empty and value == " ":
+            returnvalue += settings.whitespace_push
 
         return returnvalue
 
@@ -552,7 +588,7 @@ class OCRVoter(object):
             text_wo_wildcards = line.textstr.replace(wildcard_character, '')
             if text_wo_wildcards == "":
                 return True
-            if self.config.MSA_BEST_VOTER_PUSH_WHITESPACE_IF_MOSTLY_WILDCARD:
+            if self.settings.push_whitespace_if_mostly_wildcard:
                 # also count in high whitecard ratios as empty line
                 wildcard_ratio = 1-(len(text_wo_wildcards) / len(line.textstr))
                 if wildcard_ratio > 0.70:
@@ -560,7 +596,7 @@ class OCRVoter(object):
 
 
     def toggle_predictor(self, filo_content):
-        if self.config.PREDICTOR_AUFSICHTSRAT_ENABLED:
+        if self.settings.predictor_aufsichtsrat_enabled:
             if "Aufsichtsrat" in filo_content:
                 self.use_aufsichtsrat_prediction = True
             if "Gründung:" in filo_content:
@@ -583,7 +619,7 @@ class OCRVoter(object):
         :return:
         """
 
-        if self.config.PREDICTOR_AUFSICHTSRAT_ENABLED:
+        if self.settings.predictor_aufsichtsrat_enabled:
             # create pre semi-tokenized input strings in the filos from the voted characters for prediction
             if voted_char == ' ':
                 # the models usally use the 'ƿ' char in substitution for spaces
@@ -601,7 +637,7 @@ class OCRVoter(object):
     def increase_umlaut_confidence_searchspace(self, character_1, character_2, character_3,
                                                charconf_1, charconf_2, charconf_3):
 
-        if self.config.MSA_BEST_SEARCHSPACE_INCREASE_UMLAUT_CONFIDENCE:
+        if self.settings.searchspace_increase_umlaut_confidence:
             clist = [character_1, character_2, character_3]
             conflist = [charconf_1, charconf_2, charconf_3]
             conflist_new = self.increase_umlaut_confidence(clist, conflist)
@@ -0,0 +1,54 @@
+import threading
+import traceback
+import queue
+
+
+class OutputWriterThread(object):
+    """
+        Runs the output jobs (rendering and writing the result files of a table) on a
+        background thread, so writing a table overlaps the voting of the next table.
+        The jobs are done in the order they are submitted, if there are already
+        'max_pending_jobs' waiting, submitting blocks until a job is finished.
+    """
+
+    def __init__(self, max_pending_jobs=4):
+        self._jobs = queue.Queue(maxsize=max_pending_jobs)
+        self._thread = None
+        self.number_of_errors = 0
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name="output-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                if job is None:
+                    return
+                function, args = job
+                function(*args)
+            except Exception as ex:
+                self.number_of_errors += 1
+                print("Exception in output writer thread:", ex)
+                traceback.print_exc()
+            finally:
+                self._jobs.task_done()
+
+    def submit(self, function, *args):
+        if self._thread is None:
+            self._start()
+        self._jobs.put((function, args))
+
+    def wait(self):
+        """
+        Blocks until all submitted jobs are done
+        """
+        if self._thread is not None:
+            self._jobs.join()
+
+    def stop(self):
+        if self._thread is not None:
+            self._jobs.put(None)
+            self._thread.join()
+            self._thread = None
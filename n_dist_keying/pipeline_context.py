@@ -0,0 +1,70 @@
+from multi_sequence_alignment.msa_handler import MsaHandler
+from n_dist_keying.text_unspacer import TextUnspacer
+from n_dist_keying.distance_matrix import DistanceMatrix
+from n_dist_keying.voter_settings import VoterSettings
+from n_dist_keying.lazy_print import LazyPrint
+from n_dist_keying.stage_metrics import StageMetrics
+from n_dist_keying.voting_budget import VotingBudget
+from n_dist_keying.consensus_checker import ConsensusChecker
+
+
+class PipelineContext(object):
+    """
+        Holds the components of the voting pipeline for the whole process: msa handler (with ocr voter and
+        table handler), predictor, distance engine and the helpers each ocr_set uses. Creating these once
+        instead of per table or per line saves the construction and keeps their caches warm.
+        Only the state which belongs to the voted table is reset by 'reset_table_state', the context is
+        handed explicitly to the 'DatabaseHandler' and from there to the ocr_sets.
+    """
+
+    def __init__(self, config, vocab_checker=None):
+        self.config = config
+        self.vocab_checker = vocab_checker
+        self._predictor = None
+
+        # shared by all ocr_sets, which would otherwise create their own for each line
+        self.ocr_set_cpr = LazyPrint(config.PRINT_MSA_HANDLER, config.PRINT_EXCEPTION_LEVEL,
+                                     config.PRINT_WARNING_LEVEL, "ocr_set")
+        self.text_unspacer = TextUnspacer()
+        self.ndist_distance_matrix = DistanceMatrix(config.NDIST_DISTANCE_MODE, config.NDIST_EARLY_EXIT)
+
+        # compiled once, the voting components read their flags from here instead of the configuration
+        self.settings = VoterSettings.from_config(config)
+
+        # timers and counters of the stages, per table and for the whole run
+        self.metrics = StageMetrics(config.COLLECT_STAGE_METRICS)
+
+        self.msa_handler = MsaHandler(settings=self.settings)
+        self.msa_handler.add_vocabulary_checker(vocab_checker)
+        self.msa_handler.set_metrics(self.metrics)
+
+        # time limits of the msa, lines which exceed them take the n-distance keying result
+        self.voting_budget = VotingBudget(float(config.MSA_BEST_LINE_TIME_BUDGET),
+                                          float(config.MSA_BEST_TABLE_TIME_BUDGET),
+                                          int(config.MSA_BEST_MAX_ALIGNMENT_CELLS))
+        self.msa_handler.set_voting_budget(self.voting_budget)
+
+        # preselection of the msa best keying, one checker counts the tiers of the whole run
+        self.consensus_checker = ConsensusChecker.from_config(config)
+        self.use_consensus_tiers = ConsensusChecker.is_enabled(config)
+
+    def get_predictor(self):
+        """
+        The special character predictor is loaded on first request, if it's enabled
+        :return: predictor or None
+        """
+        if self._predictor is None and self.config.PREDICTOR_AUFSICHTSRAT_ENABLED:
+            # care: import statement within condition, cause this causes keras to load
+            from machine_learning_components.special_character_predictor import SpecialCharPredictor
+            self._predictor = SpecialCharPredictor()
+            self._predictor.load_prediction_model()
+            self.msa_handler.add_predictor(self._predictor)
+        return self._predictor
+
+    def reset_table_state(self):
+        """
+        Resets the state which is carried from line to line within a table, call before voting a new table
+        """
+        self.msa_handler.reset_table_state()
+        self.ndist_distance_matrix.reset()
+        self.voting_budget.start_table()
@@ -0,0 +1,103 @@
+"""
+    Stores the keying results (msa_best or ndist_keying) of the parsed tables in the voter database.
+    All result lines of a database go to one indexed table, so the results of a whole volume
+    can be read with one query instead of parsing the output files:
+
+        SELECT * FROM voter_results WHERE result = 'msa_best' ORDER BY table_name, line_index
+
+    The rows of a table are collected while the sets are written and inserted on close,
+    in one transaction with batched inserts. Previous results of the table are replaced.
+"""
+
+import json
+from sqlalchemy import MetaData, Table, Column, Index, Integer, Float, String, Text
+from n_dist_keying.database_engine_pool import DatabaseEnginePool
+from n_dist_keying.dataset_writer import DatasetLayoutWriter
+from n_dist_keying.consensus_checker import ConsensusChecker
+
+
+RESULTS_TABLE = "voter_results"
+
+_metadata = MetaData()
+
+results_table = Table(
+    RESULTS_TABLE, _metadata,
+    Column("table_name", String, nullable=False),
+    Column("result", String, nullable=False),       # 'msa_best' or 'ndist_keying'
+    Column("line_index", Integer, nullable=False),
+    Column("text", Text),
+    Column("line_x0", Integer),
+    Column("line_y0", Integer),
+    Column("line_x1", Integer),
+    Column("line_y1", Integer),
+    Column("words", Text),                          # json list of [word, x0, y0, x1, y1]
+    Column("char_confidence", Float),               # mean engine confidence of the taken line (ndist, consensus)
+    Column("voted_confidence", Float),              # mean accumulated confidence of the voted characters (msa)
+    Column("consensus_tier", String),
+    Index("ix_voter_results_table_line", "table_name", "result", "line_index")
+)
+
+
+class DatasetDatabaseWriter(DatasetLayoutWriter):
+    """
+        Writes the result lines of one table to the results table of the voter database
+    """
+
+    def __init__(self, dburl, table, other_set):
+        # there is no output file, the rows go to the database
+        DatasetLayoutWriter.__init__(self, None, 0, other_set)
+        self._dburl = dburl
+        self._table = table
+        self._rows = []
+
+    def write_set(self, lidx, current_set):
+        dataset_text, dataset_bbox, name = self.get_line_layout(current_set)
+        if dataset_text is None or dataset_text is False:
+            return
+
+        row = {
+            "table_name": self._table,
+            "result": self._other_set,
+            "line_index": lidx,
+            "text": dataset_text,
+            "line_x0": None,
+            "line_y0": None,
+            "line_x1": None,
+            "line_y1": None,
+            "char_confidence": None,
+            "voted_confidence": None,
+            "consensus_tier": None,
+        }
+
+        if dataset_bbox:
+            row["line_x0"], row["line_y0"], row["line_x1"], row["line_y1"] = [int(value) for value in dataset_bbox]
+            words = [[word] + [int(value) for value in wbbox] for word, wbbox in
+                     self.get_word_layouts(dataset_bbox, current_set)]
+        else:
+            words = [[word, None, None, None, None] for word in dataset_text.split()]
+        row["words"] = json.dumps(words, ensure_ascii=False)
+
+        if self._other_set == 'msa_best':
+            row["char_confidence"] = current_set.consensus_confidence
+            row["voted_confidence"] = current_set.msa_best_confidence
+            row["consensus_tier"] = current_set.consensus_tier
+        else:
+            line = current_set.get_shortest_n_distance_line()
+            row["char_confidence"] = ConsensusChecker.get_mean_confidence(line)
+
+        self._rows.append(row)
+
+    def close(self):
+        engine = DatabaseEnginePool.get_engine(self._dburl)
+        batch_size = DatabaseEnginePool.get_batch_size()
+
+        # replace the previous results of the table in a single transaction
+        with engine.begin() as connection:
+            results_table.create(connection, checkfirst=True)
+            connection.execute(results_table.delete().where(results_table.c.table_name == self._table)
+                                                     .where(results_table.c.result == self._other_set))
+            for batch_start in range(0, len(self._rows), batch_size):
+                connection.execute(results_table.insert(), self._rows[batch_start:batch_start + batch_size])
+
+        self._rows = []
+        return DatasetLayoutWriter.close(self)
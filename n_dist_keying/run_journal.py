@@ -0,0 +1,165 @@
+"""
+    Journal of the tables which are completely voted in a run, so an aborted run can be resumed
+    instead of voting all tables again (configuration entries WRITE_RUN_JOURNAL and RESUME_RUN).
+
+    After the outputs (and the isri reports) of a table are written, one JSON line is appended to
+    'run_journal.jsonl' in the output root folder:
+
+        {"table": "0/8500_001", "input_hash": ..., "config_hash": ..., "created_files": [...], "finished": ...}
+
+    A table counts as finished on resume if its input table and the configuration are unchanged
+    and its created files still exist. The input hash is taken over metadata of the input table
+    (number of rows and highest rowid), which sqlite gives without reading the rows, so tables which
+    were extended or filled again with other rows are voted again, rows changed in place are not
+    detected. The config hash is taken over all configuration entries which can change the results
+    (not the prints, profiling and the sql and threading settings).
+
+    If the table watchdog is enabled (TABLE_WATCHDOG_SECONDS), a table is also recorded before it's voted:
+
+        {"table": "0/8500_001", "input_hash": ..., "config_hash": ..., "started": ...}
+
+    The watchdog ends the process if the table hangs, so a table which was started but not finished
+    (with the same input and configuration) is skipped on resume and reported as aborted, instead of
+    hanging the resumed run again.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import threading
+from n_dist_keying.database_engine_pool import DatabaseEnginePool
+
+
+class RunJournal(object):
+
+    FILENAME = "run_journal.jsonl"
+
+    # configuration entries which don't change the results of a table
+    IGNORED_CONFIG_PREFIXES = ("PRINT_", "PROFILE_", "SQL_")
+    IGNORED_CONFIG_KEYS = {"RESUME_RUN", "WRITE_RUN_JOURNAL", "LOG_LEVEL", "COLLECT_STAGE_METRICS",
+                           "TABLE_WATCHDOG_SECONDS", "TABLE_PREFETCH_DEPTH", "WRITE_OUTPUTS_IN_BACKGROUND"}
+
+    def __init__(self, filepath, config):
+        self.filepath = filepath
+        self.config_hash = self.get_config_hash(config)
+        # last entry of each table, started or finished
+        self._entries = {}
+        self._input_hashes = {}
+        # the finished tables can be recorded on the output thread
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_config_hash(cls, config):
+        entries = {}
+        for key, value in vars(config).items():
+            if key in cls.IGNORED_CONFIG_KEYS or key.startswith(cls.IGNORED_CONFIG_PREFIXES):
+                continue
+            entries[key] = value
+        serialized = json.dumps(entries, sort_keys=True, default=str)
+        return hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+
+    def load(self):
+        """
+        Reads the tables of the previous runs, later entries of a table replace earlier ones
+        :return: number of finished tables in the journal
+        """
+        self._entries = {}
+        if not os.path.exists(self.filepath):
+            return 0
+
+        with open(self.filepath, 'r', encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # last line of a run which was killed while writing
+                    continue
+                self._entries[entry["table"]] = entry
+        return sum(1 for entry in self._entries.values() if "finished" in entry)
+
+    def get_input_hash(self, dbpath, table):
+        """
+        Hash over the number of rows and the highest rowid of the input table, read with the pooled
+        engine of the database (the rows themselves aren't read)
+        :param dbpath: sqlalchemy url of the database
+        """
+        key = (dbpath, table)
+        input_hash = self._input_hashes.get(key)
+        if input_hash is not None:
+            return input_hash
+
+        connection = DatabaseEnginePool.get_engine(dbpath).raw_connection()
+        try:
+            cursor = connection.cursor()
+            cursor.execute('SELECT COUNT(*), MAX(rowid) FROM "{}"'.format(table.replace('"', '""')))
+            row_count, max_rowid = cursor.fetchone()
+            cursor.close()
+        finally:
+            connection.close()
+
+        serialized = json.dumps([table, row_count, max_rowid])
+        input_hash = hashlib.sha1(serialized.encode("utf-8")).hexdigest()
+        self._input_hashes[key] = input_hash
+        return input_hash
+
+    def is_finished(self, name, dbpath, table):
+        """
+        The input table is only queried if the table is in the journal with the same configuration
+        :param name: name of the table in the journal, i.e. database and table name
+        :return: True if the table was finished with the same input and configuration
+        """
+        entry = self._entries.get(name)
+        if entry is None or "finished" not in entry or entry.get("config_hash") != self.config_hash:
+            return False
+        if not all(os.path.exists(filepath) for filepath in entry.get("created_files", [])):
+            return False
+        return entry.get("input_hash") == self.get_input_hash(dbpath, table)
+
+    def is_aborted(self, name, dbpath, table):
+        """
+        :return: True if the table was started but not finished with the same input and configuration,
+                 i.e. the process was ended by the table watchdog while the table was voted
+        """
+        entry = self._entries.get(name)
+        if entry is None or "finished" in entry or entry.get("config_hash") != self.config_hash:
+            return False
+        return entry.get("input_hash") == self.get_input_hash(dbpath, table)
+
+    def record_started(self, name, dbpath, table):
+        """
+        Appends the table as started to the journal, call before the table is voted
+        """
+        entry = {
+            "table": name,
+            "input_hash": self.get_input_hash(dbpath, table),
+            "config_hash": self.config_hash,
+            "started": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        self._append(entry)
+
+    def record(self, name, dbpath, table, created_files):
+        """
+        Appends the table to the journal, call after all outputs of the table are written
+        :param created_files: result files of the table, they have to exist to skip the table on resume
+        """
+        entry = {
+            "table": name,
+            "input_hash": self.get_input_hash(dbpath, table),
+            "config_hash": self.config_hash,
+            "created_files": created_files,
+            "finished": datetime.datetime.now().isoformat(timespec="seconds"),
+        }
+        self._append(entry)
+
+    def _append(self, entry):
+        directory = os.path.dirname(self.filepath)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory)
+        with self._lock:
+            with open(self.filepath, 'a', encoding="utf-8") as file:
+                file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                # the entry has to be on disk before the next table starts, a crash loses at most this table
+                file.flush()
+                os.fsync(file.fileno())
+            self._entries[entry["table"]] = entry
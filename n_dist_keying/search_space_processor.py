@@ -2,7 +2,7 @@
 import sys
 from akf_corelib.random import Random
 from enum import Enum, unique
-from akf_corelib.conditional_print import ConditionalPrint
+from n_dist_keying.lazy_print import LazyPrint
 from configuration.configuration_handler import ConfigurationHandler
 import operator
 
@@ -65,8 +65,8 @@ class SearchSpaceProcessor(object):
 
         config_handler = ConfigurationHandler(first_init=False)
         self._config = config_handler.get_config()
-        self._cpr = ConditionalPrint(self._config.PRINT_SEARCH_SPACE_PROCESSOR, self._config.PRINT_EXCEPTION_LEVEL,
-                                     self._config.PRINT_WARNING_LEVEL)
+        self._cpr = LazyPrint(self._config.PRINT_SEARCH_SPACE_PROCESSOR, self._config.PRINT_EXCEPTION_LEVEL,
+                              self._config.PRINT_WARNING_LEVEL, "search_space_processor")
 
 
     def get_middle_index(self):
@@ -0,0 +1,136 @@
+"""
+    Timers and counters for the stages of the voting, collected per parsed table and summed up for the run.
+
+    Timers add up the wall time and the number of calls of a stage, counters add up any numbers
+    (alignments, voted characters, cache hits, lines per consensus tier, written bytes).
+    Timers of inner stages are contained in the timers of the stages which call them, i.e.
+    'alignment' and 'voting' are part of 'msa_best'.
+
+    Coarse stages use the context manager, stages which are called once per line take the clock themselves:
+
+        with metrics.timer("postcorrection"):
+            ...
+
+        start = metrics.clock()
+        ...
+        metrics.add_time("alignment", start)
+
+    Loops over the characters sum up the time locally and add it once per line with 'add_elapsed'.
+
+    A disabled instance ('NO_METRICS') doesn't take the clock and ignores all values.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StageMetrics(object):
+
+    RUN_ENTRY = "run"
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._tables = {}
+        # values which are collected outside of a table (i.e. isri reports at the end of the run)
+        self._outside_tables = self._create_entry()
+        self._current = self._outside_tables
+        self._run_start = time.perf_counter()
+
+    @staticmethod
+    def _create_entry():
+        return {"timers": {}, "calls": {}, "counters": {}}
+
+    def start_table(self, name):
+        """
+        Following values are collected for this table
+        :param name: unique name of the table, i.e. database and table name
+        """
+        if not self.enabled:
+            return
+        entry = self._create_entry()
+        with self._lock:
+            self._tables[name] = entry
+            self._current = entry
+
+    def get_table_entry(self):
+        """
+        Entry of the current table, can be passed to 'add_time' and 'count' by jobs which run later
+        on another thread (i.e. output writing), so their values still go to the table which created them
+        """
+        return self._current
+
+    def clock(self):
+        if not self.enabled:
+            return 0.0
+        return time.perf_counter()
+
+    def add_time(self, name, start, entry=None):
+        """
+        :param start: value of 'clock()' at the start of the measured part
+        """
+        if not self.enabled:
+            return
+        self.add_elapsed(name, time.perf_counter() - start, 1, entry)
+
+    def add_elapsed(self, name, elapsed, calls=1, entry=None):
+        """
+        :param elapsed: time in seconds which was measured by the caller
+        :param calls: number of measured calls within this time
+        """
+        if not self.enabled:
+            return
+        if entry is None:
+            entry = self._current
+        with self._lock:
+            entry["timers"][name] = entry["timers"].get(name, 0.0) + elapsed
+            entry["calls"][name] = entry["calls"].get(name, 0) + calls
+
+    def count(self, name, value=1, entry=None):
+        if not self.enabled:
+            return
+        if entry is None:
+            entry = self._current
+        with self._lock:
+            entry["counters"][name] = entry["counters"].get(name, 0) + value
+
+    @contextmanager
+    def timer(self, name, entry=None):
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.add_time(name, start, entry)
+
+    def get_summary(self):
+        """
+        :return: dictionary with the summed values of the run and the values of each table
+        """
+        with self._lock:
+            run = self._create_entry()
+            for entry in list(self._tables.values()) + [self._outside_tables]:
+                for kind in ("timers", "calls", "counters"):
+                    for name, value in entry[kind].items():
+                        run[kind][name] = run[kind].get(name, 0) + value
+            run["tables"] = len(self._tables)
+            run["wall_time"] = time.perf_counter() - self._run_start
+            tables = {name: {kind: dict(values) for kind, values in entry.items()}
+                      for name, entry in self._tables.items()}
+
+        return {self.RUN_ENTRY: run, "tables": tables}
+
+    def write_json(self, filepath):
+        if not self.enabled:
+            return
+        directory = os.path.dirname(filepath)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory)
+        with open(filepath, 'w', encoding="utf-8") as file:
+            json.dump(self.get_summary(), file, indent=2, sort_keys=True)
+
+
+# used by the components if there is no pipeline context which provides metrics
+NO_METRICS = StageMetrics(enabled=False)
@@ -0,0 +1,92 @@
+import threading
+import queue
+from akf_corelib.df_objectifier import DFObjectifier
+
+
+class PrefetchedTable(object):
+    """
+        One loaded table, 'dataframe_wrapper' is None if loading failed, then 'exception' holds the reason
+    """
+
+    def __init__(self, dbpath, table, dataframe_wrapper=None, exception=None):
+        self.dbpath = dbpath
+        self.table = table
+        self.dataframe_wrapper = dataframe_wrapper
+        self.exception = exception
+
+
+class TablePrefetcher(object):
+    """
+        Loads the tables to vote on a background thread, so reading the next tables from the
+        database overlaps the voting of the current table. Up to 'depth' loaded tables are kept
+        in a bounded queue, the loader waits when the queue is full and the consumer only
+        waits when it's empty. With depth 0 the tables are loaded directly on iteration.
+
+        Iterate over it to get the 'PrefetchedTable' objects in the order of the given tables.
+    """
+
+    def __init__(self, tables, depth=2):
+        """
+        :param tables: iterable of tuples (dbpath, table), dbpath is the sqlalchemy url of the database
+        :param depth: maximum number of loaded tables which wait for voting
+        """
+        self._tables = tables
+        self._depth = depth
+        self._loaded = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def load_table(dbpath, table):
+        try:
+            # DFObjectifier connects with the url itself, each load uses its own connection
+            # and not the engine pool
+            dataframe_wrapper = DFObjectifier(dbpath, table)
+            return PrefetchedTable(dbpath, table, dataframe_wrapper)
+        except Exception as ex:
+            return PrefetchedTable(dbpath, table, exception=ex)
+
+    def _put(self, prefetched_table):
+        # put with timeout, so the loader ends if the consumer stopped while the queue is full
+        while not self._stopped.is_set():
+            try:
+                self._loaded.put(prefetched_table, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self):
+        for dbpath, table in self._tables:
+            if self._stopped.is_set() or not self._put(self.load_table(dbpath, table)):
+                return
+        # end marker
+        self._put(None)
+
+    def __iter__(self):
+        if self._depth <= 0:
+            for dbpath, table in self._tables:
+                yield self.load_table(dbpath, table)
+            return
+
+        self._loaded = queue.Queue(maxsize=self._depth)
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="table-prefetcher", daemon=True)
+        self._thread.start()
+        try:
+            while True:
+                prefetched_table = self._loaded.get()
+                if prefetched_table is None:
+                    return
+                yield prefetched_table
+        finally:
+            self.stop()
+
+    def stop(self):
+        """
+        Ends the loader thread, i.e. if the consumer stops before all tables are voted
+        """
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
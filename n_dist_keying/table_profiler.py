@@ -0,0 +1,158 @@
+"""
+    Opt-in profiling of the parsed tables with cProfile, to find the tables which take much longer
+    than the others and the functions which cause it, from a normal run instead of a manual rerun.
+
+    Each profiled table gets its own '.prof' file (view it with pstats or snakeviz), the report
+    ranks all parsed tables by their wall time and lists the top functions of the profiled ones.
+    The tables can be sampled, the sampling is decided by the table name, so a rerun profiles the
+    same tables. Profiles of tables which are faster than the threshold are dropped.
+
+    Only the thread which parses the table is profiled, output jobs on the writer thread and the
+    table prefetching are not part of the profiles (their time shows in the stage metrics).
+"""
+
+import cProfile
+import os
+import pstats
+import time
+import zlib
+
+
+class TableProfile(object):
+
+    def __init__(self, name, wall_time, profile_path=None, top_functions=None):
+        self.name = name
+        self.wall_time = wall_time              # seconds
+        self.profile_path = profile_path        # None if the table wasn't profiled or was below the threshold
+        self.top_functions = top_functions or []
+
+
+class TableProfiler(object):
+
+    PROFILE_EXTENSION = ".prof"
+
+    def __init__(self, enabled, output_dir, sample_rate=1.0, min_seconds=0.0, number_of_top_functions=15):
+        """
+        :param output_dir: folder for the '.prof' files of the tables
+        :param sample_rate: share of the tables which are profiled, 0.0 to 1.0
+        :param min_seconds: profiles of tables which are parsed faster are dropped
+        :param number_of_top_functions: number of functions listed for each table in the report
+        """
+        self.enabled = enabled
+        self.output_dir = output_dir
+        self.sample_rate = sample_rate
+        self.min_seconds = min_seconds
+        self.number_of_top_functions = number_of_top_functions
+        self._table_profiles = []
+
+    def is_sampled(self, name):
+        if self.sample_rate >= 1.0:
+            return True
+        # stable over runs and processes, unlike hash()
+        return zlib.crc32(name.encode("utf-8")) % 10000 < self.sample_rate * 10000
+
+    def run(self, name, function, *args, **kwargs):
+        """
+        Calls the function, profiled if the profiler is enabled and the table is sampled
+        :param name: unique name of the table, i.e. database and table name
+        :return: return value of the function
+        """
+        if not self.enabled:
+            return function(*args, **kwargs)
+
+        start = time.perf_counter()
+        profile = None
+        if self.is_sampled(name):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # another profiler is active (i.e. the whole script runs under cProfile)
+                profile = None
+
+        try:
+            result = function(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+        wall_time = time.perf_counter() - start
+
+        table_profile = TableProfile(name, wall_time)
+        if profile is not None and wall_time >= self.min_seconds:
+            table_profile.profile_path = self.save_profile(name, profile)
+            table_profile.top_functions = self.get_top_functions(profile, self.number_of_top_functions)
+        self._table_profiles.append(table_profile)
+
+        return result
+
+    def save_profile(self, name, profile):
+        if not os.path.exists(self.output_dir):
+            os.makedirs(self.output_dir)
+        filename = name.replace("/", "__").replace(os.sep, "__") + self.PROFILE_EXTENSION
+        profile_path = os.path.join(self.output_dir, filename)
+        profile.dump_stats(profile_path)
+        return profile_path
+
+    @staticmethod
+    def get_top_functions(profile, number_of_functions):
+        """
+        :return: list of tuples (function, calls, own time, cumulative time), sorted by the own time,
+                 the cumulative time is dominated by the callers of the pipeline itself
+        """
+        stats = pstats.Stats(profile)
+        functions = []
+        for (filename, line, function_name), (_, calls, own_time, cumulative_time, _) in stats.stats.items():
+            if filename == "~":
+                location = function_name  # builtins
+            else:
+                location = "{}:{}({})".format(os.path.basename(filename), line, function_name)
+            functions.append((location, calls, own_time, cumulative_time))
+
+        functions.sort(key=lambda entry: entry[2], reverse=True)
+        return functions[:number_of_functions]
+
+    def get_slowest_tables(self):
+        return sorted(self._table_profiles, key=lambda table_profile: table_profile.wall_time, reverse=True)
+
+    def write_report(self, filepath, table_metrics=None):
+        """
+        Writes the parsed tables ranked by their wall time, with the top functions of the profiled tables
+        :param table_metrics: optional dict table name -> stage metrics entry (see 'StageMetrics.get_summary'),
+                              the sets and the slowest stages of a table are listed with it
+        :return: path of the written file, None if the profiler is disabled
+        """
+        if not self.enabled:
+            return None
+
+        slowest_tables = self.get_slowest_tables()
+        wall_times = sorted(table_profile.wall_time for table_profile in slowest_tables)
+        median = wall_times[len(wall_times) // 2] if wall_times else 0.0
+
+        directory = os.path.dirname(filepath)
+        if directory != "" and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with open(filepath, 'w', encoding="utf-8") as file:
+            file.write("slowest tables, {} parsed, median {:.3f}s\n\n".format(len(slowest_tables), median))
+            for rank, table_profile in enumerate(slowest_tables, 1):
+                factor = table_profile.wall_time / median if median else 0.0
+                file.write("{:>4}. {:<60} {:>10.3f}s {:>8.1f}x median\n".format(rank, table_profile.name,
+                                                                                table_profile.wall_time, factor))
+
+                entry = table_metrics.get(table_profile.name) if table_metrics else None
+                if entry is not None:
+                    stages = sorted(entry["timers"].items(), key=lambda item: item[1], reverse=True)[:3]
+                    file.write("      sets: {}, slowest stages: {}\n".format(
+                        entry["counters"].get("sets", "-"),
+                        ", ".join("{} {:.3f}s".format(stage, seconds) for stage, seconds in stages)))
+
+                if table_profile.profile_path is None:
+                    continue
+                file.write("      profile: {}\n".format(table_profile.profile_path))
+                file.write("      {:>10} {:>10} {:>10}  {}\n".format("calls", "own s", "cum s", "function"))
+                for location, calls, own_time, cumulative_time in table_profile.top_functions:
+                    file.write("      {:>10} {:>10.3f} {:>10.3f}  {}\n".format(calls, own_time, cumulative_time,
+                                                                             location))
+                file.write("\n")
+
+        return filepath
@@ -1,5 +1,5 @@
 import difflib
-#from ocr_validation.ocrolib_edist import Edist3
+from ocr_validation.ocrolib_edist import Edist3
 from akf_corelib.typecasts import TypeCasts
 from akf_corelib.random import Random
 from akf_corelib.myers import MyersSequenceMatcher
@@ -140,9 +140,15 @@ class TextComparator:
 
 
     @staticmethod
-    def compare_ocr_strings_levensthein_normed(ocr_string1, ocr_string2):
-        #ldist_normed, ldist = Edist3.normed_levenshtein(ocr_string1, ocr_string2)
-        ldist_normed = distpkg.nlevenshtein(ocr_string1, ocr_string2, method=2) # this is the same - verified
+    def compare_ocr_strings_levensthein_normed(ocr_string1, ocr_string2, cutoff=None):
+        """
+        Levenshtein distance normed by the length of the longer string, calculated bit-parallel
+        :param cutoff: maximum distance of interest, if the distance is higher the calculation
+                       stops early and the result is (cutoff+1) normed
+        :return: normed distance, 0.0 for equal strings, 1.0 if only one string is empty
+        """
+        # ldist_normed = distpkg.nlevenshtein(ocr_string1, ocr_string2, method=2)
+        ldist_normed, ldist = Edist3.normed_levenshtein(ocr_string1, ocr_string2, cutoff)
         return ldist_normed
 
 
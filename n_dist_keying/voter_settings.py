@@ -0,0 +1,105 @@
+"""
+    Compiled settings of the voting, the entries of the configuration which are read in the per-character
+    and per-word loops of 'OCRVoter' and 'MsaHandler' are taken once into an immutable, typed tuple.
+    Derived values (engine confidence factors, voting thresholds) are precomputed there.
+
+    Unlike the configuration singleton, the settings can be pickled and handed to worker processes.
+    Hot loops bind the fields they need to local variables once per line.
+"""
+
+from typing import NamedTuple
+
+
+class ConfidenceModifications():
+    # scaling factors for confidence values of engines
+    # used if configuration flag MSA_BEST_VOTER_SCALE_ENGINE_CONFIDENCES is active
+    # 98,02 in 1969
+    tesseract_factor = 1.00 #95
+    ocropus_factor = 0.90 #90
+    abby_factor = 0.98    # 1.00 -99,60
+
+    # 97,62 in 1969
+    #abby_factor = 0.79
+    #ocropus_factor = 0.98
+    #tesseract_factor = 0.979
+    whitespace_push = 100
+
+
+class VoterSettings(NamedTuple):
+
+    # character voting
+    drop_chars_below_tresh: bool
+    dropping_tresh: float
+    wildcard_tresh: float               # confidence a char needs to win against two wildcards
+    downscale_only_sc: bool
+    change_voting_treshs_on_empty_line: bool
+    push_less_lines_whitespace_confs: bool
+    push_whitespace_if_mostly_wildcard: bool
+    push_whitespace: bool               # one of the two whitespace push modes is active
+    whitespace_push: float
+    searchspace_increase_umlaut_confidence: bool
+    print_search_space_matrices: bool
+
+    # engine confidences, the factors are 1.0 if scaling is disabled
+    scale_engine_confidences: bool
+    increase_confidence_of_some_abbyy_chars: bool
+    abbyy_factor: float
+    tesseract_factor: float
+    ocropus_factor: float
+
+    # alignment
+    use_msa_similarities: bool
+    wordwise_drop_last_word_sc: bool
+    wordwise_crunch_words: bool
+    table_recognition_enabled: bool
+
+    predictor_aufsichtsrat_enabled: bool
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Compile the settings from the parsed configuration
+        :param config: configuration namespace, see 'ConfigurationHandler'
+        :return: settings
+        """
+        scale_engine_confidences = bool(config.MSA_BEST_VOTER_SCALE_ENGINE_CONFIDENCES)
+
+        wildcard_tresh = 98.5
+        if config.MSA_BEST_CHANGE_VOTING_TRESHS_ON_EMPTY_LINE:
+            wildcard_tresh -= 10  # 0:99,19%, 20:99.16%, 10:99.27%
+
+        return cls(
+            drop_chars_below_tresh=config.MSA_BEST_VOTER_DROP_CHARS_BELOW_TRESH == True,
+            dropping_tresh=float(config.MSA_BEST_VOTER_DROPPING_TRESH),
+            wildcard_tresh=wildcard_tresh,
+            downscale_only_sc=bool(config.MSA_BEST_VOTING_DOWNSCALE_ONLY_SC),
+            change_voting_treshs_on_empty_line=bool(config.MSA_BEST_CHANGE_VOTING_TRESHS_ON_EMPTY_LINE),
+            push_less_lines_whitespace_confs=bool(config.MSA_BEST_VOTER_PUSH_LESS_LINES_WHITESPACE_CONFS),
+            push_whitespace_if_mostly_wildcard=bool(config.MSA_BEST_VOTER_PUSH_WHITESPACE_IF_MOSTLY_WILDCARD),
+            push_whitespace=bool(config.MSA_BEST_VOTER_PUSH_LESS_LINES_WHITESPACE_CONFS or
+                                 config.MSA_BEST_VOTER_PUSH_WHITESPACE_IF_MOSTLY_WILDCARD),
+            whitespace_push=float(ConfidenceModifications.whitespace_push),
+            searchspace_increase_umlaut_confidence=bool(config.MSA_BEST_SEARCHSPACE_INCREASE_UMLAUT_CONFIDENCE),
+            print_search_space_matrices=bool(config.PRINT_SEARCH_SPACE_MATRICES),
+            scale_engine_confidences=scale_engine_confidences,
+            increase_confidence_of_some_abbyy_chars=bool(config.MSA_BEST_INCREASE_CONFIDENCE_OF_SOME_ABBYY_CHARS),
+            abbyy_factor=ConfidenceModifications.abby_factor if scale_engine_confidences else 1.0,
+            tesseract_factor=ConfidenceModifications.tesseract_factor if scale_engine_confidences else 1.0,
+            ocropus_factor=ConfidenceModifications.ocropus_factor if scale_engine_confidences else 1.0,
+            use_msa_similarities=bool(config.MSA_BEST_USE_MSA_SIMILARITIES),
+            wordwise_drop_last_word_sc=bool(config.MSA_BEST_WORDWISE_DROP_LAST_WORD_SC),
+            wordwise_crunch_words=bool(config.MSA_BEST_WORDWISE_CRUNCH_WORDS),
+            table_recognition_enabled=bool(config.TABLE_RECOGNITION_ENABLED),
+            predictor_aufsichtsrat_enabled=bool(config.PREDICTOR_AUFSICHTSRAT_ENABLED),
+        )
+
+    @staticmethod
+    def uses_line_state(config):
+        """
+        The predictor, the vocabulary correction during the vote and the table recognition carry state from
+        line to line in the ocr voter and the msa handler ('filo_last_chars', 'previous_word_with_seperator',
+        'use_aufsichtsrat_prediction', 'recognize_a_line', 'do_last_steps'). With one of them enabled, each line
+        has to go through the msa, shortcuts like the consensus tiers or the result cache can't be used.
+        """
+        return bool(config.PREDICTOR_AUFSICHTSRAT_ENABLED or config.KEYING_RESULT_VOCABULARY_CORRECTION_VOTE or
+                    config.TABLE_RECOGNITION_ENABLED)
@@ -0,0 +1,102 @@
+"""
+    Time limits for the msa best voting, so a pathological table (very long tabular lines,
+    repeated digits) can't hold up a whole batch run.
+
+    'VotingBudget' is checked cooperatively by the msa handler, between the words of a line and
+    before each alignment. If the budget of the line or of the table is exceeded, the ocr_set falls
+    back to the line selected by the n-distance keying and is marked with the tier 'budget_fallback'.
+    Once the table budget is used up, the remaining lines of the table take the fallback directly.
+    Alignments which would be too big (product of the text lengths) fall back before they are started,
+    because a running alignment can't be interrupted.
+
+    'TableWatchdog' is the hard limit for the rest: if a table takes longer, the tracebacks of all
+    threads are dumped and the process exits (exit code 1), so the batch driver can restart it.
+    The table is recorded as started in the run journal before, a resumed run (RESUME_RUN) skips it
+    and reports it as aborted.
+"""
+
+import faulthandler
+import sys
+import time
+
+
+class VotingBudgetExceeded(Exception):
+    """
+        Raised within the msa if the time budget of the line or the table is exceeded
+    """
+    pass
+
+
+class VotingBudget(object):
+
+    NO_DEADLINE = float("inf")
+
+    def __init__(self, line_seconds=0, table_seconds=0, max_alignment_cells=0):
+        """
+        :param line_seconds: maximum time for the msa of one line, 0 is unlimited
+        :param table_seconds: maximum time for the msa of all lines of a table, 0 is unlimited
+        :param max_alignment_cells: maximum product of the text lengths of an alignment, 0 is unlimited
+        """
+        self.line_seconds = line_seconds
+        self.table_seconds = table_seconds
+        self.max_alignment_cells = max_alignment_cells
+        self.enabled = line_seconds > 0 or table_seconds > 0 or max_alignment_cells > 0
+        self._table_deadline = self.NO_DEADLINE
+        self._deadline = self.NO_DEADLINE
+
+    def start_table(self):
+        if self.table_seconds > 0:
+            self._table_deadline = time.perf_counter() + self.table_seconds
+        self._deadline = self.NO_DEADLINE
+
+    def table_exhausted(self):
+        return time.perf_counter() > self._table_deadline
+
+    def start_line(self):
+        deadline = self._table_deadline
+        if self.line_seconds > 0:
+            deadline = min(deadline, time.perf_counter() + self.line_seconds)
+        self._deadline = deadline
+
+    def end_line(self):
+        self._deadline = self.NO_DEADLINE
+
+    def check(self):
+        """
+        :raises VotingBudgetExceeded: if the deadline of the current line is over
+        """
+        if time.perf_counter() > self._deadline:
+            raise VotingBudgetExceeded("time budget of the line exceeded")
+
+    def check_alignment(self, length_1, length_2):
+        """
+        Check before an alignment of two texts
+        :raises VotingBudgetExceeded: if the alignment is too big or the deadline is over
+        """
+        if self.max_alignment_cells > 0 and length_1 * length_2 > self.max_alignment_cells:
+            raise VotingBudgetExceeded("alignment of {}x{} characters is too big".format(length_1, length_2))
+        self.check()
+
+
+# used by the components if there is no pipeline context which provides a budget
+NO_BUDGET = VotingBudget()
+
+
+class TableWatchdog(object):
+
+    def __init__(self, seconds=0, file=None):
+        """
+        :param seconds: hard time limit of a table, 0 disables the watchdog
+        :param file: where the tracebacks are dumped to, stderr by default
+        """
+        self.seconds = seconds
+        self._file = file if file is not None else sys.stderr
+
+    def arm(self):
+        if self.seconds > 0:
+            # the timer runs in a C thread, it also fires if the interpreter hangs in an extension
+            faulthandler.dump_traceback_later(self.seconds, exit=True, file=self._file)
+
+    def disarm(self):
+        if self.seconds > 0:
+            faulthandler.cancel_dump_traceback_later()
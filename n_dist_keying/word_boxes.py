@@ -0,0 +1,79 @@
+import numpy as np
+
+
+class WordBoxes(object):
+    """
+        Word box lookup of the layout writers for one line (dataframe line object of akf_corelib),
+        the 'UID' and 'word_match' columns are converted to arrays and the word positions are
+        computed once on first access, instead of once per word. A lookup is created when a line
+        is rendered and dropped afterwards
+    """
+
+    __slots__ = ('data', 'word', '_uids', '_word_match', '_word_spans', '_word_uid_positions')
+
+    def __init__(self, line):
+        self.data = line.data
+        self.word = line.word
+        self._uids = None
+        self._word_match = None
+        self._word_spans = None
+        self._word_uid_positions = None
+
+    @property
+    def uids(self):
+        if self._uids is None:
+            self._uids = np.array(self.data["UID"])
+        return self._uids
+
+    @property
+    def word_match(self):
+        if self._word_match is None:
+            self._word_match = np.array(self.data["word_match"])
+        return self._word_match
+
+    def get_word_span(self, word_number):
+        """
+        Positions of a word within the word_match column, wildcard entries (UID == -1) are skipped
+        :param word_number: number of the word like in 'word_match'
+        :return: tuple (first, middle, last) position, None if the word doesn't occur
+        """
+        if self._word_spans is None:
+            word_match = self.word_match[self.uids != -1]
+            self._word_spans = {}
+            if len(word_match) >= 1:
+                # group the positions by word number with one stable sort
+                order = np.argsort(word_match, kind='mergesort')
+                sorted_numbers = word_match[order]
+                group_starts = np.flatnonzero(np.r_[True, sorted_numbers[1:] != sorted_numbers[:-1]])
+                group_counts = np.diff(np.r_[group_starts, len(sorted_numbers)])
+                firsts = order[group_starts]
+                mids = order[group_starts + group_counts // 2]
+                lasts = order[group_starts + group_counts - 1]
+                for number, first, mid, last in zip(sorted_numbers[group_starts].tolist(), firsts.tolist(),
+                                                    mids.tolist(), lasts.tolist()):
+                    self._word_spans[number] = (first, mid, last)
+
+        return self._word_spans.get(word_number)
+
+    def get_word_uid_position(self, word_number):
+        """
+        Position of the box of a word within the word-box columns, derived from the lengths of the
+        entries in word["UID"] like in the hocr-output for the engine lines (roughly the middle of the word)
+        :param word_number: key of the word in word["UID"]
+        :return: position (can be fractional)
+        """
+        if self._word_uid_positions is None:
+            self._word_uid_positions = {}
+            # one pass over the words instead of one pass per word
+            position = 0
+            for number, uids in self.word["UID"].items():
+                self._word_uid_positions[number] = position + len(uids) / 2
+                if position == 0:
+                    position = -1
+                position += len(uids)
+            # words which aren't in the line get the position after the last word
+            self._word_uid_positions[None] = position
+
+        if word_number in self._word_uid_positions:
+            return self._word_uid_positions[word_number]
+        return self._word_uid_positions.get(None, 0)
@@ -0,0 +1,397 @@
+"""
+In-process replacement for the 'accuracy' and 'wordacc' programs of the
+isri-ocr-evaluation tools, see 'isri_handler.py'.
+
+The texts (and the words for wordacc) are aligned in memory with a minimal edit
+alignment ('Edist3.levenshtein_opcodes'), so the errors are the levenshtein distance,
+and the reports are written in the layout of the isri version 5.1 reports, which is
+what the summary programs (accsum, wordaccsum) read. Without a stopword file, wordacc
+takes the default stopwords of the isri programs ('isri_stopwords.txt').
+No external processes and no temporary files are needed.
+
+test_code/test_isri_evaluator.py compares the reports with reference reports of BUS3B
+pages, and the references with the reports of the isri programs where these are installed.
+"""
+
+import os
+from ocr_validation.ocrolib_edist import Edist3
+
+# default stopwords of wordacc, used if no stopword file is given
+DEFAULT_STOPWORDS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "isri_stopwords.txt")
+
+
+class CharClasses(object):
+    # character classes in report order: (name, check-function)
+    classes = [
+        ("ASCII Spacing Characters", lambda c: c in " \t\n\r\f\v"),
+        ("ASCII Special Symbols", lambda c: 33 <= ord(c) <= 126 and not c.isalnum()),
+        ("ASCII Digits", lambda c: "0" <= c <= "9"),
+        ("ASCII Uppercase Letters", lambda c: "A" <= c <= "Z"),
+        ("ASCII Lowercase Letters", lambda c: "a" <= c <= "z"),
+        ("Latin1 Spacing Characters", lambda c: c == "\u00a0"),
+        ("Latin1 Special Symbols", lambda c: "¡" <= c <= "¿" or c in "×÷"),
+        ("Latin1 Uppercase Letters", lambda c: "À" <= c <= "Þ" and c != "×"),
+        ("Latin1 Lowercase Letters", lambda c: "ß" <= c <= "ÿ" and c != "÷"),
+        ("Latin Extended-A", lambda c: "Ā" <= c <= "ſ"),
+        ("Latin Extended-B", lambda c: "ƀ" <= c <= "ɏ"),
+        ("General Punctuation", lambda c: "\u2000" <= c <= "\u206f"),
+        ("Other", lambda c: True),
+    ]
+
+    @staticmethod
+    def get_class_index(char):
+        for class_index, (name, check) in enumerate(CharClasses.classes):
+            if check(char):
+                return class_index
+
+
+class AccuracyData(object):
+    """
+        Result of a character accuracy evaluation, contains the values of an isri accuracy report
+    """
+
+    MARKED = 0
+    UNMARKED = 1
+
+    def __init__(self):
+        self.characters = 0
+        self.errors = 0
+        self.reject_characters = 0
+        self.suspect_markers = 0
+        self.false_marks = 0
+        self.marked_errors = 0
+        self.ops = [[0, 0, 0], [0, 0, 0]]     # [marked, unmarked] x [insertions, substitutions, deletions]
+        self.class_stats = {}                 # class index -> [count, missed]
+        self.char_stats = {}                  # char -> [count, missed]
+        self.confusions = {}                  # (correct, generated) -> [errors, marked]
+
+    @property
+    def accuracy(self):
+        if self.characters == 0:
+            return None
+        return 100.0 * (self.characters - self.errors) / self.characters
+
+
+class WordAccuracyData(object):
+    """
+        Result of a word accuracy evaluation, contains the values of an isri wordacc report
+    """
+
+    MAX_PHRASE_LENGTH = 8
+
+    def __init__(self):
+        self.words = 0
+        self.missed = 0
+        self.stopwords = [0, 0]               # count, missed
+        self.non_stopwords = [0, 0]
+        self.distinct_non_stopwords = [0, 0]
+        self.phrases = []                     # (length, count, missed) for length 1..MAX_PHRASE_LENGTH
+        self.word_stats = {}                  # word -> [count, missed]
+
+    @property
+    def accuracy(self):
+        if self.words == 0:
+            return None
+        return 100.0 * (self.words - self.missed) / self.words
+
+
+class IsriEvaluator(object):
+
+    REJECT_CHARACTER = "~"
+    SUSPECT_MARKER = "^"
+
+    ACCURACY_TITLE = "UNLV-ISRI OCR Accuracy Report Version 5.1"
+    WORDACC_TITLE = "UNLV-ISRI OCR Word Accuracy Report Version 5.1"
+
+    @staticmethod
+    def read_text(filepath):
+        with open(filepath, 'r', encoding="utf-8") as file:
+            return file.read()
+
+    @staticmethod
+    def reduce_text(text, ignore_whitespace, ignore_emptyline, ignore_tabs):
+        """
+        In memory version of 'TableParser.create_reduced_file'
+        :return: reduced text
+        """
+        final_data = []
+        for line in text.splitlines(keepends=True):
+            linetocheck = line
+
+            if ignore_whitespace:
+                linetocheck = linetocheck.replace(" ", "")
+
+            if ignore_tabs:
+                linetocheck = linetocheck.replace("\t", "")
+
+            if ignore_emptyline and not linetocheck.isspace():
+                final_data.append(linetocheck)
+
+        return "".join(final_data)
+
+    def split_generated_text(self, generated_text):
+        """
+        Removes the suspect markers from the generated text, the character after a marker
+        and reject characters are marked
+        :return: generated characters, marked flags, number of suspect markers
+        """
+        chars = []
+        marked = []
+        suspect_markers = 0
+        mark_next = False
+        for char in generated_text:
+            if char == self.SUSPECT_MARKER:
+                suspect_markers += 1
+                mark_next = True
+                continue
+            chars.append(char)
+            marked.append(mark_next or char == self.REJECT_CHARACTER)
+            mark_next = False
+
+        return "".join(chars), marked, suspect_markers
+
+    def accuracy_texts(self, correct_text, generated_text):
+        """
+        Character accuracy of generated text against the correct text
+        :return: AccuracyData
+        """
+        acc_data = AccuracyData()
+
+        generated_chars, marked, suspect_markers = self.split_generated_text(generated_text)
+        acc_data.characters = len(correct_text)
+        acc_data.suspect_markers = suspect_markers
+        acc_data.reject_characters = generated_chars.count(self.REJECT_CHARACTER)
+
+        for char in correct_text:
+            char_stat = acc_data.char_stats.setdefault(char, [0, 0])
+            char_stat[0] += 1
+            class_stat = acc_data.class_stats.setdefault(CharClasses.get_class_index(char), [0, 0])
+            class_stat[0] += 1
+
+        for tag, c_start, c_end, g_start, g_end in Edist3.levenshtein_opcodes(correct_text, generated_chars):
+            if tag == 'equal':
+                for g_index in range(g_start, g_end):
+                    if marked[g_index]:
+                        acc_data.false_marks += 1
+                continue
+
+            correct_part = correct_text[c_start:c_end]
+            generated_part = generated_chars[g_start:g_end]
+            length_correct = len(correct_part)
+            length_generated = len(generated_part)
+
+            # a minimal alignment has no insertions and deletions in the same opcode
+            substitutions = min(length_correct, length_generated)
+            insertions = max(0, length_generated - length_correct)
+            deletions = max(0, length_correct - length_generated)
+            errors = max(length_correct, length_generated)
+
+            is_marked = any(marked[g_start:g_end])
+            ops = acc_data.ops[AccuracyData.MARKED if is_marked else AccuracyData.UNMARKED]
+            ops[0] += insertions
+            ops[1] += substitutions
+            ops[2] += deletions
+
+            acc_data.errors += errors
+            if is_marked:
+                acc_data.marked_errors += errors
+
+            confusion = acc_data.confusions.setdefault((correct_part, generated_part), [0, 0])
+            confusion[0] += errors
+            if is_marked:
+                confusion[1] += errors
+
+            for char in correct_part:
+                acc_data.char_stats[char][1] += 1
+                acc_data.class_stats[CharClasses.get_class_index(char)][1] += 1
+
+        return acc_data
+
+    def accuracy(self, path_correctfile, path_generatedfile, path_accuracy_report=""):
+        """
+        Same interface as 'IsriHandler.accuracy'
+        """
+        acc_data = self.accuracy_texts(self.read_text(path_correctfile), self.read_text(path_generatedfile))
+        if path_accuracy_report:
+            self.write_accuracy_report(acc_data, path_accuracy_report)
+        return acc_data
+
+    @staticmethod
+    def get_words(text):
+        """
+        Words like in isri wordacc: sequences of letters, lowercased
+        """
+        words = []
+        current_word = []
+        for char in text:
+            if char.isalpha():
+                current_word.append(char.lower())
+            elif current_word:
+                words.append("".join(current_word))
+                current_word = []
+        if current_word:
+            words.append("".join(current_word))
+        return words
+
+    @staticmethod
+    def read_stopwords(path_stopwordfile=None):
+        """
+        :param path_stopwordfile: one word per line, the default stopwords of wordacc if None
+        """
+        if path_stopwordfile is None:
+            path_stopwordfile = DEFAULT_STOPWORDS_FILE
+        with open(path_stopwordfile, 'r', encoding="utf-8") as file:
+            return set(word.strip().lower() for word in file if word.strip())
+
+    def wordacc_texts(self, correct_text, generated_text, stopwords=None):
+        """
+        Word accuracy of generated text against the correct text
+        :param stopwords: set of stopwords, the default stopwords of wordacc if None
+        :return: WordAccuracyData
+        """
+        if stopwords is None:
+            stopwords = self.read_stopwords()
+
+        wac_data = WordAccuracyData()
+        correct_words = self.get_words(correct_text)
+        generated_words = self.get_words(generated_text)
+
+        missed_flags = [True] * len(correct_words)
+        for tag, c_start, c_end, g_start, g_end in Edist3.levenshtein_opcodes(correct_words, generated_words):
+            if tag == 'equal':
+                for c_index in range(c_start, c_end):
+                    missed_flags[c_index] = False
+
+        distinct_non_stopwords = {}
+        for word, missed in zip(correct_words, missed_flags):
+            word_stat = wac_data.word_stats.setdefault(word, [0, 0])
+            word_stat[0] += 1
+            wac_data.words += 1
+            if word in stopwords:
+                wac_data.stopwords[0] += 1
+            else:
+                wac_data.non_stopwords[0] += 1
+                distinct_non_stopwords.setdefault(word, False)
+            if missed:
+                word_stat[1] += 1
+                wac_data.missed += 1
+                if word in stopwords:
+                    wac_data.stopwords[1] += 1
+                else:
+                    wac_data.non_stopwords[1] += 1
+                    distinct_non_stopwords[word] = True
+
+        wac_data.distinct_non_stopwords = [len(distinct_non_stopwords),
+                                           sum(1 for missed in distinct_non_stopwords.values() if missed)]
+
+        # phrase accuracy: a phrase of n consecutive words is correct if all its words are correct
+        for phrase_length in range(1, WordAccuracyData.MAX_PHRASE_LENGTH + 1):
+            count = max(0, len(correct_words) - phrase_length + 1)
+            missed = 0
+            for start in range(0, count):
+                if any(missed_flags[start:start + phrase_length]):
+                    missed += 1
+            wac_data.phrases.append((phrase_length, count, missed))
+
+        return wac_data
+
+    def wordacc(self, path_correctfile, path_comparison_file, path_stopwordfile=None, path_wordacc_report=None):
+        """
+        Same interface as 'IsriHandler.wordacc'
+        """
+        wac_data = self.wordacc_texts(self.read_text(path_correctfile), self.read_text(path_comparison_file),
+                                      self.read_stopwords(path_stopwordfile))
+        if path_wordacc_report is not None:
+            self.write_wordacc_report(wac_data, path_wordacc_report)
+        return wac_data
+
+    @staticmethod
+    def _pct(numerator, denominator):
+        if denominator == 0:
+            return "  ------"
+        return "%8.2f" % (100.0 * numerator / denominator)
+
+    @staticmethod
+    def _char_repr(text):
+        return text.replace("\n", "<\\n>")
+
+    def write_accuracy_report(self, acc_data, path_accuracy_report):
+        pct = self._pct
+        lines = [self.ACCURACY_TITLE, "-" * len(self.ACCURACY_TITLE)]
+        lines.append("%8d   Characters" % acc_data.characters)
+        lines.append("%8d   Errors" % acc_data.errors)
+        lines.append("%s%%  Accuracy" % pct(acc_data.characters - acc_data.errors, acc_data.characters))
+        lines.append("")
+        lines.append("%8d   Reject Characters" % acc_data.reject_characters)
+        lines.append("%8d   Suspect Markers" % acc_data.suspect_markers)
+        lines.append("%8d   False Marks" % acc_data.false_marks)
+        lines.append("%s%%  Characters Marked" % pct(acc_data.reject_characters + acc_data.suspect_markers,
+                                                    acc_data.characters))
+        lines.append("%s%%  Accuracy After Correction" % pct(acc_data.characters - acc_data.errors +
+                                                            acc_data.marked_errors, acc_data.characters))
+        lines.append("")
+        lines.append("     Ins    Subst      Del   Errors")
+        total_ops = [0, 0, 0]
+        for ops, name in [(acc_data.ops[AccuracyData.MARKED], "Marked"),
+                          (acc_data.ops[AccuracyData.UNMARKED], "Unmarked")]:
+            lines.append("%8d %8d %8d %8d   %s" % (ops[0], ops[1], ops[2], sum(ops), name))
+            total_ops = [total + op for total, op in zip(total_ops, ops)]
+        lines.append("%8d %8d %8d %8d   %s" % (total_ops[0], total_ops[1], total_ops[2], sum(total_ops), "Total"))
+        lines.append("")
+        lines.append("   Count   Missed   %Right")
+        total_count = 0
+        total_missed = 0
+        for class_index, (name, check) in enumerate(CharClasses.classes):
+            if class_index not in acc_data.class_stats:
+                continue
+            count, missed = acc_data.class_stats[class_index]
+            total_count += count
+            total_missed += missed
+            lines.append("%8d %8d %s   %s" % (count, missed, pct(count - missed, count), name))
+        lines.append("%8d %8d %s   %s" % (total_count, total_missed, pct(total_count - total_missed, total_count),
+                                          "Total"))
+        lines.append("")
+        lines.append("  Errors   Marked   Correct-Generated")
+        confusions = sorted(acc_data.confusions.items(), key=lambda item: (-item[1][0], item[0]))
+        for (correct_part, generated_part), (errors, marked) in confusions:
+            lines.append("%8d %8d   {%s}-{%s}" % (errors, marked, self._char_repr(correct_part),
+                                                  self._char_repr(generated_part)))
+        lines.append("")
+        lines.append("   Count   Missed   %Right")
+        for char in sorted(acc_data.char_stats):
+            count, missed = acc_data.char_stats[char]
+            lines.append("%8d %8d %s   {%s}" % (count, missed, pct(count - missed, count), self._char_repr(char)))
+
+        self._write_lines(lines, path_accuracy_report)
+
+    def write_wordacc_report(self, wac_data, path_wordacc_report):
+        pct = self._pct
+        lines = [self.WORDACC_TITLE, "-" * len(self.WORDACC_TITLE)]
+        lines.append("%8d   Words" % wac_data.words)
+        lines.append("%8d   Misrecognized" % wac_data.missed)
+        lines.append("%s%%  Accuracy" % pct(wac_data.words - wac_data.missed, wac_data.words))
+        lines.append("")
+        lines.append("   Count   Missed   %Right")
+        for (count, missed), name in [(wac_data.stopwords, "Stopwords"),
+                                      (wac_data.non_stopwords, "Non-stopwords"),
+                                      (wac_data.distinct_non_stopwords, "Distinct Non-stopwords")]:
+            lines.append("%8d %8d %s   %s" % (count, missed, pct(count - missed, count), name))
+        lines.append("")
+        lines.append("  Phrase    Count   Missed   %Right")
+        for phrase_length, count, missed in wac_data.phrases:
+            lines.append("%8d %8d %8d %s" % (phrase_length, count, missed, pct(count - missed, count)))
+        lines.append("")
+        lines.append("   Count   Missed   %Right")
+        for word in sorted(wac_data.word_stats):
+            count, missed = wac_data.word_stats[word]
+            lines.append("%8d %8d %s   %s" % (count, missed, pct(count - missed, count), word))
+
+        self._write_lines(lines, path_wordacc_report)
+
+    @staticmethod
+    def _write_lines(lines, filepath):
+        dir = os.path.dirname(filepath)
+        if dir and not os.path.exists(dir):
+            os.makedirs(dir)
+        with open(filepath, 'w', encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
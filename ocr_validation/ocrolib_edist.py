@@ -4,32 +4,155 @@
     pylab is part of matplotlib
 """
 
-from scipy.ndimage import filters
 import re
 
 
 class Edist3:
 
     @staticmethod
-    def normed_levenshtein(a, b):
+    def normed_levenshtein(a, b, cutoff=None):
         """ or nlevenshtein (with longest alignment)
         Calculates a normalized version of the levenshtein distance.
         Divided through the maximum length (which is in levenshtein the length
         of the longer string)
         :param a: first string
         :param b: second string
+        :param cutoff: see 'levenshtein'
         :return: normed levenshtein distance and levenshtein distance
         """
 
         len_a = len(a)
         len_b = len(b)
         max_len = max(len_a, len_b)
-        ldist = Edist3.levenshtein(a, b)
+        if max_len == 0:
+            return 0.0, 0
+        ldist = Edist3.levenshtein(a, b, cutoff)
         normed_ldist = ldist / max_len
         return normed_ldist, ldist
 
     @staticmethod
-    def levenshtein(a, b):
+    def levenshtein(a, b, cutoff=None):
+        """Calculates the Levenshtein distance between a and b.
+        Bit-parallel algorithm of Myers (1999) in the formulation of Hyyrö (2001),
+        each column of the distance matrix is processed as one python integer,
+        which has arbitrary length, so there is no limit for the string length.
+        :param a: first string
+        :param b: second string
+        :param cutoff: if not None the calculation stops as soon as the distance is
+                       known to be higher than cutoff, then cutoff+1 is returned
+        :return: levenshtein distance (exact as long as it's not higher than cutoff)
+        """
+        if a == b:
+            return 0
+        n, m = len(a), len(b)
+        # the shorter string is the pattern (bit-vector length)
+        if n > m: a,b = b,a; n,m = m,n
+        if cutoff is not None and m - n > cutoff:
+            return cutoff + 1
+        if n == 0:
+            return m
+
+        # bitmasks of the positions of each character in the pattern
+        peq = {}
+        for i, char in enumerate(a):
+            peq[char] = peq.get(char, 0) | (1 << i)
+
+        mask = (1 << n) - 1
+        last = 1 << (n - 1)
+        pv = mask  # vertical positive deltas
+        mv = 0     # vertical negative deltas
+        score = n
+        for j, char in enumerate(b):
+            eq = peq.get(char, 0)
+            xv = eq | mv
+            xh = (((eq & pv) + pv) ^ pv) | eq
+            ph = mv | ~(xh | pv)
+            mh = pv & xh
+            if ph & last:
+                score += 1
+            elif mh & last:
+                score -= 1
+            ph = ((ph << 1) | 1) & mask
+            mh = (mh << 1) & mask
+            pv = (mh | ~(xv | ph)) & mask
+            mv = ph & xv
+            # each remaining column lowers the score by one at most
+            if cutoff is not None and score - (m - j - 1) > cutoff:
+                return cutoff + 1
+
+        return score
+
+    @staticmethod
+    def levenshtein_opcodes(a, b):
+        """Minimal edit alignment of a and b, from the backtrace of the full levenshtein distance
+        matrix. The rows are computed with numpy (the insertions of a row with a cumulative minimum),
+        the matrix has (len(a)+1)*(len(b)+1) cells, which is fine for pages but not for whole books.
+        :param a: first sequence (string or list of hashable items, i.e. words)
+        :param b: second sequence
+        :return: list of opcodes (tag, a_start, a_end, b_start, b_end) like 'difflib.SequenceMatcher.get_opcodes',
+                 the edit operations between two 'equal' opcodes are one opcode, the number of edit operations
+                 of an opcode is the length of its longer side
+        """
+        # numpy is only needed here, don't load it with the plain distance functions
+        import numpy as np
+
+        n, m = len(a), len(b)
+        codes = {}
+        a_codes = np.array([codes.setdefault(item, len(codes)) for item in a], dtype=np.int64)
+        b_codes = np.array([codes.setdefault(item, len(codes)) for item in b], dtype=np.int64)
+
+        dtype = np.uint16 if max(n, m) < np.iinfo(np.uint16).max else np.uint32
+        dists = np.empty((n + 1, m + 1), dtype)
+        columns = np.arange(m + 1, dtype=np.int64)
+        dists[0, :] = columns
+        row = np.empty(m + 1, np.int64)
+        for i in range(1, n + 1):
+            previous = dists[i - 1].astype(np.int64)
+            row[0] = i
+            row[1:] = np.minimum(previous[1:] + 1, previous[:-1] + (b_codes != a_codes[i - 1]))
+            # insertions: row[j] = min over k <= j of (row[k] + j - k)
+            dists[i, :] = np.minimum.accumulate(row - columns) + columns
+
+        # backtrace from the end, matches first, then substitutions, deletions and insertions
+        steps = []
+        i, j = n, m
+        while i > 0 or j > 0:
+            dist = int(dists[i, j])
+            if i > 0 and j > 0 and a_codes[i - 1] == b_codes[j - 1] and int(dists[i - 1, j - 1]) == dist:
+                steps.append('equal')
+                i, j = i - 1, j - 1
+            elif i > 0 and j > 0 and int(dists[i - 1, j - 1]) + 1 == dist:
+                steps.append('replace')
+                i, j = i - 1, j - 1
+            elif i > 0 and int(dists[i - 1, j]) + 1 == dist:
+                steps.append('delete')
+                i -= 1
+            else:
+                steps.append('insert')
+                j -= 1
+        steps.reverse()
+
+        # join the steps to opcodes
+        opcodes = []
+        i, j = 0, 0
+        for step in steps:
+            is_equal = step == 'equal'
+            if opcodes and (opcodes[-1][0] == 'equal') == is_equal:
+                tag, a_start, a_end, b_start, b_end = opcodes[-1]
+            else:
+                tag, a_start, a_end, b_start, b_end = step, i, i, j, j
+                opcodes.append(None)
+            if step != 'insert':
+                i += 1
+            if step != 'delete':
+                j += 1
+            if not is_equal:
+                tag = 'replace' if (i > a_start and j > b_start) else step
+            opcodes[-1] = (tag, a_start, i, b_start, j)
+        return opcodes
+
+    @staticmethod
+    def levenshtein_classic(a, b):
         """Calculates the Levenshtein distance between a and b.
         (Clever compact Pythonic implementation from hetland.org)"""
         n, m = len(a), len(b)
@@ -48,6 +171,8 @@ class Edist3:
     def xlevenshtein(a, b, context=1):
         """Calculates the Levensthein distance between a and b
         and generates a list of differences by context."""
+        # scipy is only needed here, don't load it with the plain distance functions
+        from scipy.ndimage import filters
         n, m = len(a), len(b)
         assert m > 0 # xlevenshtein should only be called with non-empty b string (ground truth)
         if a == b: return 0, [] # speed up for the easy case
@@ -1,7 +1,17 @@
 from akf_corelib.df_objectifier import DFObjectifier
 from n_dist_keying.database_handler import DatabaseHandler
+from n_dist_keying.ocr_comparison import OCRcomparison
+from n_dist_keying.pipeline_context import PipelineContext
+from n_dist_keying.dataset_writer import DatasetTextWriter, DatasetHocrWriter, DatasetAltoWriter, \
+    DatasetPageXmlWriter, DatasetWriterGroup
+from n_dist_keying.output_writer_thread import OutputWriterThread
+from n_dist_keying.result_database_writer import DatasetDatabaseWriter
+from n_dist_keying.run_journal import RunJournal
+from n_dist_keying.table_profiler import TableProfiler
+from n_dist_keying.voting_budget import TableWatchdog
 from ocr_validation.visualization_handler import VisualizationHandler
 from ocr_validation.isri_handler import IsriHandler
+from ocr_validation.isri_evaluator import IsriEvaluator
 from os import listdir
 from os.path import isfile, join
 import os
@@ -36,6 +46,32 @@ class TableParser(object):
 
         self._base_db_dir = os.path.basename(os.path.normpath(dbpath))
 
+        # components of the voting which are shared by all parsed tables
+        self.pipeline_context = PipelineContext(config, self.vocab_checker)
+
+        self._output_thread = None
+        if config.WRITE_OUTPUTS_IN_BACKGROUND:
+            self._output_thread = OutputWriterThread()
+
+        # optional cProfile of each parsed table, for finding the pathological tables of a run
+        self.table_profiler = TableProfiler(config.PROFILE_TABLES, config.OUTPUT_ROOT_PATH + "/profiles",
+                                            float(config.PROFILE_TABLES_SAMPLE_RATE),
+                                            float(config.PROFILE_TABLES_MIN_SECONDS),
+                                            int(config.PROFILE_TABLES_TOP_FUNCTIONS))
+
+        # hard time limit of a table, ends the process if a table hangs
+        self.table_watchdog = TableWatchdog(float(config.TABLE_WATCHDOG_SECONDS))
+
+        # finished tables of the run, an aborted run can be resumed with them
+        self.run_journal = None
+        self.number_of_skipped_tables = 0
+        # tables which were started but not finished in the resumed run, i.e. ended by the watchdog
+        self.aborted_tables = []
+        if config.WRITE_RUN_JOURNAL or config.RESUME_RUN:
+            self.run_journal = RunJournal(config.OUTPUT_ROOT_PATH + "/" + RunJournal.FILENAME, config)
+            if config.RESUME_RUN:
+                self.run_journal.load()
+
     def delete_output_dir(self):
         # delete database directory
         if os.path.exists(self._config.OUTPUT_ROOT_PATH):
@@ -43,8 +79,8 @@ class TableParser(object):
 
     def create_output_dir(self):
 
-        # dcreate database directory
-        os.makedirs(self._config.OUTPUT_ROOT_PATH)
+        # dcreate database directory, it already exists if a run is resumed
+        os.makedirs(self._config.OUTPUT_ROOT_PATH, exist_ok=True)
 
     def create_isri_reports_old(self, filestructs, addendum):
 
@@ -100,24 +136,55 @@ class TableParser(object):
         basic_output_dir = self._config.OUTPUT_ROOT_PATH + "/" + self._base_db_dir+"_"+addendum + "/" + basename_db
         return basic_output_dir
 
-    def parse_a_table(self, dbdir_abs, table):
+    def get_table_name(self, dbdir_abs, table):
+        """
+        :return: name of the table for metrics and profiles, database name and table
+        """
+        basename_db = os.path.splitext(os.path.basename(os.path.normpath(dbdir_abs)))[0]
+        return basename_db + "/" + table
+
+    def parse_a_table(self, dbdir_abs, table, dataframe_wrapper=None):
+        """
+        Combines all entries in the database matching the table key and writes the results
+        :param dataframe_wrapper: the already loaded table (see 'TablePrefetcher'), it's loaded here if None
+        :return: path of the created result file, list of other created files
+        """
+        # a table which ends the process is recorded before, so a resumed run doesn't vote it again
+        if self.table_watchdog.seconds > 0 and self.run_journal is not None:
+            self.run_journal.record_started(self.get_table_name(dbdir_abs, table), dbdir_abs, table)
+        self.table_watchdog.arm()
+        try:
+            return self.table_profiler.run(self.get_table_name(dbdir_abs, table), self._parse_a_table,
+                                           dbdir_abs, table, dataframe_wrapper)
+        finally:
+            self.table_watchdog.disarm()
+
+    def _parse_a_table(self, dbdir_abs, table, dataframe_wrapper):
 
         # basename_db_ext = os.path.basename(os.path.normpath(dbdir_abs))
         # basename_db = os.path.splitext(basename_db_ext)[0] # remove extension
         additional_created_files = []
 
-        predictor = None
-        if self._config.PREDICTOR_AUFSICHTSRAT_ENABLED:
-            # care: import statement within condition, cause this causes keras to load
-            from machine_learning_components.special_character_predictor import SpecialCharPredictor
-            predictor = SpecialCharPredictor()
-            predictor.load_prediction_model()
+        # the predictor model is loaded once for all tables, the voting components are reused
+        predictor = self.pipeline_context.get_predictor()
+        self.pipeline_context.reset_table_state()
+
+        metrics = self.pipeline_context.metrics
+        metrics.start_table(self.get_table_name(dbdir_abs, table))
 
-        dataframe_wrapper = DFObjectifier(dbdir_abs, table)
-        database_handler = DatabaseHandler(dataframe_wrapper, self._config.NUMBER_OF_INPUTS, predictor, self.vocab_checker)
+        if dataframe_wrapper is None:
+            # DFObjectifier (akf_corelib) takes the database url and connects with it itself,
+            # the table loads don't use the engine pool
+            with metrics.timer("load_table"):
+                dataframe_wrapper = DFObjectifier(dbdir_abs, table)
+        database_handler = DatabaseHandler(dataframe_wrapper, self._config.NUMBER_OF_INPUTS, predictor, self.vocab_checker,
+                                           self.pipeline_context)
 
+        if self._config.STREAM_OCR_SETS:
+            return self.parse_a_table_streaming(dbdir_abs, table, database_handler, predictor)
 
-        ocr_comparison = database_handler.create_ocr_comparison(predictor=predictor)
+        with metrics.timer("create_sets"):
+            ocr_comparison = database_handler.create_ocr_comparison(predictor=predictor)
 
         if self._config.KEYING_RESULT_VOCABULARY_CORRECTION_POST or self._config.KEYING_RESULT_VOCABULARY_CORRECTION_VOTE:
             # hand over vocabulary checker if spellchecking is enabled
@@ -126,98 +193,224 @@ class TableParser(object):
         ocr_comparison.sort_set()
         # print("Print mean||decision||abbyy||tesseract||ocropus|||| without unspacing-------------------")
         # ocr_comparison.print_sets(False)
+        number_of_sets = len(ocr_comparison.ocr_sets)
 
-        if self._config.SAVE_INPUT_DATASETS_TO_FILE:
-
-            output_path_abbyy = self.get_basic_output_directory(dbdir_abs, "abbyy") + "/" + table + "_abbyy.txt"
-            output_path_tess = self.get_basic_output_directory(dbdir_abs, "tess") + "/" + table + "_tess.txt"
-            output_path_ocro = self.get_basic_output_directory(dbdir_abs, "ocro") + "/" + table + "_ocro.txt"
-
-            ocr_comparison.save_dataset_to_file(output_path_abbyy, 0, mode_add_linebreaks=False)
-            ocr_comparison.save_dataset_to_file(output_path_tess, 1, mode_add_linebreaks=False)
-            ocr_comparison.save_dataset_to_file(output_path_ocro, 2, mode_add_linebreaks=False)
-
-            if self._config.WRITE_HOCR:
-                ocr_comparison.save_dataset_to_hocr(output_path_abbyy, 0, mode_add_linebreaks=False)
-                ocr_comparison.save_dataset_to_hocr(output_path_tess, 1, mode_add_linebreaks=False)
-                ocr_comparison.save_dataset_to_hocr(output_path_ocro, 2, mode_add_linebreaks=False)
-
-            additional_created_files.append(output_path_abbyy)
-            additional_created_files.append(output_path_tess)
-            additional_created_files.append(output_path_ocro)
-
-            # ocr_comparison.save_dataset_to_file()
+        input_writers = self.create_input_writers(ocr_comparison, dbdir_abs, table, number_of_sets,
+                                                  additional_created_files)
+        if not input_writers.is_empty():
+            # the inputs are written before the keying, msa changes the lines, only the closing can be deferred
+            input_writers.write_sets(ocr_comparison.ocr_sets)
+            self.run_output_job(input_writers.close)
 
         if self._config.DO_N_DIST_KEYING:
             print("Doing: N_DIST_KEYING, WORDWISE KEYING: ", self._config.NDIST_USE_WORDWISE_KEYING)
-            ocr_comparison.do_n_distance_keying(self._config.NDIST_USE_WORDWISE_KEYING)   # do the keying, which makes the decision which is the best line for each set
-            ocr_comparison.print_sets(False)
-            #ocr_comparison.print_n_distance_keying_results()  # print keying results
-            if self._config.KEYING_RESULT_POSTCORRECTION:
-                ocr_comparison.do_postcorrection(postcorrect_keying=True)
-
-            created_path = self.get_basic_output_directory(dbdir_abs,"ndist_keying") + "/" + table + "_ndist.txt"
-
-            ocr_comparison.save_dataset_to_file(created_path, 0, self._config.MODE_ADD_LINEBREAKS, "ndist_keying")
-            return created_path, additional_created_files
-
-
-        if self._config.DO_MSA_BEST:
-            ocr_comparison.do_msa_best_new(self._config.MSA_BEST_USE_N_DIST_PIVOT,
-                                           self._config.MSA_BEST_USE_LONGEST_PIVOT,
-                                           self._config.MSA_BEST_USE_CHARCONFS,
-                                           self._config.MSA_BEST_USE_WORDWISE_MSA,
-                                           self._config.MSA_BEST_USE_SEARCHSPACE,
-                                           self._config.KEYING_RESULT_POSTCORRECTION)
-
 
+        # the sets are voted in their order, the voter and the vocabulary correction keep a state between the lines
+        store_last_entry = None
+        for current_set in ocr_comparison.ocr_sets:
+            store_last_entry = self.vote_set(ocr_comparison, current_set, store_last_entry)
+
+        created_path, result_writers = self.create_result_writers(ocr_comparison, dbdir_abs, table, number_of_sets)
+        self.run_output_job(result_writers.write_sets_and_close, ocr_comparison.ocr_sets)
+        return created_path, additional_created_files
+
+    def vote_set(self, ocr_comparison, current_set, store_last_entry):
+        """
+        Keying of one set with the configured method, followed by the configured corrections of the result,
+        used by 'parse_a_table' and 'parse_a_table_streaming'
+        :param store_last_entry: state of the vocabulary correction from the previous set
+        :return: state of the vocabulary correction for the next set
+        """
+        if self._config.DO_N_DIST_KEYING:
+            # do the keying, which makes the decision which is the best line for the set
+            ocr_comparison.do_n_distance_keying_for_set(current_set, self._config.NDIST_USE_WORDWISE_KEYING)
+            current_set.print_me(False)
+        elif self._config.DO_MSA_BEST:
+            ocr_comparison.do_msa_best_for_set(current_set,
+                                               self._config.MSA_BEST_USE_N_DIST_PIVOT,
+                                               self._config.MSA_BEST_USE_LONGEST_PIVOT,
+                                               self._config.MSA_BEST_USE_CHARCONFS,
+                                               self._config.MSA_BEST_USE_WORDWISE_MSA,
+                                               self._config.MSA_BEST_USE_SEARCHSPACE)
 
             if self._config.KEYING_RESULT_VOCABULARY_CORRECTION_POST:
-                ocr_comparison.do_vocabulary_correction()
-
+                store_last_entry = ocr_comparison.do_vocabulary_correction_for_set(current_set, store_last_entry)
 
             if self._config.KEYING_RESULT_POSTCORRECTION:
-                ocr_comparison.do_postcorrection(postcorrect_keying=True,
-                                                 postcorrect_msa=self._config.MSA_BEST_POSTCORRECTION,
-                                                 postcorrect_ndist=self._config.NDIST_KEYING_POSTCORRECTION)
-
-            """
-            if self._config.MSA_BEST_USE_WORDWISE_MSA:
-                # this is the new msa best invocation
-                ocr_comparison.do_msa_best_new(self._config.MSA_BEST_USE_N_DIST_PIVOT, self._config.MSA_BEST_USE_LONGEST_PIVOT, self._config.MSA_BEST_USE_CHARCONFS, \
-                                               self._config.MSA_BEST_USE_WORDWISE_MSA, self._config.MSA_BEST_USE_SEARCHSPACE, self._config.KEYING_RESULT_POSTCORRECTION)
-
-
-            else:
-                #todo refactor this old stuff
-                if self._config.MSA_BEST_USE_CHARCONFS is False:
-                    if self._config.MSA_BEST_USE_N_DIST_PIVOT:
-                        print("Doing: DO_MSA_BEST with MSA_BEST_USE_N_DIST_PIVOT")
-
-                        ocr_comparison.do_msa_best_with_ndist_pivot()
-                    else:
-                        print("Doing: DO_MSA_BEST without NDIST_PIVOT")
-                        ocr_comparison.do_msa_best()
-                else:
-                    if self._config.MSA_BEST_USE_N_DIST_PIVOT:
-                        print("Doing: DO_MSA_BEST with MSA_BEST_USE_N_DIST_PIVOT and CHARCONFS")
+                ocr_comparison.do_postcorrection_for_set(current_set,
+                                                         postcorrect_ndist=self._config.NDIST_KEYING_POSTCORRECTION,
+                                                         postcorrect_msa=self._config.MSA_BEST_POSTCORRECTION)
+        return store_last_entry
+
+    def create_input_writers(self, ocr_comparison, dbdir_abs, table, number_of_sets, additional_created_files):
+        """
+        Writers for the inputs of the engines, if they are saved to files
+        :param additional_created_files: list, the paths of the created text files are added
+        :return: writer group, empty if the inputs aren't saved
+        """
+        input_writers = DatasetWriterGroup()
+        if self._config.SAVE_INPUT_DATASETS_TO_FILE:
+            for set_index, engine in enumerate(["abbyy", "tess", "ocro"]):
+                output_path = self.get_basic_output_directory(dbdir_abs, engine) + "/" + table + "_" + engine + ".txt"
+                for writer in self.create_dataset_writers(ocr_comparison, output_path, set_index, number_of_sets):
+                    input_writers.add(writer)
+                additional_created_files.append(output_path)
+        return input_writers
+
+    def create_result_writers(self, ocr_comparison, dbdir_abs, table, number_of_sets):
+        """
+        Writers for the result of the configured keying method
+        :return: path of the result text file (None if no method is configured), writer group
+        """
+        if self._config.DO_N_DIST_KEYING:
+            created_path = self.get_basic_output_directory(dbdir_abs, "ndist_keying") + "/" + table + "_ndist.txt"
+            return created_path, DatasetWriterGroup(self.create_dataset_writers(ocr_comparison, created_path, 0,
+                                                                                number_of_sets,
+                                                                                self._config.MODE_ADD_LINEBREAKS,
+                                                                                "ndist_keying", write_layouts=False,
+                                                                                dbdir_abs=dbdir_abs, table=table))
+        if self._config.DO_MSA_BEST:
+            created_path = self.get_basic_output_directory(dbdir_abs, "msa_best") + "/" + table + "_msa_best.txt"
+            return created_path, DatasetWriterGroup(self.create_dataset_writers(ocr_comparison, created_path, 0,
+                                                                                number_of_sets,
+                                                                                self._config.MODE_ADD_LINEBREAKS,
+                                                                                "msa_best", dbdir_abs=dbdir_abs,
+                                                                                table=table))
+        return None, DatasetWriterGroup()
+
+    def create_dataset_writers(self, ocr_comparison, output_path, set_index, number_of_sets, mode_add_linebreaks=False,
+                               other_set="", write_layouts=True, dbdir_abs=None, table=None):
+        """
+        Writers for all configured output formats of one dataset
+        :param write_layouts: also create the formats with boxes (hocr, alto, page-xml) if configured
+        :param dbdir_abs: database of the table, the keying results are stored there if configured
+        :param table: name of the parsed table
+        :return: list of writers
+        """
+        writers = [DatasetTextWriter(ocr_comparison, output_path, set_index, mode_add_linebreaks, other_set)]
+        if write_layouts:
+            if self._config.WRITE_HOCR:
+                writers.append(DatasetHocrWriter(output_path, set_index, number_of_sets, mode_add_linebreaks, other_set))
+            if self._config.WRITE_ALTO:
+                writers.append(DatasetAltoWriter(output_path, set_index, other_set))
+            if self._config.WRITE_PAGEXML:
+                writers.append(DatasetPageXmlWriter(output_path, set_index, other_set))
+        if dbdir_abs is not None and self._config.WRITE_RESULTS_TO_DATABASE:
+            writers.append(DatasetDatabaseWriter(dbdir_abs, table, other_set))
+        return writers
+
+    def is_table_finished(self, dbdir_abs, table):
+        """
+        :return: True if the run is resumed and the table is finished in the run journal
+                 with the same input and configuration
+        """
+        if not self._config.RESUME_RUN or self.run_journal is None:
+            return False
+        return self.run_journal.is_finished(self.get_table_name(dbdir_abs, table), dbdir_abs, table)
+
+    def skip_finished_tables(self, tables):
+        """
+        Generator over the tables which aren't finished (see 'is_table_finished'), a table is checked
+        when it's requested, e.g. by the 'TablePrefetcher', not all tables at the start of the run.
+        Tables which were aborted by the table watchdog are skipped as well and listed in 'aborted_tables'
+        :param tables: iterable of tuples (dbpath, table)
+        """
+        for dbdir_abs, table in tables:
+            if self.is_table_finished(dbdir_abs, table):
+                self.number_of_skipped_tables += 1
+                continue
+            if self.is_table_aborted(dbdir_abs, table):
+                print("Skipping table", table, "in database:", dbdir_abs, "it was aborted by the table watchdog")
+                self.aborted_tables.append(self.get_table_name(dbdir_abs, table))
+                continue
+            yield dbdir_abs, table
+
+    def is_table_aborted(self, dbdir_abs, table):
+        """
+        :return: True if the run is resumed and the table was started but not finished in the run journal
+                 with the same input and configuration
+        """
+        if not self._config.RESUME_RUN or self.run_journal is None:
+            return False
+        return self.run_journal.is_aborted(self.get_table_name(dbdir_abs, table), dbdir_abs, table)
+
+    def record_finished_table(self, dbdir_abs, table, path_created_file, additional_created_files):
+        """
+        Records the table in the run journal, after the output files of the table are written
+        (the outputs are written in order, so on the background thread this comes after them)
+        """
+        if self.run_journal is None:
+            return
+        created_files = [path_created_file] + list(additional_created_files)
+        self.run_output_job(self.run_journal.record, self.get_table_name(dbdir_abs, table), dbdir_abs, table,
+                            created_files)
+
+    def run_output_job(self, function, *args):
+        """
+        Runs an output job on the background thread if configured, otherwise directly
+        :param function: job, returns the number of written bytes (or None)
+        """
+        metrics = self.pipeline_context.metrics
+        # measured for the current table, also if the job runs while the next table is parsed
+        table_entry = metrics.get_table_entry()
+
+        def measured_job():
+            start = metrics.clock()
+            written_bytes = function(*args)
+            metrics.add_time("output_writing", start, table_entry)
+            if written_bytes:
+                metrics.count("bytes_written", written_bytes, table_entry)
+
+        if self._output_thread is not None:
+            self._output_thread.submit(measured_job)
+        else:
+            measured_job()
+
+    def wait_for_outputs(self):
+        """
+        Blocks until all output files of the parsed tables are written
+        """
+        if self._output_thread is not None:
+            self._output_thread.wait()
+
+    def stop_output_thread(self):
+        if self._output_thread is not None:
+            self._output_thread.stop()
+
+    def parse_a_table_streaming(self, dbdir_abs, table, database_handler, predictor):
+        """
+        Creates the same output files as 'parse_a_table', but each ocr_set is created, keyed and
+        rendered to the writers one at a time and released afterwards, so the sets don't accumulate.
+        The line objects of a set are created when the set is requested (see 'stream_ocr_sets'),
+        the rows of the table are still loaded completely by the DFObjectifier (akf_corelib)
+        :return: path of the created result file, list of other created files
+        """
+        additional_created_files = []
+        number_of_sets, ocr_sets = database_handler.stream_ocr_sets(predictor=predictor)
 
-                        ocr_comparison.do_msa_best_with_ndist_pivot_charconf()
-                    else:
-                        print("Doing: DO_MSA_BEST without NDIST_PIVOT and CHARCONFS")
-                        print("This is not implemented yet")
-            """
+        # holds the per-set processing steps, the sets itself are not added
+        ocr_comparison = OCRcomparison(predictor=predictor, metrics=self.pipeline_context.metrics)
+        if self._config.KEYING_RESULT_VOCABULARY_CORRECTION_POST or self._config.KEYING_RESULT_VOCABULARY_CORRECTION_VOTE:
+            # hand over vocabulary checker if spellchecking is enabled
+            ocr_comparison.set_vocabulary_checker(self.vocab_checker)
 
-            #ocr_comparison.print_msa_best_results()
+        input_writers = self.create_input_writers(ocr_comparison, dbdir_abs, table, number_of_sets,
+                                                  additional_created_files)
+        if self._config.DO_N_DIST_KEYING:
+            print("Doing: N_DIST_KEYING, WORDWISE KEYING: ", self._config.NDIST_USE_WORDWISE_KEYING)
+        created_path, result_writers = self.create_result_writers(ocr_comparison, dbdir_abs, table, number_of_sets)
 
-            # created_path = self._config.OUTPUT_ROOT_PATH+"/"+self._base_db_dir+"//"+basename_db+"//"+table+"_msa_best.txt"
+        store_last_entry = None
+        for lidx, current_set in enumerate(ocr_sets):
+            # the inputs are written before the keying, msa changes the lines
+            input_writers.write_set(lidx, current_set)
+            store_last_entry = self.vote_set(ocr_comparison, current_set, store_last_entry)
+            result_writers.write_set(lidx, current_set)
 
-            created_path = self.get_basic_output_directory(dbdir_abs,"msa_best") + "/" + table + "_msa_best.txt"
+        self.run_output_job(input_writers.close)
+        self.run_output_job(result_writers.close)
 
-            ocr_comparison.save_dataset_to_file(created_path, 0, self._config.MODE_ADD_LINEBREAKS, "msa_best")
-            if self._config.WRITE_HOCR:
-                ocr_comparison.save_dataset_to_hocr(created_path, 0, self._config.MODE_ADD_LINEBREAKS, "msa_best")
-            return created_path, additional_created_files
+        return created_path, additional_created_files
 
     def create_reduced_file(self, filepath, ignore_whitespace, ignore_emptyline, ignore_tabs):
 
@@ -251,13 +444,21 @@ class TableParser(object):
 
     def validate_table_against_gt(self, filepath_table, filepath_groundtruth, ignore_whitespace=True, ignore_emptyline=True, ignore_tabs=True):
         if self._config.DO_ISRI_VAL is True:
-            isri_handler = IsriHandler()
+            metrics = self.pipeline_context.metrics
+            start = metrics.clock()
 
             ignore_whitespace = self._config.ISRI_IGNORE_SPACES
             ignore_emptyline = self._config.ISRI_IGNORE_EMPTY_LINES
             ignore_tabs = self._config.ISRI_IGNORE_TABS
 
-            
+            if self._config.ISRI_NATIVE_EVALUATION:
+                self.validate_table_against_gt_native(filepath_table, filepath_groundtruth, ignore_whitespace,
+                                                      ignore_emptyline, ignore_tabs)
+                metrics.add_time("isri_validation", start)
+                return
+
+            isri_handler = IsriHandler()
+
             if ignore_whitespace:
                 filepath_table = self.create_reduced_file(filepath_table, ignore_whitespace, ignore_emptyline, ignore_tabs)
                 filepath_groundtruth = self.create_reduced_file(filepath_groundtruth, ignore_whitespace, ignore_emptyline, ignore_tabs)
@@ -269,6 +470,63 @@ class TableParser(object):
 
             # Test 'wordacc'
             isri_handler.wordacc(filepath_groundtruth, filepath_table, None, filepath_table+".waccreport")
+            metrics.add_time("isri_validation", start)
+
+    def validate_table_against_gt_native(self, filepath_table, filepath_groundtruth, ignore_whitespace,
+                                         ignore_emptyline, ignore_tabs):
+        """
+        Same reports as the isri programs in 'validate_table_against_gt', but evaluated in this process,
+        the reduced texts are kept in memory
+        """
+        isri_evaluator = IsriEvaluator()
+        text_table = isri_evaluator.read_text(filepath_table)
+        text_groundtruth = isri_evaluator.read_text(filepath_groundtruth)
+
+        if ignore_whitespace:
+            text_table = isri_evaluator.reduce_text(text_table, ignore_whitespace, ignore_emptyline, ignore_tabs)
+            text_groundtruth = isri_evaluator.reduce_text(text_groundtruth, ignore_whitespace, ignore_emptyline, ignore_tabs)
+
+            if self._config.ISRI_WRITE_REDUCED_FILES:
+                # only needed for visualizing the reduced results
+                self.create_reduced_file(filepath_table, ignore_whitespace, ignore_emptyline, ignore_tabs)
+                self.create_reduced_file(filepath_groundtruth, ignore_whitespace, ignore_emptyline, ignore_tabs)
+
+            # keep the report names of the reduced files
+            filepath_table = filepath_table + ".red"
+
+        acc_data = isri_evaluator.accuracy_texts(text_groundtruth, text_table)
+        isri_evaluator.write_accuracy_report(acc_data, filepath_table+".accreport")
+
+        wac_data = isri_evaluator.wordacc_texts(text_groundtruth, text_table)
+        isri_evaluator.write_wordacc_report(wac_data, filepath_table+".waccreport")
+
+        return acc_data, wac_data
+
+    def write_stage_metrics(self):
+        """
+        Writes the timers and counters of the run and of each table as json to the output root folder,
+        next to the summarized isri reports
+        :return: path of the written file, None if no metrics are collected
+        """
+        if not self._config.COLLECT_STAGE_METRICS:
+            return None
+        filepath = self._config.OUTPUT_ROOT_PATH + "/stage_metrics.json"
+        self.pipeline_context.metrics.write_json(filepath)
+        return filepath
+
+    def write_profile_report(self):
+        """
+        Writes the parsed tables ranked by their time with the top functions of the profiled tables
+        to the output root folder, the profiles of the tables are in the 'profiles' folder
+        :return: path of the written file, None if the tables aren't profiled
+        """
+        if not self._config.PROFILE_TABLES:
+            return None
+        table_metrics = None
+        if self._config.COLLECT_STAGE_METRICS:
+            table_metrics = self.pipeline_context.metrics.get_summary()["tables"]
+        filepath = self._config.OUTPUT_ROOT_PATH + "/slowest_tables.txt"
+        return self.table_profiler.write_report(filepath, table_metrics)
 
     def summarize_accuracy_report_sums(self, waccreports, accreports, output_root_path):
         if self._config.SUMMARIZE_ISRI_REPORTS is False:
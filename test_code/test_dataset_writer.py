@@ -0,0 +1,92 @@
+"""
+Regression check of the hocr output of the dataset writers: every set of a table is written as one
+'ocr_line' and the page is closed after the last set, also if the table had fewer sets than announced.
+
+The sets are small stand-ins with the line data which the writers read, so no test databases are needed.
+
+run from the repository root:
+    python -m pytest test_code/test_dataset_writer.py
+    python -m test_code.test_dataset_writer
+"""
+
+import os
+import shutil
+import tempfile
+from n_dist_keying.dataset_writer import DatasetHocrWriter
+
+
+class StandInLine(object):
+    """
+        Line of one engine with the data columns of the dataframe line objects of akf_corelib
+    """
+
+    def __init__(self, line_index, words):
+        y0 = line_index * 20
+        self.name = ["tess", "test"]
+        self.word = {"text": {}, "UID": {}}
+        self.data = {"line_x0": [0], "line_y0": [y0], "line_x1": [600], "line_y1": [y0 + 15],
+                     "word_x0": [], "word_x1": []}
+        uid = 0
+        for number, word in enumerate(words):
+            self.word["text"][number] = word
+            self.word["UID"][number] = list(range(uid, uid + len(word)))
+            uid += len(word)
+            self.data["word_x0"].extend([number * 100] * len(word))
+            self.data["word_x1"].extend([number * 100 + 80] * len(word))
+        self.text = " ".join(words)
+
+
+class StandInSet(object):
+
+    def __init__(self, line_index, words):
+        self._set_lines = [StandInLine(line_index, words)]
+        self.budget_fallback = False
+
+    def get_line_set_value_text(self, set_index):
+        return self._set_lines[set_index].text
+
+
+def write_hocr(number_of_sets, sets):
+    """
+    :return: content of the hocr file of the sets
+    """
+    output_dir = tempfile.mkdtemp()
+    try:
+        filename = os.path.join(output_dir, "0585_1_001_tess")
+        writer = DatasetHocrWriter(filename, 0, number_of_sets)
+        for lidx, current_set in enumerate(sets):
+            writer.write_set(lidx, current_set)
+        writer.close()
+        with open(filename + ".hocr", 'r', encoding="utf-8") as file:
+            return file.read()
+    finally:
+        shutil.rmtree(output_dir)
+
+
+def get_test_sets():
+    return [StandInSet(0, ["Aktiengesellschaft", "in", "Berlin"]),
+            StandInSet(1, ["Gegründet:", "1872."]),
+            StandInSet(2, ["Vorstand:", "Max", "Mustermann."])]
+
+
+def test_all_lines_are_written():
+    sets = get_test_sets()
+    hocr = write_hocr(len(sets), sets)
+    assert hocr.count("class ='ocr_line'") == len(sets)
+    assert hocr.count("class ='ocrx_word'") == 8
+    assert "Mustermann." in hocr
+    assert hocr.rstrip().endswith("</html>")
+    assert hocr.count("</html>") == 1
+
+
+def test_page_is_closed_on_close():
+    sets = get_test_sets()
+    hocr = write_hocr(len(sets) + 2, sets)
+    assert hocr.count("class ='ocr_line'") == len(sets)
+    assert hocr.rstrip().endswith("</html>")
+
+
+if __name__ == "__main__":
+    for test in [test_all_lines_are_written, test_page_is_closed_on_close]:
+        test()
+        print("ok:", test.__name__)
@@ -0,0 +1,157 @@
+"""
+Regression check of the in-process evaluator (ISRI_NATIVE_EVALUATION): the .accreport and .waccreport
+files of 'IsriEvaluator' go into 'accsum' and 'wordaccsum' together with the reports of the isri programs
+'accuracy' and 'wordacc', so they have to be the same.
+
+The generated text of a page of the BUS3B test files is its ocropus output (the line text files).
+
+    - the errors of the accuracy report are the levenshtein distance of groundtruth and generated text
+    - the reports are the same as the reference reports in 'test_isri_references'
+    - the reference reports are the same as the reports of the isri programs, this check is skipped if
+      the isri programs aren't installed (see isri_handler.py)
+
+The references are written with '--update-references', by the isri programs if they are installed,
+otherwise by the evaluator. The checked in references were written by the evaluator, the last check
+compares them with the isri programs where these are installed.
+
+run from the repository root:
+    python -m pytest test_code/test_isri_evaluator.py
+    python -m test_code.test_isri_evaluator [--update-references]
+"""
+
+import filecmp
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from ocr_validation.isri_evaluator import IsriEvaluator
+from ocr_validation.ocrolib_edist import Edist3
+
+TESTFILES_ROOT = "./Testfiles/BUS3B_Test/"
+REFERENCES_ROOT = "./test_code/test_isri_references/"
+PAGES = ["2/8752_001", "2/8502_001", "2/8592_001"]
+OCROPUS_FOLDER = "ocropy/2018-02-16_T16H28M"
+
+
+def is_isri_program_installed(program):
+    return shutil.which(program) is not None
+
+
+def create_page_files(page, output_dir):
+    """
+    :return: path of the groundtruth, path of the generated text (ocropus lines of the page)
+    """
+    folder, page_name = page.split("/")
+    path_correctfile = os.path.join(TESTFILES_ROOT, "groundtruth", folder, page_name + ".3B.txt")
+    line_files = sorted(glob.glob(os.path.join(TESTFILES_ROOT, folder, OCROPUS_FOLDER, page_name, "**", "*.txt"),
+                                  recursive=True))
+    path_generatedfile = os.path.join(output_dir, page_name + "_ocro.txt")
+    with open(path_generatedfile, 'w', encoding="utf-8") as file:
+        for line_file in line_files:
+            with open(line_file, 'r', encoding="utf-8") as line:
+                file.write(line.read().rstrip("\n") + "\n")
+    return path_correctfile, path_generatedfile
+
+
+def get_reference_path(page, extension):
+    return os.path.join(REFERENCES_ROOT, page.split("/")[1] + extension)
+
+
+def create_accuracy_report(path_correctfile, path_generatedfile, path_report, use_isri_program):
+    if use_isri_program:
+        subprocess.check_call(["accuracy", path_correctfile, path_generatedfile, path_report])
+    else:
+        IsriEvaluator().accuracy(path_correctfile, path_generatedfile, path_report)
+
+
+def create_wordacc_report(path_correctfile, path_generatedfile, path_report, use_isri_program):
+    if use_isri_program:
+        subprocess.check_call(["wordacc", path_correctfile, path_generatedfile, path_report])
+    else:
+        IsriEvaluator().wordacc(path_correctfile, path_generatedfile, None, path_report)
+
+
+REPORTS = [(".accreport", "accuracy", create_accuracy_report),
+           (".waccreport", "wordacc", create_wordacc_report)]
+
+
+def get_different_pages(extension, create_report, use_isri_program):
+    """
+    Creates the reports of each page and compares them with the references
+    :return: list of pages with a report which differs from the reference
+    """
+    different_pages = []
+    output_dir = tempfile.mkdtemp()
+    try:
+        for page in PAGES:
+            path_correctfile, path_generatedfile = create_page_files(page, output_dir)
+            path_report = path_generatedfile + extension
+            create_report(path_correctfile, path_generatedfile, path_report, use_isri_program)
+            if not filecmp.cmp(get_reference_path(page, extension), path_report, shallow=False):
+                different_pages.append(page)
+    finally:
+        shutil.rmtree(output_dir)
+    return different_pages
+
+
+def test_accuracy_errors_are_levenshtein_distance():
+    output_dir = tempfile.mkdtemp()
+    try:
+        for page in PAGES:
+            path_correctfile, path_generatedfile = create_page_files(page, output_dir)
+            correct_text = IsriEvaluator.read_text(path_correctfile)
+            generated_text = IsriEvaluator.read_text(path_generatedfile)
+            acc_data = IsriEvaluator().accuracy_texts(correct_text, generated_text)
+            assert acc_data.errors == Edist3.levenshtein(correct_text, generated_text), page
+    finally:
+        shutil.rmtree(output_dir)
+
+
+def test_accuracy_reports_match_references():
+    different_pages = get_different_pages(".accreport", create_accuracy_report, False)
+    assert not different_pages, different_pages
+
+
+def test_wordacc_reports_match_references():
+    different_pages = get_different_pages(".waccreport", create_wordacc_report, False)
+    assert not different_pages, different_pages
+
+
+def test_references_match_isri():
+    for extension, program, create_report in REPORTS:
+        if not is_isri_program_installed(program):
+            raise unittest.SkipTest("isri program '" + program + "' isn't installed")
+        different_pages = get_different_pages(extension, create_report, True)
+        assert not different_pages, (program, different_pages)
+
+
+def update_references():
+    if not os.path.exists(REFERENCES_ROOT):
+        os.makedirs(REFERENCES_ROOT)
+    output_dir = tempfile.mkdtemp()
+    try:
+        for extension, program, create_report in REPORTS:
+            use_isri_program = is_isri_program_installed(program)
+            print("writing the", extension, "references with", program if use_isri_program else "the evaluator")
+            for page in PAGES:
+                path_correctfile, path_generatedfile = create_page_files(page, output_dir)
+                create_report(path_correctfile, path_generatedfile, get_reference_path(page, extension),
+                              use_isri_program)
+    finally:
+        shutil.rmtree(output_dir)
+
+
+if __name__ == "__main__":
+    if "--update-references" in sys.argv[1:]:
+        update_references()
+
+    for test in [test_accuracy_errors_are_levenshtein_distance, test_accuracy_reports_match_references,
+                 test_wordacc_reports_match_references, test_references_match_isri]:
+        try:
+            test()
+            print("ok:", test.__name__)
+        except unittest.SkipTest as ex:
+            print("skipped:", test.__name__, ex)
@@ -0,0 +1,167 @@
+"""
+Regression check of the shortcuts of the msa best keying: a table of the BUS3B test databases is voted
+with plain msa, with the consensus tiers (MSA_BEST_CONSENSUS_FULL_AGREEMENT) and with the result cache
+(MSA_RESULT_CACHE_ENABLED). The sets which are taken on the full agreement tier have to get the same
+result as with the msa, a run which takes all sets from the cache the same results and tiers as the
+run which filled it.
+
+The databases are created by main_prepare_dataset.py in DB_DIR_VOTER, the check is skipped if there
+are none or akf_corelib isn't available.
+
+run from the repository root:
+    python -m pytest test_code/test_msa_best_shortcuts.py
+    python -m test_code.test_msa_best_shortcuts
+"""
+
+import copy
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from configuration.configuration_handler import ConfigurationHandler
+from n_dist_keying.consensus_checker import ConsensusChecker
+from n_dist_keying.msa_result_cache import MsaResultCache
+
+CODED_CONFIGURATION_PATH_VOTER = './configuration/voter/config_vote_bus3b.conf'
+CODED_CONFIGURATION_PATH_DB_READER = './configuration/to_db_reader/config_read_bus3b.conf'
+
+_config = None
+
+
+def get_config():
+    """
+    The configuration parser is a singleton, so the configuration is parsed once, without the arguments of pytest
+    :return: configuration with plain msa, the checks change copies of it
+    """
+    global _config
+    if _config is None:
+        argv = sys.argv
+        sys.argv = argv[:1]
+        try:
+            config_handler = ConfigurationHandler(first_init=True, fill_unkown_args=True,
+                                                  coded_configuration_paths=[CODED_CONFIGURATION_PATH_VOTER,
+                                                                             CODED_CONFIGURATION_PATH_DB_READER])
+        finally:
+            sys.argv = argv
+        _config = config_handler.get_config()
+        _config.DO_N_DIST_KEYING = False
+        _config.DO_MSA_BEST = True
+        _config.MSA_BEST_CONSENSUS_FULL_AGREEMENT = False
+        _config.MSA_BEST_CONSENSUS_MAJORITY = False
+        _config.MSA_RESULT_CACHE_ENABLED = False
+        _config.MSA_BEST_LINE_TIME_BUDGET = 0
+        _config.MSA_BEST_TABLE_TIME_BUDGET = 0
+        _config.MSA_BEST_MAX_ALIGNMENT_CELLS = 0
+    return _config
+
+
+def get_test_table(config):
+    """
+    :return: database url and name of the first table of the voter databases
+    """
+    try:
+        from akf_corelib.database_handler import DatabaseHandler as CorelibDatabaseHandler
+    except ImportError as ex:
+        raise unittest.SkipTest("akf_corelib isn't available: " + str(ex))
+    from n_dist_keying.result_database_writer import RESULTS_TABLE
+
+    if not os.path.exists(config.DB_DIR_VOTER):
+        raise unittest.SkipTest("no voter databases in " + config.DB_DIR_VOTER + ", run main_prepare_dataset.py first")
+    dh = CorelibDatabaseHandler(dbdir=str(os.path.abspath(config.DB_DIR_VOTER)))
+    for db in sorted(dh.db):
+        for table in sorted(dh.get_tablenames_from_db(db)):
+            if table != RESULTS_TABLE:
+                return 'sqlite:////' + db, table
+    raise unittest.SkipTest("no tables in " + config.DB_DIR_VOTER)
+
+
+def vote_table(config, dbpath, table):
+    """
+    Msa best keying of all sets of the table, like 'TableParser.vote_set' without the corrections
+    :return: list of (text, text segments, consensus tier) of the sets
+    """
+    from akf_corelib.df_objectifier import DFObjectifier
+    from n_dist_keying.database_handler import DatabaseHandler
+    from n_dist_keying.pipeline_context import PipelineContext
+
+    pipeline_context = PipelineContext(config)
+    pipeline_context.reset_table_state()
+    database_handler = DatabaseHandler(DFObjectifier(dbpath, table), config.NUMBER_OF_INPUTS, None, None,
+                                       pipeline_context)
+    ocr_comparison = database_handler.create_ocr_comparison()
+    ocr_comparison.sort_set()
+
+    results = []
+    for current_set in ocr_comparison.ocr_sets:
+        ocr_comparison.do_msa_best_for_set(current_set, config.MSA_BEST_USE_N_DIST_PIVOT,
+                                           config.MSA_BEST_USE_LONGEST_PIVOT, config.MSA_BEST_USE_CHARCONFS,
+                                           config.MSA_BEST_USE_WORDWISE_MSA, config.MSA_BEST_USE_SEARCHSPACE)
+        results.append((current_set._best_msa_text, current_set._text_seg, current_set.consensus_tier))
+    return results
+
+
+def test_consensus_matches_msa():
+    config = get_config()
+    dbpath, table = get_test_table(config)
+    results_msa = vote_table(config, dbpath, table)
+
+    config_consensus = copy.copy(config)
+    config_consensus.MSA_BEST_CONSENSUS_FULL_AGREEMENT = True
+    results_consensus = vote_table(config_consensus, dbpath, table)
+
+    assert len(results_msa) == len(results_consensus)
+    differences = []
+    for set_index, (result_msa, result_consensus) in enumerate(zip(results_msa, results_consensus)):
+        if result_consensus[2] == ConsensusChecker.TIER_FULL_AGREEMENT and result_consensus[:2] != result_msa[:2]:
+            differences.append((set_index, result_msa[:2], result_consensus[:2]))
+    assert not differences, differences[:10]
+
+
+def test_cache_matches_msa():
+    config = get_config()
+    dbpath, table = get_test_table(config)
+    results_msa = vote_table(config, dbpath, table)
+
+    config_cache = copy.copy(config)
+    config_cache.MSA_BEST_CONSENSUS_FULL_AGREEMENT = True
+    config_cache.MSA_RESULT_CACHE_ENABLED = True
+    config_cache.MSA_RESULT_CACHE_DIR = tempfile.mkdtemp()
+    try:
+        results_filled = vote_table(config_cache, dbpath, table)
+        results_cached = vote_table(config_cache, dbpath, table)
+        cache = MsaResultCache.get_cache(config_cache)
+        assert cache.hits > 0
+    finally:
+        MsaResultCache._caches.pop(os.path.abspath(config_cache.MSA_RESULT_CACHE_DIR), None)
+        shutil.rmtree(config_cache.MSA_RESULT_CACHE_DIR)
+
+    # the tiers are stored with the results
+    assert results_cached == results_filled
+    differences = []
+    for set_index, (result_msa, result_cached) in enumerate(zip(results_msa, results_cached)):
+        if result_cached[2] == ConsensusChecker.TIER_MSA and result_cached[:2] != result_msa[:2]:
+            differences.append((set_index, result_msa[:2], result_cached[:2]))
+    assert not differences, differences[:10]
+
+
+def test_consensus_off_with_voter_state():
+    config = copy.copy(get_config())
+    config.MSA_BEST_CONSENSUS_FULL_AGREEMENT = True
+    assert ConsensusChecker.is_enabled(config)
+    for key in ["PREDICTOR_AUFSICHTSRAT_ENABLED", "KEYING_RESULT_VOCABULARY_CORRECTION_VOTE",
+                "TABLE_RECOGNITION_ENABLED"]:
+        config_state = copy.copy(config)
+        setattr(config_state, key, True)
+        assert not ConsensusChecker.is_enabled(config_state), key
+        config_state.MSA_RESULT_CACHE_ENABLED = True
+        assert MsaResultCache.get_cache(config_state) is None, key
+
+
+if __name__ == "__main__":
+    for test in [test_consensus_matches_msa, test_cache_matches_msa, test_consensus_off_with_voter_state]:
+        try:
+            test()
+            print("ok:", test.__name__)
+        except unittest.SkipTest as ex:
+            print("skipped:", test.__name__, ex)
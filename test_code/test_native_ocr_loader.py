@@ -0,0 +1,113 @@
+"""
+Regression check of the native input loaders (NATIVE_INPUT_LOADERS) against the hocr-based
+path: the records of 'NativeOCRLoader' have to be the same as the ones 'HocrSQLComparator.line2dict'
+creates from the hocr-file of the same page.
+
+    ocropus:   json-files of the page against the ocropus hocr-file
+    tesseract: there is no native loader, the line boxes of the tesseract records are compared with the
+               ones of the ocropus loader, the line matching compares these columns between the engines
+    abbyy:     FineReader xml against the abbyy hocr-file, which is converted from the xml when the
+               dataset is prepared, the check is skipped if it isn't next to the xml-file
+
+run from the repository root:
+    python -m pytest test_code/test_native_ocr_loader.py
+    python -m test_code.test_native_ocr_loader
+"""
+
+import os
+import unittest
+from n_dist_keying.hocr_sql_comparator import HocrSQLComparator
+from n_dist_keying.native_ocr_loader import NativeOCRLoader
+
+TESTFILES_ROOT = "./Testfiles/BUS3B_Test/2/"
+PAGE = "8752_001"
+FILEPATH_OCROPUS_HOCR = TESTFILES_ROOT + "ocropy/2018-02-16_T16H28M/" + PAGE + ".3B.tif.hocr"
+FILEPATH_TESSERACT_HOCR = TESTFILES_ROOT + "tess/2018-02-16_T16H28M/" + PAGE + ".3B.tif.hocr"
+FILEPATH_ABBYY_XML = TESTFILES_ROOT + "abbyy/2018-02-26_T13H54M/" + PAGE + ".3B.tif.xml"
+FILEPATH_ABBYY_HOCR = TESTFILES_ROOT + "abbyy/2018-02-26_T13H54M/" + PAGE + ".3B.tif.hocr"
+
+CONFIDENCE_TOLERANCE = 0.01     # the hocr-files contain rounded confidences
+LINE_MATCH_TOLERANCE = 30       # same threshold as 'HocrSQLComparator.compare_coordinates'
+LINE_BOX_COLUMNS = ["line_x0", "line_x1", "line_y0", "line_y1"]
+
+
+def get_hocr_records(create_table_function, filename):
+    """
+    Records of the hocr-based path, without writing them to a database
+    """
+    comparator = HocrSQLComparator()
+    comparator._use_native_loaders = False
+    records = {}
+    comparator.dict2sql = lambda df_dict, dbpath, tablename: records.update(df_dict)
+    create_table_function(comparator)(os.path.abspath(filename), None, "default")
+    return records
+
+
+def compare_records(records_native, records_hocr):
+    """
+    :return: list of differences (record index, column, native value, hocr value)
+    """
+    differences = []
+    if len(records_native) != len(records_hocr):
+        differences.append((None, "number of records", len(records_native), len(records_hocr)))
+
+    for idx in sorted(set(records_native) & set(records_hocr)):
+        native, hocr = records_native[idx], records_hocr[idx]
+        for column in hocr:
+            if isinstance(hocr[column], float):
+                equal = abs(native[column] - hocr[column]) <= CONFIDENCE_TOLERANCE
+            else:
+                equal = native[column] == hocr[column]
+            if not equal:
+                differences.append((idx, column, native[column], hocr[column]))
+    return differences
+
+
+def get_line_boxes(records):
+    line_boxes = {}
+    for record in records.values():
+        line_boxes[record["line_idx"]] = tuple(record[column] for column in LINE_BOX_COLUMNS)
+    return line_boxes
+
+
+def test_ocropus_json_matches_hocr():
+    json_dir = NativeOCRLoader.get_ocropus_json_dir(FILEPATH_OCROPUS_HOCR)
+    records_native = NativeOCRLoader().create_table_ocropus_json(json_dir, "default")
+    records_hocr = get_hocr_records(lambda comparator: comparator.create_table_ocropus, FILEPATH_OCROPUS_HOCR)
+
+    differences = compare_records(records_native, records_hocr)
+    assert not differences, differences[:10]
+
+
+def test_ocropus_json_line_boxes_match_tesseract():
+    json_dir = NativeOCRLoader.get_ocropus_json_dir(FILEPATH_OCROPUS_HOCR)
+    line_boxes_native = get_line_boxes(NativeOCRLoader().create_table_ocropus_json(json_dir, "default"))
+    line_boxes_tesseract = list(get_line_boxes(get_hocr_records(
+        lambda comparator: comparator.create_table_tesseract, FILEPATH_TESSERACT_HOCR)).values())
+
+    # columns 1 and 3 hold the top and bottom of the line, like the coordinates which are matched
+    unmatched = [line_box for line_box in line_boxes_native.values()
+                 if not any(abs(line_box[1] - other[1]) < LINE_MATCH_TOLERANCE and
+                            abs(line_box[3] - other[3]) < LINE_MATCH_TOLERANCE for other in line_boxes_tesseract)]
+    assert len(unmatched) <= len(line_boxes_native) // 10, unmatched
+
+
+def test_abbyy_xml_matches_hocr():
+    if not os.path.exists(FILEPATH_ABBYY_HOCR):
+        raise unittest.SkipTest("no abbyy hocr-file next to the xml: " + FILEPATH_ABBYY_HOCR)
+
+    records_native = NativeOCRLoader().create_table_abbyy_xml(FILEPATH_ABBYY_XML, "default")
+    records_hocr = get_hocr_records(lambda comparator: comparator.create_table_abbyy, FILEPATH_ABBYY_HOCR)
+
+    differences = compare_records(records_native, records_hocr)
+    assert not differences, differences[:10]
+
+
+if __name__ == "__main__":
+    for test in [test_ocropus_json_matches_hocr, test_ocropus_json_line_boxes_match_tesseract,
+                 test_abbyy_xml_matches_hocr]:
+        try:
+            test()
+            print("ok:", test.__name__)
+        except unittest.SkipTest as ex:
+            print("skipped:", test.__name__, ex)
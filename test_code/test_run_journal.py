@@ -0,0 +1,168 @@
+"""
+Regression check of the run journal (WRITE_RUN_JOURNAL, RESUME_RUN): a recorded table is skipped on
+resume, a table is voted again if the configuration or its input table changed or one of its created
+files is missing, and the torn last line of a killed run is ignored. A table which was started but not
+finished (ended by the table watchdog) is reported as aborted on resume, until it's finished.
+
+The input table is a small sqlite table in a temporary folder, so no test databases are needed.
+
+run from the repository root:
+    python -m pytest test_code/test_run_journal.py
+    python -m test_code.test_run_journal
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+from n_dist_keying.database_engine_pool import DatabaseEnginePool
+from n_dist_keying.run_journal import RunJournal
+
+TABLE = "0585_1_001"
+NAME = "test_db/" + TABLE
+
+
+class JournalFixture(object):
+    """
+        Temporary database with one input table, a created result file and the journal path
+    """
+
+    def __init__(self):
+        self.dir = tempfile.mkdtemp()
+        self.dbfile = os.path.join(self.dir, "test_db.db")
+        self.dbpath = "sqlite:////" + os.path.abspath(self.dbfile)
+        self.journal_path = os.path.join(self.dir, "output", RunJournal.FILENAME)
+        self.created_file = os.path.join(self.dir, "output", TABLE + "_msa_best.txt")
+        self.config = argparse.Namespace(DO_MSA_BEST=True, MSA_BEST_USE_CHARCONFS=True, PRINT_MSA_HANDLER=False,
+                                         RESUME_RUN=True)
+
+        connection = sqlite3.connect(self.dbfile)
+        connection.execute('CREATE TABLE "{}" (line_idx INTEGER, char TEXT, x_confs REAL)'.format(TABLE))
+        connection.executemany('INSERT INTO "{}" VALUES (?, ?, ?)'.format(TABLE),
+                               [(0, "a", 90.0), (0, "b", 80.0), (1, "c", 70.0)])
+        connection.commit()
+        connection.close()
+
+        os.makedirs(os.path.dirname(self.created_file))
+        with open(self.created_file, 'w', encoding="utf-8") as file:
+            file.write("ab\nc\n")
+
+    def record(self):
+        RunJournal(self.journal_path, self.config).record(NAME, self.dbpath, TABLE, [self.created_file])
+
+    def record_started(self):
+        RunJournal(self.journal_path, self.config).record_started(NAME, self.dbpath, TABLE)
+
+    def resume(self, config=None):
+        """
+        :return: True if the table is skipped by a resumed run
+        """
+        journal = RunJournal(self.journal_path, config or self.config)
+        journal.load()
+        return journal.is_finished(NAME, self.dbpath, TABLE)
+
+    def close(self):
+        engine = DatabaseEnginePool._engines.pop(self.dbpath, None)
+        if engine is not None:
+            engine.dispose()
+        shutil.rmtree(self.dir)
+
+
+def run_with_fixture(check):
+    fixture = JournalFixture()
+    try:
+        check(fixture)
+    finally:
+        fixture.close()
+
+
+def test_finished_table_is_skipped():
+    def check(fixture):
+        assert not fixture.resume()
+        fixture.record()
+        assert fixture.resume()
+
+    run_with_fixture(check)
+
+
+def test_changed_config_is_voted_again():
+    def check(fixture):
+        fixture.record()
+        config = argparse.Namespace(**vars(fixture.config))
+        config.MSA_BEST_USE_CHARCONFS = False
+        assert not fixture.resume(config)
+
+        # prints and the resume flag don't change the results
+        config = argparse.Namespace(**vars(fixture.config))
+        config.PRINT_MSA_HANDLER = True
+        config.RESUME_RUN = False
+        assert fixture.resume(config)
+
+    run_with_fixture(check)
+
+
+def test_changed_input_is_voted_again():
+    def check(fixture):
+        fixture.record()
+        connection = sqlite3.connect(fixture.dbfile)
+        connection.execute('INSERT INTO "{}" VALUES (2, "d", 60.0)'.format(TABLE))
+        connection.commit()
+        connection.close()
+        assert not fixture.resume()
+
+    run_with_fixture(check)
+
+
+def test_missing_output_is_voted_again():
+    def check(fixture):
+        fixture.record()
+        os.remove(fixture.created_file)
+        assert not fixture.resume()
+
+    run_with_fixture(check)
+
+
+def test_torn_last_line_is_ignored():
+    def check(fixture):
+        fixture.record()
+        with open(fixture.journal_path, 'a', encoding="utf-8") as file:
+            file.write('{"table": "test_db/0585_1_002", "input_ha')
+        journal = RunJournal(fixture.journal_path, fixture.config)
+        assert journal.load() == 1
+        assert journal.is_finished(NAME, fixture.dbpath, TABLE)
+
+    run_with_fixture(check)
+
+
+def test_started_table_is_aborted():
+    def check(fixture):
+        fixture.record_started()
+        journal = RunJournal(fixture.journal_path, fixture.config)
+        assert journal.load() == 0
+        assert journal.is_aborted(NAME, fixture.dbpath, TABLE)
+        assert not journal.is_finished(NAME, fixture.dbpath, TABLE)
+
+        # a table which is voted again with another configuration isn't aborted
+        config = argparse.Namespace(**vars(fixture.config))
+        config.MSA_BEST_USE_CHARCONFS = False
+        journal = RunJournal(fixture.journal_path, config)
+        journal.load()
+        assert not journal.is_aborted(NAME, fixture.dbpath, TABLE)
+
+        # the finished entry replaces the started one
+        fixture.record()
+        journal = RunJournal(fixture.journal_path, fixture.config)
+        assert journal.load() == 1
+        assert not journal.is_aborted(NAME, fixture.dbpath, TABLE)
+        assert journal.is_finished(NAME, fixture.dbpath, TABLE)
+
+    run_with_fixture(check)
+
+
+if __name__ == "__main__":
+    for test in [test_finished_table_is_skipped, test_changed_config_is_voted_again,
+                 test_changed_input_is_voted_again, test_missing_output_is_voted_again,
+                 test_torn_last_line_is_ignored, test_started_table_is_aborted]:
+        test()
+        print("ok:", test.__name__)
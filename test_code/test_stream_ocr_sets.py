@@ -0,0 +1,60 @@
+"""
+Regression check of the streamed set construction (STREAM_OCR_SETS): the sets which 'stream_ocr_sets'
+creates line by line from the rows of a table have to be the same as the sets of 'create_ocr_comparison',
+which creates the line objects of the whole table at once.
+
+The databases are created by main_prepare_dataset.py in DB_DIR_VOTER, the check is skipped if there
+are none or akf_corelib isn't available.
+
+run from the repository root:
+    python -m pytest test_code/test_stream_ocr_sets.py
+    python -m test_code.test_stream_ocr_sets
+"""
+
+import unittest
+
+
+def get_set_texts(ocr_sets):
+    """
+    :return: list of (line index, texts of the engine lines) of the sets
+    """
+    return [(current_set.y_mean, [current_set.get_line_set_value_text(set_index)
+                                  for set_index in range(current_set.size)]) for current_set in ocr_sets]
+
+
+def test_streamed_sets_match_comparison():
+    try:
+        # the voter modules need akf_corelib
+        from test_code.test_msa_best_shortcuts import get_config, get_test_table
+    except ImportError as ex:
+        raise unittest.SkipTest("akf_corelib isn't available: " + str(ex))
+    config = get_config()
+    dbpath, table = get_test_table(config)
+
+    from akf_corelib.df_objectifier import DFObjectifier
+    from n_dist_keying.database_handler import DatabaseHandler
+    from n_dist_keying.pipeline_context import PipelineContext
+
+    pipeline_context = PipelineContext(config)
+    pipeline_context.reset_table_state()
+    database_handler = DatabaseHandler(DFObjectifier(dbpath, table), config.NUMBER_OF_INPUTS, None, None,
+                                       pipeline_context)
+    ocr_comparison = database_handler.create_ocr_comparison()
+    ocr_comparison.sort_set()
+
+    database_handler = DatabaseHandler(DFObjectifier(dbpath, table), config.NUMBER_OF_INPUTS, None, None,
+                                       pipeline_context)
+    number_of_sets, ocr_sets = database_handler.stream_ocr_sets()
+    streamed_sets = list(ocr_sets)
+
+    assert number_of_sets == len(streamed_sets)
+    assert get_set_texts(streamed_sets) == get_set_texts(ocr_comparison.ocr_sets)
+
+
+if __name__ == "__main__":
+    for test in [test_streamed_sets_match_comparison]:
+        try:
+            test()
+            print("ok:", test.__name__)
+        except unittest.SkipTest as ex:
+            print("skipped:", test.__name__, ex)
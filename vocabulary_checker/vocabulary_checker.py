@@ -16,6 +16,7 @@ class VocabularyChecker():
         self.dict_lines = []
         self.max_edist = None
         self.suggenstion_verbosity = None
+        self.verbosity = None  # 'SymSpell.Verbosity', set when the spellchecker is initialized
         #self.spellchecker = None
         self.special_chars_borders = "!¦1234567890,)(;.:\"-"
 
@@ -139,6 +140,7 @@ class VocabularyChecker():
 
             # set paramters
             self.max_edist = self.config.KEYING_RESULT_VC_EDIT_DISTANCE_LEVEL
+            self.verbosity = SymSpell.Verbosity
             self.suggenstion_verbosity = SymSpell.Verbosity.CLOSEST
 
             # initialize symspell as spellchecker
@@ -157,7 +159,7 @@ class VocabularyChecker():
     def correct_text_at_certain_indices_only(self, input_text, possible_error_indices):
 
         replacement_char = "‖"
-        return_term, suggestions, first_letter_high = self.correct_text(input_text, suggestion_verbosity = SymSpell.Verbosity.ALL)
+        return_term, suggestions, first_letter_high = self.correct_text(input_text, suggestion_verbosity = self.verbosity.ALL)
 
         if input_text == return_term:
             return return_term